@@ -27,6 +27,14 @@ class CreateRideDTO:
     pickup_longitude: float
 
 
+@dataclass
+class RideHistoryFiltersDTO:
+    """Filtros do histórico de aulas (None = sem filtro). Intervalo semiaberto em scheduled_at."""
+    statuses: Optional[List[str]] = None
+    scheduled_from: Optional[datetime] = None
+    scheduled_to: Optional[datetime] = None
+
+
 # ==================== INSTRUCTOR ====================
 @dataclass
 class CreateInstructorDTO:
@@ -39,6 +47,17 @@ class CreateInstructorDTO:
     longitude: float
 
 
+@dataclass
+class InstructorSearchFiltersDTO:
+    """Filtros da busca de instrutores por raio (None = sem filtro)."""
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    cnh_category: Optional[str] = None
+    vehicle_model: Optional[str] = None  # Busca parcial, sem diferenciar maiúsculas
+    min_rating: Optional[float] = None
+    verified_only: bool = True
+
+
 # ==================== AVAILABILITY ====================
 @dataclass
 class CreateAvailabilityDTO:
@@ -1,72 +1,148 @@
-from datetime import date, datetime, timedelta, time
-from typing import List
+from collections import defaultdict
+from datetime import date, datetime, timedelta, time, tzinfo
+from typing import Dict, List, Tuple
 
 from sqlalchemy.orm import Session
 
-from app.infrastructure.db.models.ride import RideStatus
+from app.application.use_cases.availability.weekly_template import (
+    MINUTES_PER_DAY,
+    Interval,
+    WeeklyTemplate,
+    weekly_template_cache,
+)
 from app.infrastructure.repositories.availability_repository import AvailabilityRepository
-from app.infrastructure.repositories.ride_repository import RideRepository
+from app.infrastructure.repositories.ride_repository import (
+    RideRepository,
+    instructor_timezone,
+    local_day_range,
+)
+from app.infrastructure.scheduling.slot_holds import slot_holds
+
+# Duração de cada slot oferecido ao aluno
+SLOT_DURATION = timedelta(hours=1)
+SLOT_MINUTES = int(SLOT_DURATION.total_seconds() // 60)
+
+# Duração assumida para aulas sem duration_minutes (padrão do modelo Ride)
+DEFAULT_RIDE_MINUTES = 50
+
+# Aulas que começam até esse tempo antes do período ainda podem invadi-lo
+BUSY_LOOKBACK = timedelta(days=1)
+
+def wall_clock_pieces(start: datetime, end: datetime, tz: tzinfo) -> List[Tuple[datetime, datetime]]:
+    """
+    [start, end) em horário local (naive) no fuso `tz`. Se o horário de verão
+    começa ou termina no meio do intervalo, vira dois pedaços: a aula das 01:30
+    às 02:30 (UTC-5 -> UTC-4) ocupa 01:30-02:00 e 03:00-03:30 no relógio.
+    Datetimes naive já são tratados como horário local.
+    """
+    if start.tzinfo is None:
+        return [(start, end)]
+    local_start, local_end = start.astimezone(tz), end.astimezone(tz)
+    if local_start.utcoffset() == local_end.utcoffset():
+        return [(local_start.replace(tzinfo=None), local_end.replace(tzinfo=None))]
+
+    # Busca binária do instante da troca de offset (as trocas caem em minuto cheio)
+    low, high = start, end
+    while high - low > timedelta(minutes=1):
+        middle = low + (high - low) / 2
+        if middle.astimezone(tz).utcoffset() == local_start.utcoffset():
+            low = middle
+        else:
+            high = middle
+    switch = high.astimezone(tz)
+    before_switch = switch.replace(tzinfo=None) - (switch.utcoffset() - local_start.utcoffset())
+    return [
+        (local_start.replace(tzinfo=None), before_switch),
+        (switch.replace(tzinfo=None), local_end.replace(tzinfo=None)),
+    ]
+
+# Maior intervalo aceito pelo calendário (evita varrer meses de aulas)
+MAX_CALENDAR_DAYS = 62
 
 class AvailabilityService:
     def __init__(self):
         self.availability_repo = AvailabilityRepository()
         self.ride_repo = RideRepository()
 
+    def get_weekly_template(self, db: Session, instructor_id: int) -> WeeklyTemplate:
+        """
+        Agenda recorrente do instrutor, com todas as janelas de cada dia da semana
+        unidas (ex: 08-12 e 14-18). Compilada uma vez e reaproveitada (cache com TTL).
+        """
+        return weekly_template_cache.get(
+            instructor_id,
+            lambda: WeeklyTemplate.compile(
+                self.availability_repo.get_by_instructor(db, instructor_id), SLOT_MINUTES
+            ),
+        )
+
     def get_available_slots(
-        self, 
-        db: Session, 
-        instructor_id: int, 
+        self,
+        db: Session,
+        instructor_id: int,
         query_date: date
     ) -> List[time]:
         """
         Calcula os horários disponíveis (slots de 1h) para um instrutor em uma data específica.
         Lógica: (Disponibilidade Recorrente) - (Aulas Marcadas/Pagas)
         """
-        
-        # 1. Identifica o dia da semana da data solicitada (0=Segunda, 6=Domingo)
-        day_of_week = query_date.weekday()
-
-        # 2. Busca a regra de disponibilidade do instrutor para esse dia
-        # (Estou usando o método que busca tudo e filtrando em memória pois são poucos registros)
-        all_availabilities = self.availability_repo.get_by_instructor(db, instructor_id)
-        daily_rule = next((a for a in all_availabilities if a.day_of_week == day_of_week), None)
-
-        if not daily_rule:
-            return []  # Instrutor não trabalha neste dia da semana
-
-        # 3. Gera os "Slots Candidatos" (Horários possíveis baseados na regra)
-        # Ex: Se trabalha das 08:00 às 12:00 -> [08:00, 09:00, 10:00, 11:00]
-        candidate_slots = []
-        
-        # Criamos datas dummy apenas para poder somar horas
-        current_dt = datetime.combine(query_date, daily_rule.start_time)
-        end_dt = datetime.combine(query_date, daily_rule.end_time)
-        
-        # Loop de 1 em 1 hora
-        while current_dt + timedelta(hours=1) <= end_dt:
-            candidate_slots.append(current_dt.time())
-            current_dt += timedelta(hours=1)
-            
-        # Se não houver slots gerados (ex: horário muito curto), retorna vazio
-        if not candidate_slots:
-            return []
-
-        # 4. Busca as aulas já agendadas para esse dia (Ocupadas)
-        # Precisamos de um método novo no repo para filtrar por data exata
-        booked_rides = self.ride_repo.get_by_instructor_and_date(db, instructor_id, query_date)
-
-        # 5. Filtra os horários ocupados
-        # Ignoramos aulas canceladas (RideStatus.CANCELLED)
-        busy_times = set()
-        for ride in booked_rides:
-            if ride.status != RideStatus.CANCELLED:
-                # Extrai apenas a hora da aula agendada
-                busy_times.add(ride.scheduled_at.time())
-
-        # 6. Subtração: Remove os horários ocupados da lista de candidatos
-        final_slots = [
-            slot for slot in candidate_slots 
-            if slot not in busy_times
-        ]
-
-        return sorted(final_slots)
\ No newline at end of file
+        return self.get_available_calendar(db, instructor_id, query_date, query_date)[query_date]
+
+    def get_available_calendar(
+        self,
+        db: Session,
+        instructor_id: int,
+        start_date: date,
+        end_date: date
+    ) -> Dict[date, List[time]]:
+        """
+        Slots livres de cada dia entre start_date e end_date (inclusive).
+
+        Janelas do dia (template semanal) menos as aulas confirmadas e os holds de
+        checkout do período, cada um ocupando [início, início + duração). Um slot
+        só é oferecido se couber inteiro num intervalo livre.
+        """
+        days = [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+
+        # 1. Template semanal (0=Segunda, 6=Domingo)
+        template = self.get_weekly_template(db, instructor_id)
+        if template.is_empty:
+            return {day: [] for day in days}  # Instrutor sem agenda cadastrada
+
+        # 2. Aulas do período (Ocupadas) em minutos do dia, no fuso do instrutor
+        # O banco traz as confirmadas e as aguardando pagamento dentro do prazo do
+        # checkout; os holds em memória só cobrem a janela até o commit ficar visível.
+        tz = instructor_timezone()
+        range_start, _ = local_day_range(start_date, tz)
+        _, range_end = local_day_range(end_date, tz)
+        rides = self.ride_repo.get_busy_intervals_in_range(
+            db, instructor_id, range_start - BUSY_LOOKBACK, range_end
+        )
+        busy_by_day: Dict[date, List[Interval]] = defaultdict(list)
+        for scheduled_at, duration_minutes in rides:
+            # Duração somada no instante (UTC), não no relógio: em dia de troca de
+            # horário de verão a aula termina em outro offset
+            end = scheduled_at + timedelta(minutes=duration_minutes or DEFAULT_RIDE_MINUTES)
+            self._add_busy(busy_by_day, scheduled_at, end, tz)
+        for start, end in slot_holds.intervals(instructor_id, range_start, range_end):
+            self._add_busy(busy_by_day, start, end, tz)
+
+        # 3. Subtração: janelas do dia - intervalos ocupados
+        return {
+            day: template.for_weekday(day.weekday()).free_slots(busy_by_day.get(day, ()), SLOT_MINUTES)
+            for day in days
+        }
+
+    @staticmethod
+    def _add_busy(busy_by_day: Dict[date, List[Interval]], start: datetime, end: datetime, tz: tzinfo) -> None:
+        """Registra [start, end) por dia local; aulas que passam da meia-noite ocupam os dois dias."""
+        for piece_start, piece_end in wall_clock_pieces(start, end, tz):
+            day = piece_start.date()
+            offset = piece_start.hour * 60 + piece_start.minute
+            remaining = int((piece_end - piece_start).total_seconds() // 60)
+            while remaining > 0:
+                chunk = min(remaining, MINUTES_PER_DAY - offset)
+                busy_by_day[day].append((offset, offset + chunk))
+                remaining -= chunk
+                day += timedelta(days=1)
+                offset = 0
@@ -0,0 +1,186 @@
+"""
+Weekly Template
+
+Motor de intervalos da agenda do instrutor.
+
+Os horários são representados em minutos desde 00:00 (intervalos semiabertos
+[início, fim)). As regras de disponibilidade de cada dia da semana são unidas
+(08-12 e 14-18 viram duas janelas; 08-12 e 11-14 viram 08-14) e compiladas uma
+única vez por instrutor num `WeeklyTemplate`, guardado em memória com TTL.
+
+Com o template pronto, os slots livres de um dia são uma subtração de
+intervalos: janelas do dia menos as aulas ocupadas (início + duration_minutes).
+"""
+import threading
+import time as _time
+from bisect import bisect_right
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.infrastructure.config.settings import settings
+
+# (início, fim) em minutos desde 00:00
+Interval = Tuple[int, int]
+
+MINUTES_PER_DAY = 24 * 60
+
+
+def to_minutes(value: time) -> int:
+    return value.hour * 60 + value.minute
+
+
+def to_time(minutes: int) -> time:
+    return time(minutes // 60, minutes % 60)
+
+
+def merge_intervals(intervals: Iterable[Interval]) -> List[Interval]:
+    """Ordena e une intervalos sobrepostos ou encostados. Intervalos vazios são descartados."""
+    merged: List[Interval] = []
+    for start, end in sorted(i for i in intervals if i[0] < i[1]):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def subtract_intervals(windows: Sequence[Interval], busy: Iterable[Interval]) -> List[Interval]:
+    """Janelas (já unidas) menos os intervalos ocupados."""
+    free: List[Interval] = []
+    busy = merge_intervals(busy)
+    i = 0
+    for start, end in windows:
+        cursor = start
+        # Pula os ocupados que terminam antes da janela
+        while i < len(busy) and busy[i][1] <= cursor:
+            i += 1
+        j = i
+        while j < len(busy) and busy[j][0] < end:
+            if busy[j][0] > cursor:
+                free.append((cursor, busy[j][0]))
+            cursor = max(cursor, busy[j][1])
+            j += 1
+        if cursor < end:
+            free.append((cursor, end))
+    return free
+
+
+@dataclass(frozen=True)
+class DayTemplate:
+    """Janelas unidas de um dia da semana e os inícios de slot candidatos."""
+    windows: Tuple[Interval, ...]
+    slot_starts: Tuple[int, ...]
+
+    def free_slots(self, busy: Sequence[Interval], slot_minutes: int) -> List[time]:
+        """Slots do template que cabem inteiros num intervalo livre."""
+        if not busy:
+            return [to_time(start) for start in self.slot_starts]
+
+        free = subtract_intervals(self.windows, busy)
+        free_starts = [start for start, _ in free]
+        slots = []
+        for start in self.slot_starts:
+            # Intervalo livre que começa em ou antes do slot
+            k = bisect_right(free_starts, start) - 1
+            if k >= 0 and start + slot_minutes <= free[k][1]:
+                slots.append(to_time(start))
+        return slots
+
+
+EMPTY_DAY = DayTemplate(windows=(), slot_starts=())
+
+
+@dataclass(frozen=True)
+class WeeklyTemplate:
+    """Agenda recorrente compilada (0=Segunda, 6=Domingo)."""
+    days: Dict[int, DayTemplate]
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.days
+
+    def for_weekday(self, weekday: int) -> DayTemplate:
+        return self.days.get(weekday, EMPTY_DAY)
+
+    @classmethod
+    def compile(cls, rules: Iterable, slot_minutes: int) -> "WeeklyTemplate":
+        """
+        Compila as regras (objetos com day_of_week, start_time, end_time).
+        Os slots seguem uma grade de `slot_minutes` a partir do início de cada janela.
+        """
+        raw: Dict[int, List[Interval]] = {}
+        for rule in rules:
+            raw.setdefault(rule.day_of_week, []).append(
+                (to_minutes(rule.start_time), to_minutes(rule.end_time))
+            )
+
+        days = {}
+        for weekday, intervals in raw.items():
+            windows = merge_intervals(intervals)
+            if not windows:
+                continue
+            slot_starts = [
+                start
+                for w_start, w_end in windows
+                for start in range(w_start, w_end - slot_minutes + 1, slot_minutes)
+            ]
+            days[weekday] = DayTemplate(windows=tuple(windows), slot_starts=tuple(slot_starts))
+        return cls(days=days)
+
+
+class WeeklyTemplateCache:
+    """
+    Templates compilados por instrutor (TTL + LRU), por processo.
+
+    `invalidate` é chamado quando o próprio processo altera a agenda; nos
+    demais workers a alteração aparece ao expirar o TTL.
+    """
+
+    def __init__(self, max_size: int = 4096, ttl_seconds: float = 60.0):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[int, Tuple[float, WeeklyTemplate]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, instructor_id: int, loader: Callable[[], WeeklyTemplate]) -> WeeklyTemplate:
+        with self._lock:
+            entry = self._entries.get(instructor_id)
+            if entry is not None and entry[0] >= _time.monotonic():
+                self._entries.move_to_end(instructor_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        template = loader()
+        with self._lock:
+            self._entries[instructor_id] = (_time.monotonic() + self.ttl_seconds, template)
+            self._entries.move_to_end(instructor_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return template
+
+    def invalidate(self, instructor_id: Optional[int] = None) -> None:
+        with self._lock:
+            if instructor_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(instructor_id, None)
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+
+# Instância global (por processo)
+weekly_template_cache = WeeklyTemplateCache(
+    max_size=settings.AVAILABILITY_TEMPLATE_CACHE_SIZE,
+    ttl_seconds=settings.AVAILABILITY_TEMPLATE_TTL_SECONDS,
+)
@@ -96,7 +96,8 @@ class CriarAgendamentoUseCase:
         Raises:
             RideScheduleInPastException: Se a data/hora está no passado.
             InstructorNotFoundException: Se o instrutor não existe.
-            SlotNotAvailableException: Se o horário não está disponível.
+            SlotNotAvailableException: Se o horário não está disponível
+                (inclusive se outra reserva o ocupar antes da gravação).
         """
         # 1. Validação Temporal - Não pode agendar no passado
         now = datetime.now(timezone.utc)
@@ -133,6 +134,8 @@ class CriarAgendamentoUseCase:
         )
         
         # 5. Persistir via Repository
+        # A leitura acima não reserva nada: a garantia contra reserva dupla é do
+        # repositório (constraint no banco), que levanta SlotNotAvailableException.
         created_ride = self._ride_repo.create(ride)
         
         return CriarAgendamentoOutput(ride=created_ride)
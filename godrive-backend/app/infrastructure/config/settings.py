@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, Optional
 
 class Settings(BaseSettings):
     API_V1_STR: str = "/api/v1"
@@ -8,6 +8,17 @@ class Settings(BaseSettings):
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    # Autenticação stateless: o usuário atual é resolvido pelas claims do JWT
+    # (uid, user_type, is_superuser, is_active) sem consultar o banco.
+    # Tokens antigos (apenas 'sub') continuam aceitos via lookup no banco.
+    AUTH_STATELESS: bool = True
+    # Cache (TTL/LRU) da linha de `users` para endpoints que precisam do User completo
+    USER_CACHE_TTL_SECONDS: float = 60.0
+    USER_CACHE_MAX_SIZE: int = 1024
+    # WebSocket das aulas: cache (usuário, aula) -> papel e ticket assinado por aula para reconexões
+    RIDE_ACCESS_CACHE_TTL_SECONDS: float = 300.0
+    RIDE_ACCESS_CACHE_MAX_SIZE: int = 4096
+    RIDE_WS_TICKET_TTL_SECONDS: int = 1800
     
     POSTGRES_USER: str
     POSTGRES_PASSWORD: str
@@ -15,6 +26,57 @@ class Settings(BaseSettings):
     POSTGRES_PORT: str = "5432"
     POSTGRES_DB: str
     DATABASE_URL: str
+    # Opcional: URL explícita para o driver asyncpg.
+    # Se vazio, é derivada de DATABASE_URL (postgresql:// -> postgresql+asyncpg://)
+    ASYNC_DATABASE_URL: Optional[str] = None
+
+    # --- Pool de conexões (aplicado aos engines sync e async) ---
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0   # Segundos esperando uma conexão livre
+    DB_POOL_RECYCLE: int = 1800     # Recicla conexões após N segundos (-1 desativa)
+    # pre-ping custa um round-trip por checkout; com POOL_RECYCLE menor que o
+    # idle timeout do servidor é seguro desativar
+    DB_POOL_PRE_PING: bool = True
+    # Máximo de conexões simultâneas por router (tag). Ex (.env JSON):
+    # DB_ROUTE_BUDGETS='{"instructors": 8, "courses": 4}'
+    DB_ROUTE_BUDGETS: Dict[str, int] = {"instructors": 8}
+
+    # Fuso usado para "dias" da agenda (slots, aulas do dia, calendário).
+    # As aulas são gravadas em timestamptz; o dia é sempre o do fuso do instrutor.
+    DEFAULT_TIMEZONE: str = "America/Sao_Paulo"
+    # Agenda semanal compilada por instrutor (em memória, por processo)
+    AVAILABILITY_TEMPLATE_TTL_SECONDS: float = 60.0
+    AVAILABILITY_TEMPLATE_CACHE_SIZE: int = 4096
+    # Checkout: aula em pending_payment segura o horário por esse tempo (hold no Redis);
+    # depois disso o reaper cancela a aula e o horário volta a ficar livre.
+    SLOT_HOLD_TTL_SECONDS: int = 900
+    PENDING_RIDE_REAPER_SECONDS: float = 60.0
+
+    # --- Índice espacial de instrutores (em memória, por processo) ---
+    # Com o índice pronto, /instructors/search não consulta o PostGIS.
+    INSTRUCTOR_INDEX_ENABLED: bool = True
+    INSTRUCTOR_INDEX_CELL_DEG: float = 0.05          # ~5,5 km por célula
+    INSTRUCTOR_INDEX_REFRESH_SECONDS: float = 30.0   # Recarga periódica a partir do banco
+    INSTRUCTOR_INDEX_MAX_AGE_SECONDS: float = 300.0  # Snapshot mais velho que isso cai no PostGIS
+
+    # --- Cache (Redis) da busca por raio: chave encaixada na grade ---
+    # Usado quando o índice em memória não está pronto.
+    SEARCH_CACHE_CELL_DEG: float = 0.01         # ~1,1 km por célula
+    SEARCH_CACHE_RADIUS_STEP_KM: float = 5.0    # Raio arredondado para cima (5, 10, 15...)
+    SEARCH_CACHE_MAX_RADIUS_KM: float = 50.0    # Acima disso a busca vai direto ao banco
+    # TTL longo: alterações de instrutores invalidam as células via pub/sub (invalidation_bus.py)
+    SEARCH_CACHE_TTL_SECONDS: int = 600
+    SEARCH_CACHE_LOCK_SECONDS: float = 5.0      # Lock do single-flight entre processos
+    SEARCH_CACHE_TILE_DEG: float = 0.5          # Ladrilho do registro de chaves (invalidação por posição)
+
+    # --- Cache (Redis) da grade dos cursos publicados, por versão (sem invalidação) ---
+    COURSE_CURRICULUM_CACHE_TTL_SECONDS: int = 3600
+    # Visões (completa/pública) já montadas por (curso, versão), em memória por processo
+    COURSE_CURRICULUM_LOCAL_CACHE_SIZE: int = 256
+    # Cursos comprados por usuário: SET no Redis + LRU por processo (ver entitlements.py)
+    ENTITLEMENT_CACHE_TTL_SECONDS: int = 3600
+    ENTITLEMENT_LOCAL_CACHE_SIZE: int = 4096
 
     STRIPE_API_KEY: str 
     STRIPE_WEBHOOK_SECRET: str 
@@ -24,6 +86,28 @@ class Settings(BaseSettings):
     # Default para localhost caso rode fora do docker
     REDIS_URL: str = "redis://localhost:6379" 
 
+    # Fan-out das salas de WebSocket entre processos: "redis" ou "memory" (um worker só / testes)
+    SOCKET_BROKER: str = "redis"
+    # Fila de envio por socket: cheia -> descarta a posição mais antiga
+    SOCKET_SEND_QUEUE_SIZE: int = 32
+    # Envio mais lento que isso -> socket removido da sala
+    SOCKET_SEND_TIMEOUT_SECONDS: float = 5.0
+    # Heartbeat: PING após N segundos sem frames do cliente; sem resposta até o timeout -> socket removido
+    SOCKET_HEARTBEAT_SECONDS: float = 20.0
+    SOCKET_IDLE_TIMEOUT_SECONDS: float = 60.0
+    # Presença por aula (quem está online / last_seen) guardada no Redis por esse tempo
+    PRESENCE_RETENTION_SECONDS: int = 86400
+
+    # Rastreamento adaptativo: intervalo recomendado ao cliente por modo
+    TRACKING_MOVING_INTERVAL_SECONDS: float = 5.0
+    TRACKING_STOPPED_INTERVAL_SECONDS: float = 30.0
+    # Em movimento: velocidade do GPS acima disso, ou (sem velocidade) deslocamento desde o último envio
+    TRACKING_MOVING_SPEED_MPS: float = 1.5          # ~5 km/h
+    TRACKING_MOVING_DISPLACEMENT_M: float = 15.0
+    # Gravação do trajeto: flush em lote no banco a cada N segundos ou N pontos por remetente
+    TRACK_FLUSH_SECONDS: float = 10.0
+    TRACK_FLUSH_POINTS: int = 100
+
     class Config:
         env_file = ".env"
         case_sensitive = True
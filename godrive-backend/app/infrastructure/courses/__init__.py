@@ -0,0 +1,15 @@
+# Infrastructure Courses
+# Caches do LMS (grade dos cursos publicados e cursos comprados por usuário).
+
+from .curriculum_views import CurriculumViews
+from .curriculum_cache import CurriculumCache, curriculum_cache, curriculum_dict
+from .entitlements import EntitlementService, entitlements
+
+__all__ = [
+    "CurriculumViews",
+    "CurriculumCache",
+    "curriculum_cache",
+    "curriculum_dict",
+    "EntitlementService",
+    "entitlements",
+]
@@ -0,0 +1,205 @@
+"""
+Curriculum Cache
+
+Grade dos cursos publicados (curso + módulos + aulas) cacheada no Redis por versão.
+
+A chave inclui `courses.curriculum_version`, incrementada na mesma transação
+que adiciona um módulo ou uma aula. Uma versão nova nunca encontra a grade
+antiga no cache, então não há invalidação: as versões velhas só expiram pelo
+TTL. Como a versão é lida antes da grade, o valor gravado numa chave é sempre
+pelo menos tão novo quanto ela.
+
+Custo por requisição, independente da quantidade de aulas:
+- Página do curso: uma consulta pela PK (publicado + versão) e um GET.
+- Catálogo: uma consulta com (id, versão) da página e um MGET; só os cursos
+  em falta são carregados, todos juntos (selectinload, três consultas).
+
+Na frente do Redis há um LRU por processo com as visões já montadas e
+imutáveis de cada (curso, versão) (ver curriculum_views.py): a mesma versão
+é decodificada uma vez por processo e compartilhada por todos os usuários.
+
+Rascunhos (is_published = False) não são cacheados: vão direto ao banco.
+Sem Redis (não inicializado ou fora do ar) o que não está no LRU vai ao banco.
+"""
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.infrastructure.config.settings import settings
+from app.infrastructure.courses.curriculum_views import CurriculumViews
+from app.infrastructure.repositories.course_repository import AsyncCourseRepository
+
+KEY_PREFIX = "godrive-cache:course:curriculum"
+
+
+def curriculum_dict(course) -> Dict[str, Any]:
+    """Curso com a grade carregada -> dict serializável (mesmos campos do CourseResponse)."""
+    return {
+        "id": course.id,
+        "title": course.title,
+        "description": course.description,
+        "price": course.price,
+        "cover_image_url": course.cover_image_url,
+        "is_published": bool(course.is_published),
+        "created_at": course.created_at.isoformat() if course.created_at else None,
+        "curriculum_version": course.curriculum_version,
+        "modules": [
+            {
+                "id": module.id,
+                "course_id": module.course_id,
+                "title": module.title,
+                "order": module.order,
+                "lessons": [
+                    {
+                        "id": lesson.id,
+                        "module_id": lesson.module_id,
+                        "title": lesson.title,
+                        "video_url": lesson.video_url,
+                        "duration_seconds": lesson.duration_seconds,
+                        "description": lesson.description,
+                        "order": lesson.order,
+                    }
+                    for lesson in module.lessons
+                ],
+            }
+            for module in course.modules
+        ],
+    }
+
+
+class CurriculumCache:
+    """Grade publicada por (curso, versão): LRU local de visões + Redis."""
+
+    def __init__(self, ttl_seconds: int = 3600, local_size: int = 256):
+        self.ttl_seconds = ttl_seconds
+        self.local_size = local_size
+        self._redis = None
+        self._repo = AsyncCourseRepository()
+        self._local: "OrderedDict[Tuple[int, int], CurriculumViews]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"local_hits": 0, "hits": 0, "misses": 0, "bypass": 0, "errors": 0}
+
+    def init(self, redis) -> None:
+        """Configura o cliente Redis (asyncio). Chamado no lifespan da aplicação."""
+        self._redis = redis
+
+    def key_for(self, course_id: int, version: int) -> str:
+        # Ex: godrive-cache:course:curriculum:12:v3
+        return f"{KEY_PREFIX}:{course_id}:v{version}"
+
+    async def get_views(self, db, course_id: int) -> Optional[CurriculumViews]:
+        """Visões da grade do curso, ou None se não existir."""
+        head = await self._repo.get_head(db, course_id)
+        if head is None:
+            return None
+        if not head.is_published:
+            self._stats["bypass"] += 1
+            course = await self._repo.get_by_id(db, course_id)
+            return CurriculumViews(curriculum_dict(course)) if course else None
+        return (await self._resolve(db, [head])).get(course_id)
+
+    async def list_published(self, db, skip: int = 0, limit: int = 100) -> List[CurriculumViews]:
+        """Página do catálogo (cursos publicados), na ordem do repositório."""
+        heads = await self._repo.list_heads(db, skip=skip, limit=limit, published_only=True)
+        found = await self._resolve(db, heads)
+        return [found[head.id] for head in heads if head.id in found]
+
+    async def _resolve(self, db, heads) -> Dict[int, CurriculumViews]:
+        """(id, versão) -> visões: LRU local, depois Redis (MGET), depois banco (uma carga)."""
+        found: Dict[int, CurriculumViews] = {}
+        pending = []
+        for head in heads:
+            views = self._local_get(head.id, head.curriculum_version)
+            if views is None:
+                pending.append(head)
+            else:
+                found[head.id] = views
+        self._stats["local_hits"] += len(found)
+        if not pending:
+            return found
+
+        loaded: Dict[int, Dict[str, Any]] = {}
+        missing: Dict[int, Optional[str]] = {}
+        if self._redis is None:
+            self._stats["bypass"] += 1
+            missing = {head.id: None for head in pending}
+        else:
+            keys = [self.key_for(head.id, head.curriculum_version) for head in pending]
+            for head, key, cached in zip(pending, keys, await self._mget(keys)):
+                if cached is None:
+                    missing[head.id] = key
+                else:
+                    loaded[head.id] = json.loads(cached)
+            self._stats["hits"] += len(loaded)
+            self._stats["misses"] += len(missing)
+
+        if missing:
+            fresh = await self._load(db, missing)
+            if self._redis is not None:
+                await self._store({missing[course_id]: data for course_id, data in fresh.items()})
+            loaded.update(fresh)
+
+        for course_id, data in loaded.items():
+            views = CurriculumViews(data)
+            self._local_set(views)
+            found[course_id] = views
+        return found
+
+    def _local_get(self, course_id: int, version: int) -> Optional[CurriculumViews]:
+        with self._lock:
+            views = self._local.get((course_id, version))
+            if views is not None:
+                self._local.move_to_end((course_id, version))
+            return views
+
+    def _local_set(self, views: CurriculumViews) -> None:
+        # Gravada com a versão lida do banco (>= a da chave): nunca mais velha que a chave
+        key = (views.course_id, views.version)
+        with self._lock:
+            self._local[key] = views
+            self._local.move_to_end(key)
+            while len(self._local) > self.local_size:
+                self._local.popitem(last=False)
+
+    async def _load(self, db, course_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        courses = await self._repo.get_many(db, course_ids)
+        return {course.id: curriculum_dict(course) for course in courses}
+
+    async def _mget(self, keys: List[str]) -> List[Optional[str]]:
+        try:
+            return await self._redis.mget(keys)
+        except Exception:
+            # Redis fora do ar: trata como miss (não derruba a página)
+            self._stats["errors"] += 1
+            return [None] * len(keys)
+
+    async def _store(self, values: Dict[str, Dict[str, Any]]) -> None:
+        if not values:
+            return
+        try:
+            pipe = self._redis.pipeline(transaction=False)
+            for key, data in values.items():
+                pipe.set(key, json.dumps(data, separators=(",", ":")), ex=self.ttl_seconds)
+            await pipe.execute()
+        except Exception as e:
+            self._stats["errors"] += 1
+            print(f"⚠️ Falha ao gravar a grade dos cursos no cache: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            local_entries = len(self._local)
+        return {
+            **self._stats,
+            "enabled": self._redis is not None,
+            "ttl_seconds": self.ttl_seconds,
+            "local_entries": local_entries,
+            "local_size": self.local_size,
+        }
+
+
+# Instância global (por processo)
+curriculum_cache = CurriculumCache(
+    ttl_seconds=settings.COURSE_CURRICULUM_CACHE_TTL_SECONDS,
+    local_size=settings.COURSE_CURRICULUM_LOCAL_CACHE_SIZE,
+)
@@ -0,0 +1,55 @@
+"""
+Curriculum Views
+
+Projeção da grade por tipo de visitante, sem tocar nos objetos do ORM.
+
+A partir de uma grade (dict de `curriculum_dict`) são montadas, uma única vez
+por (curso, versão), duas visões imutáveis e compartilhadas entre requisições
+e usuários:
+
+- `full`: com os links dos vídeos (matriculados e admins).
+- `public`: `video_url = None` em todas as aulas (DRM light).
+
+As visões são congeladas (MappingProxyType + tuplas): um código que tente
+alterá-las falha na hora, em vez de vazar o link para o próximo usuário. O
+response_model (pydantic) valida Mappings normalmente.
+"""
+from types import MappingProxyType
+from typing import Any, Dict, Mapping
+
+
+def freeze(value: Any) -> Any:
+    """Cópia somente leitura (dict -> MappingProxyType, list -> tuple), recursiva."""
+    if isinstance(value, Mapping):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def _public_dict(data: Mapping[str, Any]) -> Dict[str, Any]:
+    return {
+        **data,
+        "modules": [
+            {
+                **module,
+                "lessons": [{**lesson, "video_url": None} for lesson in module["lessons"]],
+            }
+            for module in data["modules"]
+        ],
+    }
+
+
+class CurriculumViews:
+    """Visões (completa e pública) de uma versão da grade de um curso."""
+    __slots__ = ("course_id", "version", "full", "public")
+
+    def __init__(self, data: Mapping[str, Any]):
+        self.course_id: int = data["id"]
+        self.version: int = data.get("curriculum_version") or 0
+        self.full: Mapping[str, Any] = freeze(data)
+        self.public: Mapping[str, Any] = freeze(_public_dict(data))
+
+    def for_viewer(self, can_watch: bool) -> Mapping[str, Any]:
+        """Visão do visitante: `can_watch` = matriculado ou admin."""
+        return self.full if can_watch else self.public
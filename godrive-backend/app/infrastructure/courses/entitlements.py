@@ -0,0 +1,247 @@
+"""
+Entitlements
+
+Quais cursos cada usuário comprou, sem consultar `enrollments` a cada página.
+
+- Redis: um SET por usuário (`godrive:entitlements:{user_id}`) com os ids dos
+  cursos e o membro `COMPLETE`, que marca o conjunto como carregado do banco
+  (e mantém a chave de quem não comprou nada). Um SET sem o marcador é só um
+  acréscimo parcial: quem lê recarrega do banco e faz a união.
+- Processo: LRU de user_id -> cursos já confirmados.
+
+As matrículas só são criadas (não há cancelamento/estorno), então o conjunto
+só cresce e todas as escritas são uniões (SADD):
+- Um "possui" nunca fica velho: o cache local responde sem ir ao Redis.
+- Na checagem em lote (`owned`, catálogo) um "não possui" vem do Redis.
+- Na checagem de um curso (`has`, página do curso, pagamento, webhook) um
+  "não possui" é confirmado pela PK de `uq_enrollment_user_course`: um SET
+  desatualizado nunca esconde de um aluno pagante o curso que ele comprou.
+- `grant` (chamado pelo `enroll_user` após o commit) faz SADD do curso; uma
+  carga concorrente que leu o banco antes da matrícula não consegue apagá-lo.
+  Se o SADD falhar, a chave é apagada (a próxima leitura recarrega do banco).
+
+Sem Redis (não inicializado ou fora do ar) as confirmações vão ao banco.
+Se um dia existir cancelamento de matrícula, ele precisa remover o curso do
+SET e dos LRUs de todos os processos (ex: pub/sub).
+"""
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Iterable, Optional, Set
+
+import redis
+
+from app.infrastructure.config.settings import settings
+
+KEY_PREFIX = "godrive:entitlements"
+# Ids de curso começam em 1: "0" nunca colide com um curso
+COMPLETE = "0"
+
+
+def entitlement_key(user_id: int) -> str:
+    return f"{KEY_PREFIX}:{user_id}"
+
+
+def _complete_ids(members) -> Optional[Set[int]]:
+    """Cursos do SET, ou None se ele não foi carregado do banco (sem o marcador)."""
+    if COMPLETE not in members:
+        return None
+    return {int(member) for member in members if member != COMPLETE}
+
+
+class EntitlementService:
+    """Cursos comprados por usuário: LRU local (só cresce) + SET no Redis."""
+
+    def __init__(self, redis_url: str, ttl_seconds: int = 3600, local_size: int = 4096):
+        self.redis_url = redis_url
+        self.ttl_seconds = ttl_seconds
+        self.local_size = local_size
+        self._redis = None
+        self._client: Optional[redis.Redis] = None
+        self._local: "OrderedDict[int, Set[int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {
+            "local_hits": 0, "redis_hits": 0, "db_loads": 0, "db_confirms": 0,
+            "repaired": 0, "grants": 0, "errors": 0,
+        }
+
+    def init(self, redis_client) -> None:
+        """Configura o cliente Redis (asyncio). Chamado no lifespan da aplicação."""
+        self._redis = redis_client
+
+    def _sync_client(self) -> redis.Redis:
+        if self._client is None:
+            # Timeouts curtos: usado dentro de requisições `def` (threadpool)
+            self._client = redis.Redis.from_url(
+                self.redis_url,
+                decode_responses=True,
+                socket_timeout=2,
+                socket_connect_timeout=2,
+            )
+        return self._client
+
+    # --- Cache local ---
+
+    def _local_get(self, user_id: int) -> Set[int]:
+        with self._lock:
+            owned = self._local.get(user_id)
+            if owned is None:
+                return set()
+            self._local.move_to_end(user_id)
+            return set(owned)
+
+    def _local_add(self, user_id: int, course_ids: Iterable[int]) -> Set[int]:
+        with self._lock:
+            owned = self._local.setdefault(user_id, set())
+            owned.update(course_ids)
+            self._local.move_to_end(user_id)
+            while len(self._local) > self.local_size:
+                self._local.popitem(last=False)
+            return set(owned)
+
+    def _known(self, user_id: int, wanted: Set[int]) -> bool:
+        if wanted <= self._local_get(user_id):
+            self._stats["local_hits"] += 1
+            return True
+        return False
+
+    # --- Consulta (endpoints async) ---
+
+    async def owned(self, db, user_id: int, course_ids: Iterable[int]) -> Set[int]:
+        """Quais destes cursos o usuário possui (checagem em lote, ex: página do catálogo)."""
+        wanted = set(course_ids)
+        if not wanted or self._known(user_id, wanted):
+            return wanted
+        return wanted & await self._refresh(db, user_id)
+
+    async def has(self, db, user_id: int, course_id: int) -> bool:
+        if course_id in await self.owned(db, user_id, (course_id,)):
+            return True
+        # Import tardio: course_repository chama `grant` (evita ciclo no import)
+        from app.infrastructure.repositories.course_repository import AsyncCourseRepository
+
+        self._stats["db_confirms"] += 1
+        if not await AsyncCourseRepository().is_enrolled(db, user_id, course_id):
+            return False
+        # Cache desatualizado (ex: SADD perdido): corrige para as próximas leituras
+        self._stats["repaired"] += 1
+        await self.grant_async(user_id, course_id)
+        return True
+
+    async def _refresh(self, db, user_id: int) -> Set[int]:
+        key = entitlement_key(user_id)
+        owned = None
+        if self._redis is not None:
+            try:
+                owned = _complete_ids(await self._redis.smembers(key))
+            except Exception:
+                self._stats["errors"] += 1
+        if owned is not None:
+            self._stats["redis_hits"] += 1
+            return self._local_add(user_id, owned)
+
+        # Import tardio: course_repository chama `grant` (evita ciclo no import)
+        from app.infrastructure.repositories.course_repository import AsyncCourseRepository
+
+        owned = await AsyncCourseRepository().get_enrolled_course_ids(db, user_id)
+        self._stats["db_loads"] += 1
+        if self._redis is not None:
+            try:
+                pipe = self._redis.pipeline(transaction=False)
+                pipe.sadd(key, COMPLETE, *owned)
+                pipe.expire(key, self.ttl_seconds)
+                await pipe.execute()
+            except Exception as e:
+                self._stats["errors"] += 1
+                print(f"⚠️ Falha ao gravar as matrículas do usuário {user_id} no cache: {e}")
+        return self._local_add(user_id, owned)
+
+    # --- Consulta (endpoints `def`, cliente síncrono) ---
+
+    def owned_sync(self, db, user_id: int, course_ids: Iterable[int]) -> Set[int]:
+        wanted = set(course_ids)
+        if not wanted or self._known(user_id, wanted):
+            return wanted
+        return wanted & self._refresh_sync(db, user_id)
+
+    def has_sync(self, db, user_id: int, course_id: int) -> bool:
+        if course_id in self.owned_sync(db, user_id, (course_id,)):
+            return True
+        from app.infrastructure.repositories.course_repository import CourseRepository
+
+        self._stats["db_confirms"] += 1
+        if not CourseRepository().is_enrolled(db, user_id, course_id):
+            return False
+        self._stats["repaired"] += 1
+        self.grant(user_id, course_id)
+        return True
+
+    def _refresh_sync(self, db, user_id: int) -> Set[int]:
+        key = entitlement_key(user_id)
+        owned = None
+        try:
+            owned = _complete_ids(self._sync_client().smembers(key))
+        except Exception:
+            self._stats["errors"] += 1
+        if owned is not None:
+            self._stats["redis_hits"] += 1
+            return self._local_add(user_id, owned)
+
+        from app.infrastructure.repositories.course_repository import CourseRepository
+
+        owned = CourseRepository().get_enrolled_course_ids(db, user_id)
+        self._stats["db_loads"] += 1
+        try:
+            pipe = self._sync_client().pipeline(transaction=False)
+            pipe.sadd(key, COMPLETE, *owned)
+            pipe.expire(key, self.ttl_seconds)
+            pipe.execute()
+        except Exception as e:
+            self._stats["errors"] += 1
+            print(f"⚠️ Falha ao gravar as matrículas do usuário {user_id} no cache: {e}")
+        return self._local_add(user_id, owned)
+
+    # --- Nova matrícula (após o commit) ---
+
+    def grant(self, user_id: int, course_id: int) -> None:
+        """Acrescenta o curso ao cache do usuário. Falhas no Redis não derrubam a matrícula."""
+        self._local_add(user_id, (course_id,))
+        self._stats["grants"] += 1
+        key = entitlement_key(user_id)
+        try:
+            pipe = self._sync_client().pipeline(transaction=False)
+            pipe.sadd(key, course_id)
+            pipe.expire(key, self.ttl_seconds)
+            pipe.execute()
+        except Exception as e:
+            self._stats["errors"] += 1
+            print(f"⚠️ Falha ao registrar a matrícula do usuário {user_id} no curso {course_id} no cache: {e}")
+            # Sem o curso, o SET "completo" diria "não possui" até o TTL: descarta a chave
+            try:
+                self._sync_client().delete(key)
+            except Exception:
+                # Redis fora do ar: `has` ainda confirma no banco
+                self._stats["errors"] += 1
+
+    async def grant_async(self, user_id: int, course_id: int) -> None:
+        """Versão para código assíncrono (não bloqueia o event loop)."""
+        await asyncio.to_thread(self.grant, user_id, course_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            local_users = len(self._local)
+        return {
+            **self._stats,
+            "enabled": self._redis is not None,
+            "ttl_seconds": self.ttl_seconds,
+            "local_users": local_users,
+            "local_size": self.local_size,
+        }
+
+
+# Instância global (por processo)
+entitlements = EntitlementService(
+    settings.REDIS_URL,
+    ttl_seconds=settings.ENTITLEMENT_CACHE_TTL_SECONDS,
+    local_size=settings.ENTITLEMENT_LOCAL_CACHE_SIZE,
+)
@@ -3,7 +3,9 @@ from .user import User
 from .instructor import InstructorProfile
 from .availability import Availability
 from .ride import Ride
+from .ride_track import RideTrack
 from .review import Review
+from .rating_summary import RatingSummary
 from .course import Course, Module, Lesson, Enrollment
 from .quiz import Quiz, Question, QuestionOption, UserQuizAttempt
 
@@ -12,7 +14,9 @@ __all__ = [
     "InstructorProfile",
     "Availability",
     "Ride",
+    "RideTrack",
     "Review",
+    "RatingSummary",
     "Course",
     "Module",
     "Lesson",
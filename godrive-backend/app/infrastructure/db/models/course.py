@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Float, Boolean, Text, UniqueConstraint
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Float, Boolean, Text, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.infrastructure.db.base import Base
@@ -12,12 +12,17 @@ class Course(Base):
     price = Column(Float, nullable=False, default=0.0)
     cover_image_url = Column(String, nullable=True)
     is_published = Column(Boolean, default=False) # Rascunho ou Publicado
+    # Incrementada a cada alteração da grade (módulos/aulas): compõe a chave do cache da grade
+    curriculum_version = Column(Integer, nullable=False, default=1, server_default="1")
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     # Relacionamentos
-    modules = relationship("Module", backref="course", cascade="all, delete-orphan")
+    modules = relationship(
+        "Module", backref="course", cascade="all, delete-orphan",
+        order_by="(Module.order, Module.id)",
+    )
     enrollments = relationship("Enrollment", backref="course")
 
 
@@ -30,7 +35,15 @@ class Module(Base):
     order = Column(Integer, default=0) # Para ordenar 1, 2, 3...
 
     # Relacionamentos
-    lessons = relationship("Lesson", backref="module", cascade="all, delete-orphan")
+    lessons = relationship(
+        "Lesson", backref="module", cascade="all, delete-orphan",
+        order_by="(Lesson.order, Lesson.id)",
+    )
+
+    # selectinload da grade: WHERE course_id IN (...) já na ordem de exibição
+    __table_args__ = (
+        Index("ix_course_modules_course_id_order", "course_id", "order"),
+    )
 
 
 class Lesson(Base):
@@ -44,6 +57,10 @@ class Lesson(Base):
     description = Column(Text, nullable=True)
     order = Column(Integer, default=0)
 
+    __table_args__ = (
+        Index("ix_course_lessons_module_id_order", "module_id", "order"),
+    )
+
 
 class Enrollment(Base):
     __tablename__ = "enrollments"
@@ -1,6 +1,6 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Float, Text, Enum
+from sqlalchemy import Column, Computed, Integer, String, ForeignKey, Float, Text, Enum
 from sqlalchemy.orm import relationship
-from geoalchemy2 import Geometry
+from geoalchemy2 import Geometry, Geography
 from app.infrastructure.db.base import Base
 import enum
 
@@ -23,6 +23,13 @@ class InstructorProfile(Base):
     
     # Geometry('POINT', srid=4326) armazena coordenadas GPS (Lat/Lon)
     location = Column(Geometry(geometry_type='POINT', srid=4326), nullable=True)
+    # Cópia em geography gerada pelo banco (migração a3c9e1d4b7f2), com índice GiST próprio.
+    # Use esta coluna em ST_DWithin/ST_Distance em metros: o cast de 'location' não usa índice.
+    location_geog = Column(
+        Geography(geometry_type='POINT', srid=4326, spatial_index=False),
+        Computed("location::geography", persisted=True),
+        nullable=True
+    )
 
     # --- CORREÇÃO AQUI ---
     # Adicionamos 'values_callable' para garantir que o SQLAlchemy use "pending" e não "PENDING"
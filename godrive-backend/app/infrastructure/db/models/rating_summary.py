@@ -0,0 +1,33 @@
+from sqlalchemy import Column, Integer, ForeignKey, DateTime
+from sqlalchemy.sql import func
+from app.infrastructure.db.base import Base
+
+class RatingSummary(Base):
+    """
+    Agregado das avaliações recebidas por um usuário (instrutor ou aluno).
+    Mantido na mesma transação do INSERT em reviews (ver ReviewRepository.create),
+    para que busca e perfis não precisem de AVG/COUNT sobre reviews.
+    """
+    __tablename__ = "rating_summaries"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+
+    rating_count = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_sum = Column(Integer, nullable=False, default=0, server_default="0")
+
+    # Histograma de notas (1 a 5)
+    count_1 = Column(Integer, nullable=False, default=0, server_default="0")
+    count_2 = Column(Integer, nullable=False, default=0, server_default="0")
+    count_3 = Column(Integer, nullable=False, default=0, server_default="0")
+    count_4 = Column(Integer, nullable=False, default=0, server_default="0")
+    count_5 = Column(Integer, nullable=False, default=0, server_default="0")
+
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    @property
+    def average(self):
+        return self.rating_sum / self.rating_count if self.rating_count else None
+
+    @property
+    def histogram(self):
+        return {star: getattr(self, f"count_{star}") for star in range(1, 6)}
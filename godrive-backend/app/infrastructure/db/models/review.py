@@ -1,5 +1,5 @@
 # app/models/review.py
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, UniqueConstraint
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.infrastructure.db.base import Base
@@ -30,4 +30,6 @@ class Review(Base):
     # Regra de Banco: Um usuário só pode avaliar uma aula UMA vez
     __table_args__ = (
         UniqueConstraint('ride_id', 'reviewer_id', name='uq_review_ride_reviewer'),
+        # Avaliações recebidas por um usuário, mais recentes primeiro
+        Index('ix_reviews_reviewee_id_created_at', 'reviewee_id', 'created_at'),
     )
\ No newline at end of file
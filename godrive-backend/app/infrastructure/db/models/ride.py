@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Float, Enum
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Float, Enum, Index, FetchedValue, text
+from sqlalchemy.dialects.postgresql import ExcludeConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
@@ -13,6 +14,41 @@ class RideStatus(str, enum.Enum):
 
 class Ride(Base):
     __tablename__ = "rides"
+    __table_args__ = (
+        # Agenda do instrutor por intervalo de tempo (slots, calendário, aulas do dia).
+        # INCLUDE (status) permite filtrar canceladas sem visitar a tabela.
+        Index(
+            "ix_rides_instructor_id_scheduled_at",
+            "instructor_id",
+            "scheduled_at",
+            postgresql_include=["status"],
+        ),
+        # Histórico do aluno (GET /rides), paginado por (scheduled_at, id).
+        # O do instrutor usa o índice (instructor_id, scheduled_at) acima.
+        Index("ix_rides_student_id_scheduled_at_id", "student_id", "scheduled_at", "id"),
+        # Aulas concluídas por participante (avaliações pendentes e recálculo de
+        # users.pending_review_count): índices parciais, só as concluídas.
+        Index(
+            "ix_rides_student_id_completed",
+            "student_id",
+            postgresql_where=text("status = 'completed'"),
+        ),
+        Index(
+            "ix_rides_instructor_id_completed",
+            "instructor_id",
+            postgresql_where=text("status = 'completed'"),
+        ),
+        # Reserva no banco: aulas não canceladas do mesmo instrutor não podem se
+        # sobrepor. Duas reservas concorrentes do mesmo horário -> a segunda falha
+        # com exclusion_violation (23P01); instrutores diferentes não se bloqueiam.
+        ExcludeConstraint(
+            (text("instructor_id"), "="),
+            (text("tstzrange(scheduled_at, ends_at, '[)')"), "&&"),
+            name="ex_rides_instructor_no_overlap",
+            using="gist",
+            where=text("status IS DISTINCT FROM 'cancelled'"),
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     
@@ -23,6 +59,12 @@ class Ride(Base):
     # Detalhes do Agendamento
     scheduled_at = Column(DateTime(timezone=True), nullable=False) # Data e Hora de início
     duration_minutes = Column(Integer, default=50) # Aula padrão de 50min
+    # scheduled_at + duration_minutes, mantido por trigger (usado na exclusion constraint)
+    ends_at = Column(DateTime(timezone=True), server_default=FetchedValue(), server_onupdate=FetchedValue())
+    
+    # Ponto de encontro (colunas criadas em 61cdd3387525_add_pickup_location_to_rides)
+    pickup_latitude = Column(Float, nullable=True)
+    pickup_longitude = Column(Float, nullable=True)
     
     # Financeiro
     price = Column(Float, nullable=False) # Valor cobrado na época
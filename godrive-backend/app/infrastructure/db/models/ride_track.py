@@ -0,0 +1,31 @@
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, LargeBinary, UniqueConstraint
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from app.infrastructure.db.base import Base
+
+class RideTrack(Base):
+    """
+    Trajeto GPS de um participante (aluno ou instrutor) em uma aula.
+    Os pontos ficam num único blob comprimido (ver tracking/track_codec.py),
+    não uma linha por ponto.
+    """
+    __tablename__ = "ride_tracks"
+
+    id = Column(Integer, primary_key=True, index=True)
+    ride_id = Column(Integer, ForeignKey("rides.id", ondelete="CASCADE"), nullable=False)
+    sender_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+
+    # Primeiro e último ponto (os tempos no blob são relativos a started_at)
+    started_at = Column(DateTime(timezone=True), nullable=False)
+    ended_at = Column(DateTime(timezone=True), nullable=False)
+    point_count = Column(Integer, nullable=False, default=0)
+    data = Column(LargeBinary, nullable=False)
+
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    ride = relationship("Ride", backref="tracks")
+
+    # Um trajeto por participante da aula (novos pontos são anexados ao mesmo blob)
+    __table_args__ = (
+        UniqueConstraint('ride_id', 'sender_id', name='uq_ride_track_ride_sender'),
+    )
@@ -16,6 +16,10 @@ class User(Base):
     
     is_active = Column(Boolean(), default=True)
     is_superuser = Column(Boolean(), default=False)
+
+    # Aulas concluídas que o usuário ainda não avaliou. Mantido junto com as
+    # escritas (aula concluída +1, avaliação criada -1): /users/me só lê o contador.
+    pending_review_count = Column(Integer, nullable=False, default=0, server_default="0")
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -0,0 +1,296 @@
+"""
+Pool Metrics
+
+Instrumentação do pool de conexões do SQLAlchemy e orçamento (budget)
+de conexões por router.
+
+- Histograma de latência de checkout (tempo até a sessão obter uma conexão),
+  registrado só quando o pool está esgotado e a requisição espera na fila;
+  checkouts imediatos apenas são contados.
+- Profundidade da fila de espera (requisições aguardando conexão/budget).
+- Budget por router: limita quantas conexões simultâneas um grupo de rotas
+  (identificado pela tag do router, ex: "instructors") pode segurar, para que
+  a busca não esgote o pool usado por `/payments/webhook`.
+"""
+import asyncio
+import threading
+import time
+from bisect import bisect_left
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Dict, Iterator, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Limites superiores (ms) dos buckets do histograma; o último bucket é +Inf
+DEFAULT_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# Chave usada quando a rota não possui tag (ex: health check)
+DEFAULT_ROUTE = "default"
+
+
+class ConnectionBudgetExceeded(Exception):
+    """Tempo de espera por uma vaga no budget de conexões do router esgotado."""
+
+    def __init__(self, route: str, timeout: float):
+        self.route = route
+        self.timeout = timeout
+        super().__init__(
+            f"Budget de conexões do router '{route}' esgotado após {timeout}s de espera."
+        )
+
+
+class LatencyHistogram:
+    """Histograma cumulativo simples (estilo Prometheus) em milissegundos."""
+
+    def __init__(self, buckets_ms: tuple = DEFAULT_BUCKETS_MS):
+        self._bounds = tuple(buckets_ms)
+        self._counts: List[int] = [0] * (len(self._bounds) + 1)
+        self._sum_ms = 0.0
+        self._count = 0
+        self._max_ms = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value_ms: float) -> None:
+        idx = bisect_left(self._bounds, value_ms)
+        with self._lock:
+            self._counts[idx] += 1
+            self._sum_ms += value_ms
+            self._count += 1
+            if value_ms > self._max_ms:
+                self._max_ms = value_ms
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counts = list(self._counts)
+            total, sum_ms, max_ms = self._count, self._sum_ms, self._max_ms
+
+        cumulative, buckets = 0, {}
+        for bound, count in zip(self._bounds + ("+Inf",), counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+
+        return {
+            "count": total,
+            "sum_ms": round(sum_ms, 3),
+            "avg_ms": round(sum_ms / total, 3) if total else 0.0,
+            "max_ms": round(max_ms, 3),
+            "buckets": buckets,
+        }
+
+
+class PoolMonitor:
+    """
+    Coleta métricas de um Engine (sync ou async) e aplica budgets por router.
+
+    Uso:
+        monitor = PoolMonitor("async", budgets={"instructors": 8})
+        monitor.attach(async_engine.sync_engine)
+
+        async with monitor.route_slot("instructors", timeout=30):
+            with monitor.track_checkout("instructors"):
+                await session.connection()
+
+    Em deps.py os dois blocos rodam no primeiro checkout da sessão da requisição
+    (ver LazyCheckoutSession), não ao criar a sessão.
+    """
+
+    def __init__(self, name: str, budgets: Optional[Dict[str, int]] = None, max_overflow: int = 0):
+        self.name = name
+        self.budgets: Dict[str, int] = dict(budgets or {})
+        # Mesmo max_overflow do engine: define quando o pool está esgotado
+        self.max_overflow = max_overflow
+        self._engine: Optional[Engine] = None
+        self._lock = threading.Lock()
+
+        self.checkout_latency = LatencyHistogram()
+        self._route_latency: Dict[str, LatencyHistogram] = {}
+
+        # Contadores de eventos do pool
+        self._events: Dict[str, int] = {"connect": 0, "checkout": 0, "checkin": 0, "invalidate": 0}
+        self._waiting = 0
+        self._peak_waiting = 0
+        self._in_use: Dict[str, int] = {}
+        self._rejected: Dict[str, int] = {}
+        self._checkouts: Dict[str, int] = {"immediate": 0, "waited": 0}
+
+        # Semáforos criados sob demanda (asyncio para o stack async, threading para o sync)
+        self._async_slots: Dict[str, asyncio.Semaphore] = {}
+        self._sync_slots: Dict[str, threading.BoundedSemaphore] = {}
+
+    # --- Eventos do SQLAlchemy ---
+
+    def attach(self, engine: Engine) -> None:
+        """Registra os listeners de pool no Engine (use `async_engine.sync_engine` no async)."""
+        self._engine = engine
+        for name in self._events:
+            event.listen(engine, name, self._make_listener(name))
+
+    def _make_listener(self, name: str):
+        def _listener(*_args) -> None:
+            with self._lock:
+                self._events[name] += 1
+        return _listener
+
+    # --- Latência de checkout ---
+
+    def observe_checkout(self, route: str, seconds: float) -> None:
+        value_ms = seconds * 1000
+        self.checkout_latency.observe(value_ms)
+        with self._lock:
+            hist = self._route_latency.get(route)
+            if hist is None:
+                hist = self._route_latency[route] = LatencyHistogram()
+        hist.observe(value_ms)
+
+    def _pool_exhausted(self) -> bool:
+        """Sem conexão ociosa nem vaga de overflow: o próximo checkout espera na fila."""
+        pool = self._engine.pool if self._engine is not None else None
+        if pool is None or not hasattr(pool, "checkedin"):
+            return True  # Pool sem contadores: mede sempre
+        if self.max_overflow < 0:
+            return False  # Overflow ilimitado: nunca espera
+        return pool.checkedin() == 0 and pool.overflow() >= self.max_overflow
+
+    @contextmanager
+    def track_checkout(self, route: str) -> Iterator[None]:
+        """
+        Mede o checkout do bloco e o conta na fila de espera, se o pool estiver
+        esgotado. Com conexão livre o checkout é imediato: só entra no contador.
+        """
+        if not self._pool_exhausted():
+            with self._lock:
+                self._checkouts["immediate"] += 1
+            yield
+            return
+
+        with self._lock:
+            self._checkouts["waited"] += 1
+        self._enter_wait()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._leave_wait()
+            self.observe_checkout(route, time.perf_counter() - started)
+
+    # --- Budgets por router ---
+
+    def _enter_wait(self) -> None:
+        with self._lock:
+            self._waiting += 1
+            self._peak_waiting = max(self._peak_waiting, self._waiting)
+
+    def _leave_wait(self) -> None:
+        with self._lock:
+            self._waiting -= 1
+
+    def _track_in_use(self, route: str, delta: int) -> None:
+        with self._lock:
+            self._in_use[route] = self._in_use.get(route, 0) + delta
+
+    def _reject(self, route: str, timeout: float) -> ConnectionBudgetExceeded:
+        with self._lock:
+            self._rejected[route] = self._rejected.get(route, 0) + 1
+        return ConnectionBudgetExceeded(route, timeout)
+
+    @asynccontextmanager
+    async def route_slot(self, route: str, timeout: float) -> AsyncIterator[None]:
+        """Reserva uma vaga no budget do router (no-op se o router não tem budget)."""
+        limit = self.budgets.get(route)
+        semaphore = None
+        if limit:
+            semaphore = self._async_slots.get(route)
+            if semaphore is None:
+                semaphore = self._async_slots[route] = asyncio.Semaphore(limit)
+
+            self._enter_wait()
+            try:
+                await asyncio.wait_for(semaphore.acquire(), timeout=timeout)
+            except asyncio.TimeoutError:
+                raise self._reject(route, timeout)
+            finally:
+                self._leave_wait()
+
+        self._track_in_use(route, 1)
+        try:
+            yield
+        finally:
+            self._track_in_use(route, -1)
+            if semaphore is not None:
+                semaphore.release()
+
+    @contextmanager
+    def route_slot_sync(self, route: str, timeout: float) -> Iterator[None]:
+        """Equivalente síncrono de `route_slot` (endpoints executados no threadpool)."""
+        limit = self.budgets.get(route)
+        semaphore = None
+        if limit:
+            with self._lock:
+                semaphore = self._sync_slots.get(route)
+                if semaphore is None:
+                    semaphore = self._sync_slots[route] = threading.BoundedSemaphore(limit)
+
+            self._enter_wait()
+            try:
+                acquired = semaphore.acquire(timeout=timeout)
+            finally:
+                self._leave_wait()
+            if not acquired:
+                raise self._reject(route, timeout)
+
+        self._track_in_use(route, 1)
+        try:
+            yield
+        finally:
+            self._track_in_use(route, -1)
+            if semaphore is not None:
+                semaphore.release()
+
+    # --- Exposição ---
+
+    def _pool_status(self) -> dict:
+        pool = self._engine.pool if self._engine is not None else None
+        if pool is None or not hasattr(pool, "checkedout"):
+            return {}
+        return {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": pool.overflow(),
+        }
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            events = dict(self._events)
+            in_use = dict(self._in_use)
+            rejected = dict(self._rejected)
+            checkouts = dict(self._checkouts)
+            waiting, peak = self._waiting, self._peak_waiting
+            routes = dict(self._route_latency)
+
+        return {
+            "name": self.name,
+            "pool": self._pool_status(),
+            "events": events,
+            "wait_queue": {"current": waiting, "peak": peak},
+            "checkouts": checkouts,
+            "budgets": {
+                route: {
+                    "limit": self.budgets.get(route),
+                    "in_use": in_use.get(route, 0),
+                    "rejected": rejected.get(route, 0),
+                }
+                for route in sorted(set(self.budgets) | set(in_use) | set(rejected))
+            },
+            "checkout_latency": self.checkout_latency.snapshot(),
+            "checkout_latency_by_route": {r: h.snapshot() for r, h in sorted(routes.items())},
+        }
+
+
+__all__ = [
+    "ConnectionBudgetExceeded",
+    "LatencyHistogram",
+    "PoolMonitor",
+    "DEFAULT_ROUTE",
+]
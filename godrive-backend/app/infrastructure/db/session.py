@@ -2,16 +2,106 @@
 Database Session
 
 Configuração de conexão e sessão do SQLAlchemy.
+
+Expõe dois stacks paralelos:
+- Síncrono (psycopg2): `engine` / `SessionLocal`, usado pelos endpoints legados.
+- Assíncrono (asyncpg): `async_engine` / `AsyncSessionLocal`, usado pelos
+  handlers `async def` para não bloquear o event loop em I/O de banco.
+
+As duas fábricas usam `LazyCheckoutSession`: a conexão só sai do pool na
+primeira query, e o gancho `info[ON_CHECKOUT]` (budget do router e métrica de
+espera, ver deps.py) roda em volta desse primeiro checkout.
 """
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from app.infrastructure.config.settings import settings
+from app.infrastructure.db.pool_metrics import PoolMonitor
+
+
+def _to_async_url(url: str) -> str:
+    """
+    Converte a URL síncrona do Postgres para o driver asyncpg.
+
+    Ex: postgresql://user:pass@db/godrive -> postgresql+asyncpg://user:pass@db/godrive
+    """
+    scheme, sep, rest = url.partition("://")
+    if not sep:
+        return url
+    base_scheme = scheme.split("+", 1)[0]
+    if base_scheme in ("postgres", "postgresql"):
+        return f"postgresql+asyncpg://{rest}"
+    return url
+
+
+# Chave em Session.info: fábrica de context manager chamada em volta do primeiro checkout
+ON_CHECKOUT = "on_checkout"
+
+
+class LazyCheckoutSession(Session):
+    """
+    Session que chama `info[ON_CHECKOUT]` em volta da primeira obtenção de
+    conexão. Requisições que não tocam o banco (cache, validação, 4xx) não
+    reservam vaga no budget nem aparecem na métrica de checkout.
+    """
+
+    def _connection_for_bind(self, engine, execution_options=None, **kw):
+        on_checkout = self.info.pop(ON_CHECKOUT, None)
+        if on_checkout is None:
+            return super()._connection_for_bind(engine, execution_options, **kw)
+        with on_checkout():
+            return super()._connection_for_bind(engine, execution_options, **kw)
+
+
+def _pool_options() -> dict:
+    """Parâmetros de pool compartilhados pelos engines (ver DB_POOL_* em Settings)."""
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        # pool_pre_ping ajuda a evitar desconexões silenciosas (ao custo de um round-trip)
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
 
 # Cria o motor de conexão usando a URL do .env
-# pool_pre_ping=True ajuda a evitar desconexões silenciosas
-engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True)
+engine = create_engine(settings.DATABASE_URL, **_pool_options())
 
 # Cria a fábrica de sessões (cada requisição usará uma dessas)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=LazyCheckoutSession)
+
+# --- STACK ASSÍNCRONO (asyncpg) ---
+async_engine = create_async_engine(
+    settings.ASYNC_DATABASE_URL or _to_async_url(settings.DATABASE_URL),
+    **_pool_options(),
+)
+
+# expire_on_commit=False: após o commit os atributos continuam acessíveis sem
+# disparar um refresh implícito (lazy I/O não é permitido em AsyncSession)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    sync_session_class=LazyCheckoutSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
+# --- INSTRUMENTAÇÃO DO POOL ---
+# Um monitor por engine: os pools são independentes, assim como os budgets
+pool_monitor = PoolMonitor("sync", budgets=settings.DB_ROUTE_BUDGETS, max_overflow=settings.DB_MAX_OVERFLOW)
+pool_monitor.attach(engine)
+
+async_pool_monitor = PoolMonitor("async", budgets=settings.DB_ROUTE_BUDGETS, max_overflow=settings.DB_MAX_OVERFLOW)
+async_pool_monitor.attach(async_engine.sync_engine)
 
-__all__ = ["engine", "SessionLocal"]
+__all__ = [
+    "engine",
+    "SessionLocal",
+    "async_engine",
+    "AsyncSessionLocal",
+    "LazyCheckoutSession",
+    "ON_CHECKOUT",
+    "pool_monitor",
+    "async_pool_monitor",
+]
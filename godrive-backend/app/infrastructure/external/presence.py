@@ -0,0 +1,121 @@
+"""
+Ride Presence
+
+Quem está online na sala de uma aula e quando foi visto pela última vez.
+
+Cada nó conhece só os seus sockets; o loop de heartbeat do ConnectionManager
+publica, a cada ciclo, o `last_seen` dos participantes conectados localmente.
+Com Redis, a presença fica num hash por aula (`godrive:presence:{ride_id}`,
+campo = user_id, valor = "last_seen:online"), gravado em pipeline (um HSET e
+um EXPIRE por sala com sockets no nó) e que expira sozinho depois de
+`retention_seconds` sem atividade. Sem Redis, o mesmo dado fica em memória.
+
+Um participante está online se tem socket aberto e deu sinal de vida há
+menos de `online_timeout` segundos.
+"""
+import time
+from typing import Dict, List, Optional
+
+KEY_PREFIX = "godrive:presence"
+
+# { ride_id: { user_id: last_seen (epoch) } }
+PresenceSnapshot = Dict[int, Dict[int, float]]
+
+
+def presence_key(ride_id: int) -> str:
+    return f"{KEY_PREFIX}:{ride_id}"
+
+
+def _encode(last_seen: float, online: bool) -> str:
+    return f"{last_seen:.0f}:{int(online)}"
+
+
+def _decode(value: str):
+    last_seen, _, online = value.partition(":")
+    return float(last_seen), online == "1"
+
+
+class RidePresence:
+    """Presença por aula, compartilhada entre processos via Redis (ou local)."""
+
+    def __init__(self, online_timeout: float = 60.0, retention_seconds: int = 86400):
+        self.online_timeout = online_timeout
+        self.retention_seconds = retention_seconds
+        self._redis = None
+        # Fallback sem Redis: { ride_id: { user_id: "last_seen:online" } }
+        self._local: Dict[int, Dict[int, str]] = {}
+        self._stats = {"publishes": 0, "errors": 0}
+
+    def init(self, redis) -> None:
+        """Passa a compartilhar a presença entre processos (chamado no lifespan)."""
+        self._redis = redis
+
+    async def publish(self, snapshot: PresenceSnapshot) -> None:
+        """Grava o last_seen dos participantes conectados neste nó (um ciclo de heartbeat)."""
+        if not snapshot:
+            return
+        if self._redis is None:
+            for ride_id, users in snapshot.items():
+                room = self._local.setdefault(ride_id, {})
+                room.update({user_id: _encode(seen, True) for user_id, seen in users.items()})
+            self._prune_local()
+            return
+        try:
+            pipe = self._redis.pipeline(transaction=False)
+            for ride_id, users in snapshot.items():
+                key = presence_key(ride_id)
+                pipe.hset(key, mapping={str(user_id): _encode(seen, True) for user_id, seen in users.items()})
+                pipe.expire(key, self.retention_seconds)
+            await pipe.execute()
+            self._stats["publishes"] += 1
+        except Exception as e:
+            self._stats["errors"] += 1
+            print(f"⚠️ Falha ao publicar presença das aulas: {e}")
+
+    async def mark_offline(self, ride_id: int, user_id: int, last_seen: float) -> None:
+        value = _encode(last_seen, False)
+        if self._redis is None:
+            self._local.setdefault(ride_id, {})[user_id] = value
+            return
+        try:
+            key = presence_key(ride_id)
+            pipe = self._redis.pipeline(transaction=False)
+            pipe.hset(key, str(user_id), value)
+            pipe.expire(key, self.retention_seconds)
+            await pipe.execute()
+        except Exception as e:
+            self._stats["errors"] += 1
+            print(f"⚠️ Falha ao registrar saída da aula {ride_id}: {e}")
+
+    async def get(self, ride_id: int, now: Optional[float] = None) -> List[dict]:
+        """Participantes já vistos na aula: [{user_id, online, last_seen}]."""
+        if self._redis is None:
+            raw = self._local.get(ride_id, {})
+        else:
+            raw = await self._redis.hgetall(presence_key(ride_id))
+        now = now or time.time()
+        participants = []
+        for user_id, value in raw.items():
+            last_seen, connected = _decode(value)
+            participants.append({
+                "user_id": int(user_id),
+                "online": connected and now - last_seen <= self.online_timeout,
+                "last_seen": last_seen,
+            })
+        return sorted(participants, key=lambda p: p["user_id"])
+
+    def _prune_local(self) -> None:
+        # Equivalente ao EXPIRE do Redis para o fallback em memória
+        horizon = time.time() - self.retention_seconds
+        for ride_id in [
+            ride_id for ride_id, room in self._local.items()
+            if all(_decode(value)[0] < horizon for value in room.values())
+        ]:
+            del self._local[ride_id]
+
+    def stats(self) -> dict:
+        return {
+            **self._stats,
+            "backend": "memory" if self._redis is None else "redis",
+            "local_rooms": len(self._local),
+        }
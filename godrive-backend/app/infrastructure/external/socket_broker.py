@@ -0,0 +1,193 @@
+"""
+Socket Broker
+
+Entrega das mensagens das salas de WebSocket (uma sala por aula) entre
+processos. Aluno e instrutor podem estar conectados em workers/pods
+diferentes: cada mensagem é publicada no canal da aula e todo nó que tem
+sockets daquela aula recebe e repassa aos seus sockets locais.
+
+- `RedisSocketBroker`: Redis pub/sub. Uma única conexão de assinatura por
+  processo (multiplexada): o nó assina o canal da aula quando o primeiro
+  socket local entra na sala e cancela quando o último sai.
+- `InMemorySocketBroker`: entrega direta no próprio processo (um worker só,
+  testes, ou Redis desabilitado).
+
+As mensagens trafegam já serializadas (texto JSON): cada nó repassa o mesmo
+texto a todos os sockets, sem serializar de novo por conexão.
+"""
+import asyncio
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable, Optional, Set
+
+CHANNEL_PREFIX = "godrive:ride"
+
+# Espera antes de reassinar os canais após perder a conexão
+RESUBSCRIBE_DELAY_SECONDS = 1.0
+# Timeout de leitura do loop de assinatura (permite reagir a novas assinaturas)
+READ_TIMEOUT_SECONDS = 1.0
+
+# handler(ride_id, mensagem_serializada)
+MessageHandler = Callable[[int, str], Awaitable[None]]
+
+
+def channel_for(ride_id: int) -> str:
+    return f"{CHANNEL_PREFIX}:{ride_id}"
+
+
+def _ride_id_from(channel: str) -> int:
+    return int(channel.rsplit(":", 1)[1])
+
+
+class SocketBroker(ABC):
+    """Interface dos backends de fan-out das salas."""
+
+    def __init__(self):
+        self._handler: Optional[MessageHandler] = None
+
+    def start(self, handler: MessageHandler) -> None:
+        """Registra quem entrega as mensagens recebidas aos sockets locais."""
+        self._handler = handler
+
+    @abstractmethod
+    async def subscribe(self, ride_id: int) -> None:
+        ...
+
+    @abstractmethod
+    async def unsubscribe(self, ride_id: int) -> None:
+        ...
+
+    @abstractmethod
+    async def publish(self, ride_id: int, message: str) -> None:
+        ...
+
+    async def close(self) -> None:
+        pass
+
+    def stats(self) -> dict:
+        return {}
+
+
+class InMemorySocketBroker(SocketBroker):
+    """Fan-out dentro do próprio processo."""
+
+    def __init__(self):
+        super().__init__()
+        self.published = 0
+
+    async def subscribe(self, ride_id: int) -> None:
+        pass
+
+    async def unsubscribe(self, ride_id: int) -> None:
+        pass
+
+    async def publish(self, ride_id: int, message: str) -> None:
+        self.published += 1
+        if self._handler is not None:
+            await self._handler(ride_id, message)
+
+    def stats(self) -> dict:
+        return {"backend": "memory", "published": self.published}
+
+
+class RedisSocketBroker(SocketBroker):
+    """Fan-out entre processos via Redis pub/sub, com uma assinatura por nó."""
+
+    def __init__(self, redis):
+        super().__init__()
+        self._redis = redis
+        self._pubsub = None
+        self._channels: Set[str] = set()
+        self._reader: Optional[asyncio.Task] = None
+        self._stats = {"published": 0, "received": 0, "errors": 0, "local_fallbacks": 0}
+
+    def start(self, handler: MessageHandler) -> None:
+        super().start(handler)
+        if self._reader is None:
+            self._reader = asyncio.create_task(self._read_loop())
+
+    async def subscribe(self, ride_id: int) -> None:
+        channel = channel_for(ride_id)
+        self._channels.add(channel)
+        try:
+            await self._ensure_pubsub().subscribe(channel)
+        except Exception as e:
+            # O loop de leitura reassina todos os canais ao reconectar
+            self._stats["errors"] += 1
+            print(f"⚠️ Falha ao assinar o canal da aula {ride_id}: {e}")
+
+    async def unsubscribe(self, ride_id: int) -> None:
+        channel = channel_for(ride_id)
+        self._channels.discard(channel)
+        try:
+            if self._pubsub is not None:
+                await self._pubsub.unsubscribe(channel)
+        except Exception:
+            self._stats["errors"] += 1
+
+    async def publish(self, ride_id: int, message: str) -> None:
+        try:
+            await self._redis.publish(channel_for(ride_id), message)
+            self._stats["published"] += 1
+        except Exception as e:
+            # Sem Redis, ao menos os sockets deste nó recebem
+            self._stats["errors"] += 1
+            self._stats["local_fallbacks"] += 1
+            print(f"⚠️ Falha ao publicar na aula {ride_id}, entregando só localmente: {e}")
+            if self._handler is not None:
+                await self._handler(ride_id, message)
+
+    def _ensure_pubsub(self):
+        if self._pubsub is None:
+            self._pubsub = self._redis.pubsub()
+        return self._pubsub
+
+    async def _read_loop(self) -> None:
+        while True:
+            try:
+                pubsub = self._ensure_pubsub()
+                if not pubsub.subscribed:
+                    await asyncio.sleep(READ_TIMEOUT_SECONDS)
+                    continue
+                message = await pubsub.get_message(
+                    ignore_subscribe_messages=True, timeout=READ_TIMEOUT_SECONDS
+                )
+                if message and message.get("type") == "message":
+                    self._stats["received"] += 1
+                    await self._handler(_ride_id_from(message["channel"]), message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._stats["errors"] += 1
+                print(f"⚠️ Conexão de assinatura das salas perdida: {e}")
+                await self._reset()
+                await asyncio.sleep(RESUBSCRIBE_DELAY_SECONDS)
+                await self._resubscribe()
+
+    async def _reset(self) -> None:
+        pubsub, self._pubsub = self._pubsub, None
+        if pubsub is not None:
+            close = getattr(pubsub, "aclose", None) or pubsub.close
+            try:
+                await close()
+            except Exception:
+                pass
+
+    async def _resubscribe(self) -> None:
+        if self._channels:
+            try:
+                await self._ensure_pubsub().subscribe(*self._channels)
+            except Exception:
+                self._stats["errors"] += 1
+
+    async def close(self) -> None:
+        if self._reader is not None:
+            self._reader.cancel()
+            try:
+                await self._reader
+            except asyncio.CancelledError:
+                pass
+            self._reader = None
+        await self._reset()
+
+    def stats(self) -> dict:
+        return {**self._stats, "backend": "redis", "channels": len(self._channels)}
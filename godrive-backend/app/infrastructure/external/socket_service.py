@@ -1,59 +1,333 @@
-from typing import Dict, List
-from fastapi import WebSocket
+import asyncio
+import json
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Tuple, Union
+from fastapi import WebSocket, status
+
+from app.infrastructure.config.settings import settings
+from app.infrastructure.external.socket_broker import InMemorySocketBroker, SocketBroker
+from app.infrastructure.external.location_frame import encode_location_frame
+from app.infrastructure.external.presence import PresenceSnapshot, RidePresence
+
+# Tipo da mensagem no envelope trocado entre nós (1º caractere)
+_LOCATION = "L"  # Posição: só a mais recente importa, pode ser descartada
+_EVENT = "E"     # Eventos da aula (RIDE_STARTED, RIDE_FINISHED...): nunca descartados
+
+# Heartbeat da aplicação: o cliente responde {"type": "PONG"} (qualquer frame conta)
+_PING = json.dumps({"type": "PING"})
+
+
+class ConnectionOutbox:
+    """
+    Fila de envio de um socket, com uma task escritora própria.
+
+    O broadcast só enfileira (não espera o cliente). Fila cheia: descarta o
+    frame de posição mais antigo. Um envio que passa de `send_timeout` ou falha
+    marca o socket como morto (`on_dead`), e ele é removido da sala.
+
+    Frames `bytes` (posição no formato binário) vão por send_bytes; texto por send_text.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        max_size: int,
+        send_timeout: float,
+        on_dead: Callable[["ConnectionOutbox"], Awaitable[None]],
+        binary: bool = False,
+        user_id: Optional[int] = None,
+    ):
+        self.websocket = websocket
+        self.binary = binary
+        self.user_id = user_id
+        # Último sinal de vida do cliente (qualquer frame recebido, inclusive PONG)
+        self.last_seen = time.time()
+        self.pinged = False
+        self.max_size = max_size
+        self.send_timeout = send_timeout
+        self._on_dead = on_dead
+        self._queue: Deque[Tuple[Union[str, bytes], bool]] = deque()
+        self._ready = asyncio.Event()
+        self.dropped = 0
+        # Remoção do socket: roda fora da task escritora (que ela mesma cancela em close())
+        self._dead_task: Optional[asyncio.Task] = None
+        self._task = asyncio.create_task(self._run())
+
+    def put(self, message: Union[str, bytes], droppable: bool) -> None:
+        if len(self._queue) >= self.max_size:
+            for i, (_, queued_droppable) in enumerate(self._queue):
+                if queued_droppable:
+                    del self._queue[i]
+                    self.dropped += 1
+                    break
+            else:
+                # Fila cheia só de eventos: o cliente parou de ler
+                self._task.cancel()
+                self._mark_dead()
+                return
+        self._queue.append((message, droppable))
+        self._ready.set()
+
+    async def _run(self) -> None:
+        try:
+            while True:
+                while not self._queue:
+                    self._ready.clear()
+                    await self._ready.wait()
+                message, _ = self._queue.popleft()
+                if isinstance(message, bytes):
+                    send = self.websocket.send_bytes(message)
+                else:
+                    send = self.websocket.send_text(message)
+                await asyncio.wait_for(send, self.send_timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Socket lento ou fechado, removendo da sala: {e!r}")
+            self._mark_dead()
+
+    def _mark_dead(self) -> None:
+        # Numa task própria: `on_dead` chama close(), que cancelaria a escritora no meio da remoção
+        if self._dead_task is None:
+            self._dead_task = asyncio.create_task(self._on_dead(self))
+
+    def close(self) -> None:
+        if asyncio.current_task() is not self._task:
+            self._task.cancel()
+
 
 class ConnectionManager:
     """
     Gerencia as conexões WebSocket ativas, agrupando-as por 'ride_id'.
     Funciona como uma sala de chat: o que é enviado em uma 'ride_id'
     só é recebido por quem está conectado naquela 'ride_id'.
+
+    As conexões ficam no processo; a entrega entre processos é feita pelo
+    broker (ver socket_broker.py): `broadcast_location` publica no canal da
+    aula e cada nó repassa aos seus sockets locais.
+
+    Cada socket tem a sua fila de envio (ConnectionOutbox): um cliente lento
+    (ex: 3G) nunca atrasa a entrega para os demais da sala.
+
+    Heartbeat: `run_heartbeat` manda PING para sockets sem sinal de vida há um
+    intervalo e remove os que passam de `idle_timeout` (sockets meio abertos
+    de redes móveis). A presença por aula (quem está online e last_seen) é
+    publicada no mesmo ciclo (ver presence.py).
+
+    Cada mensagem é serializada uma vez: o mesmo texto JSON (ou, para sockets
+    com formato binário, os mesmos bytes, ver location_frame.py) vai para todos.
     """
-    def __init__(self):
-        # Armazena as conexões ativas: { ride_id: [websocket1, websocket2] }
+    def __init__(
+        self,
+        broker: SocketBroker = None,
+        send_queue_size: int = 32,
+        send_timeout: float = 5.0,
+        presence: RidePresence = None,
+    ):
+        # Armazena as conexões ativas deste processo: { ride_id: [websocket1, websocket2] }
         self.active_connections: Dict[str, List[WebSocket]] = {}
+        self._outboxes: Dict[WebSocket, ConnectionOutbox] = {}
+        self.send_queue_size = send_queue_size
+        self.send_timeout = send_timeout
+        self.evicted = 0
+        self.reaped = 0
+        self.presence = presence or RidePresence()
+        self.broker = None
+        self.init(broker or InMemorySocketBroker())
 
-    async def connect(self, ride_id: int, websocket: WebSocket):
+    def init(self, broker: SocketBroker) -> None:
+        """Troca o backend de fan-out. Chamado no lifespan da aplicação (ex: Redis)."""
+        self.broker = broker
+        self.broker.start(self._deliver_local)
+
+    async def connect(
+        self,
+        ride_id: int,
+        websocket: WebSocket,
+        binary: bool = False,
+        user_id: Optional[int] = None,
+    ):
         """
         Aceita a conexão e adiciona o socket à lista daquela aula.
+        `binary`: o cliente recebe as posições no frame binário compacto.
         """
         await websocket.accept()
         ride_key = str(ride_id)
-        
+
         if ride_key not in self.active_connections:
             self.active_connections[ride_key] = []
-            
+            # Primeiro socket local da sala: o nó passa a receber o canal da aula
+            await self.broker.subscribe(ride_id)
+
         self.active_connections[ride_key].append(websocket)
+        self._outboxes[websocket] = ConnectionOutbox(
+            websocket,
+            max_size=self.send_queue_size,
+            send_timeout=self.send_timeout,
+            on_dead=lambda outbox: self._evict(ride_id, outbox.websocket),
+            binary=binary,
+            user_id=user_id,
+        )
         print(f"Nova conexão na aula {ride_id}. Total: {len(self.active_connections[ride_key])}")
 
-    def disconnect(self, ride_id: int, websocket: WebSocket):
+    async def disconnect(self, ride_id: int, websocket: WebSocket):
         """
         Remove a conexão da lista quando o usuário desconecta.
+        Idempotente: pode ser chamado depois de uma remoção por lentidão.
         """
+        outbox = self._outboxes.pop(websocket, None)
         ride_key = str(ride_id)
         if ride_key in self.active_connections:
             if websocket in self.active_connections[ride_key]:
                 self.active_connections[ride_key].remove(websocket)
-                
-            # Se a sala ficar vazia, removemos a chave para economizar memória
-            if not self.active_connections[ride_key]:
-                del self.active_connections[ride_key]
-                
+
+        if outbox is not None:
+            outbox.close()
+            # Reconexão do app: o socket novo abre antes do antigo ser removido
+            if outbox.user_id is not None and not self._user_connected(ride_id, outbox.user_id):
+                await self.presence.mark_offline(ride_id, outbox.user_id, outbox.last_seen)
+
+        # Se a sala ficar vazia, removemos a chave para economizar memória
+        if ride_key in self.active_connections and not self.active_connections[ride_key]:
+            del self.active_connections[ride_key]
+            await self.broker.unsubscribe(ride_id)
+
         print(f"Desconexão na aula {ride_id}.")
 
+    def _user_connected(self, ride_id: int, user_id: int) -> bool:
+        """True se o usuário ainda tem algum socket aberto na sala, neste processo."""
+        for connection in self.active_connections.get(str(ride_id), ()):
+            outbox = self._outboxes.get(connection)
+            if outbox is not None and outbox.user_id == user_id:
+                return True
+        return False
+
+    async def _evict(self, ride_id: int, websocket: WebSocket, code: int = status.WS_1013_TRY_AGAIN_LATER):
+        """Remove um socket morto ou lento demais e fecha a conexão do lado do servidor."""
+        if websocket not in self._outboxes:
+            return
+        self.evicted += 1
+        await self.disconnect(ride_id, websocket)
+        try:
+            await asyncio.wait_for(websocket.close(code=code), self.send_timeout)
+        except Exception:
+            pass
+
+    def touch(self, websocket: WebSocket) -> None:
+        """Registra um sinal de vida do cliente (chamado a cada frame recebido)."""
+        outbox = self._outboxes.get(websocket)
+        if outbox is not None:
+            outbox.last_seen = time.time()
+            outbox.pinged = False
+
+    async def heartbeat(self, interval: float, idle_timeout: float) -> int:
+        """
+        Um ciclo do heartbeat: PING para quem está quieto há `interval`, remoção de
+        quem passou de `idle_timeout` e publicação da presença. Retorna os removidos.
+        """
+        now = time.time()
+        idle: List[Tuple[int, WebSocket]] = []
+        for ride_key, connections in self.active_connections.items():
+            for connection in connections:
+                outbox = self._outboxes.get(connection)
+                if outbox is None:
+                    continue
+                quiet = now - outbox.last_seen
+                if quiet >= idle_timeout:
+                    idle.append((int(ride_key), connection))
+                elif quiet >= interval and not outbox.pinged:
+                    outbox.pinged = True
+                    outbox.put(_PING, droppable=False)
+
+        for ride_id, connection in idle:
+            print(f"Socket ocioso na aula {ride_id}, removendo da sala.")
+            await self._evict(ride_id, connection, code=status.WS_1001_GOING_AWAY)
+        self.reaped += len(idle)
+
+        await self.presence.publish(self.presence_snapshot())
+        return len(idle)
+
+    async def run_heartbeat(self, interval: float, idle_timeout: float) -> None:
+        """Loop de background (iniciado no lifespan) do heartbeat das salas."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.heartbeat(interval, idle_timeout)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ Falha no heartbeat das salas: {e}")
+
+    def presence_snapshot(self) -> PresenceSnapshot:
+        """{ ride_id: { user_id: last_seen } } dos sockets deste processo."""
+        snapshot: PresenceSnapshot = {}
+        for ride_key, connections in self.active_connections.items():
+            users: Dict[int, float] = {}
+            for connection in connections:
+                outbox = self._outboxes.get(connection)
+                if outbox is not None and outbox.user_id is not None:
+                    users[outbox.user_id] = max(users.get(outbox.user_id, 0.0), outbox.last_seen)
+            if users:
+                snapshot[int(ride_key)] = users
+        return snapshot
+
+    def room_counts(self, limit: int = 100) -> Dict[str, int]:
+        """Conexões por sala neste processo (as `limit` maiores)."""
+        rooms = sorted(self.active_connections.items(), key=lambda item: len(item[1]), reverse=True)
+        return {ride_key: len(connections) for ride_key, connections in rooms[:limit]}
+
     async def broadcast_location(self, ride_id: int, data: dict):
         """
-        Envia os dados de localização para TODOS conectados naquela aula (Aluno e Instrutor).
+        Envia os dados de localização para TODOS conectados naquela aula (Aluno e Instrutor),
+        em qualquer processo. Mensagens com "type" são eventos e nunca são descartadas.
         """
-        ride_key = str(ride_id)
-        if ride_key in self.active_connections:
-            # Percorre todos os sockets conectados na sala
-            for connection in self.active_connections[ride_key]:
-                try:
-                    # Envia como JSON
-                    await connection.send_json(data)
-                except Exception as e:
-                    print(f"Erro ao enviar dados para socket na aula {ride_id}: {e}")
-                    # Em caso de erro (ex: socket fechado abruptamente), poderíamos remover aqui
-                    # mas o disconnect normalmente lida com isso.
+        kind = _EVENT if "type" in data else _LOCATION
+        await self.broker.publish(ride_id, kind + json.dumps(data, separators=(",", ":")))
+
+    def send_to(self, websocket: WebSocket, data: dict):
+        """Envia uma mensagem só para um socket (ex: controle para o remetente), pela fila dele."""
+        outbox = self._outboxes.get(websocket)
+        if outbox is not None:
+            outbox.put(json.dumps(data), droppable=False)
+
+    async def _deliver_local(self, ride_id: int, message: str):
+        """Enfileira a mensagem para os sockets da aula conectados neste processo."""
+        droppable = message[0] == _LOCATION
+        payload = message[1:]
+        frame = None
+        for connection in self.active_connections.get(str(ride_id), ()):
+            outbox = self._outboxes.get(connection)
+            if outbox is None:
+                continue
+            if droppable and outbox.binary:
+                # Codificado uma vez por mensagem neste nó, mesmos bytes para todos
+                if frame is None:
+                    frame = encode_location_frame(json.loads(payload))
+                outbox.put(frame, droppable)
+            else:
+                outbox.put(payload, droppable)
+
+    def stats(self) -> dict:
+        return {
+            "rooms": len(self.active_connections),
+            "connections": len(self._outboxes),
+            "binary_connections": sum(o.binary for o in self._outboxes.values()),
+            "queued": sum(len(o._queue) for o in self._outboxes.values()),
+            "dropped": sum(o.dropped for o in self._outboxes.values()),
+            "evicted": self.evicted,
+            "reaped_idle": self.reaped,
+            "max_room_size": max(map(len, self.active_connections.values()), default=0),
+            "presence": self.presence.stats(),
+            "broker": self.broker.stats(),
+        }
 
 # Instância global para ser importada nos endpoints
-socket_manager = ConnectionManager()
\ No newline at end of file
+socket_manager = ConnectionManager(
+    send_queue_size=settings.SOCKET_SEND_QUEUE_SIZE,
+    send_timeout=settings.SOCKET_SEND_TIMEOUT_SECONDS,
+    presence=RidePresence(
+        online_timeout=settings.SOCKET_IDLE_TIMEOUT_SECONDS,
+        retention_seconds=settings.PRESENCE_RETENTION_SECONDS,
+    ),
+)
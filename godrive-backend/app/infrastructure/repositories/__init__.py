@@ -8,6 +8,17 @@ from .availability_repository import AvailabilityRepository
 from .review_repository import ReviewRepository
 from .course_repository import CourseRepository
 from .quiz_repository import QuizRepository
+from .ride_track_repository import RideTrackRepository
+
+# Versões assíncronas (AsyncSession / asyncpg)
+from .user_repository import AsyncUserRepository
+from .instructor_repository import AsyncInstructorRepository
+from .ride_repository import AsyncRideRepository
+from .availability_repository import AsyncAvailabilityRepository
+from .review_repository import AsyncReviewRepository
+from .course_repository import AsyncCourseRepository
+from .quiz_repository import AsyncQuizRepository
+from .ride_track_repository import AsyncRideTrackRepository
 
 # Adapters para interfaces de domínio
 from .adapters import (
@@ -25,6 +36,16 @@ __all__ = [
     "ReviewRepository",
     "CourseRepository",
     "QuizRepository",
+    "RideTrackRepository",
+    # Async repositories
+    "AsyncUserRepository",
+    "AsyncInstructorRepository",
+    "AsyncRideRepository",
+    "AsyncAvailabilityRepository",
+    "AsyncReviewRepository",
+    "AsyncCourseRepository",
+    "AsyncQuizRepository",
+    "AsyncRideTrackRepository",
     # Domain adapters
     "RideRepositoryAdapter",
     "InstructorRepositoryAdapter",
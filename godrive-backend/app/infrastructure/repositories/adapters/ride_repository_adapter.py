@@ -4,13 +4,28 @@ Adapter: RideRepositoryAdapter
 Adapta o RideRepository existente para implementar a interface IRideRepository.
 Permite usar o repositório legado enquanto respeita Clean Architecture.
 """
+import time
+from datetime import timedelta
 from typing import List, Optional
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.orm import Session
 
 from app.domain.entities.ride import RideEntity, RideStatus as DomainRideStatus
+from app.domain.exceptions.ride import RideStatusTransitionException, SlotNotAvailableException
 from app.domain.interfaces.ride_repository import IRideRepository
 from app.infrastructure.db.models.ride import Ride, RideStatus as ModelRideStatus
-from app.infrastructure.repositories.ride_repository import RideRepository
+from app.infrastructure.db.mappers.ride_mapper import RideMapper
+from app.infrastructure.repositories.ride_repository import (
+    RideRepository,
+    complete_ride,
+    is_slot_conflict,
+    is_transient,
+)
+from app.infrastructure.scheduling.slot_holds import slot_holds
+
+# Tentativas do INSERT em caso de erro transitório (deadlock, serialização, lock)
+BOOKING_MAX_ATTEMPTS = 3
+BOOKING_RETRY_BACKOFF_SECONDS = 0.05
 
 
 class RideRepositoryAdapter:
@@ -27,35 +42,58 @@ class RideRepositoryAdapter:
     
     def _model_to_entity(self, model: Ride) -> RideEntity:
         """Converte modelo SQLAlchemy para entidade de domínio."""
-        return RideEntity(
-            id=model.id,
-            student_id=model.student_id,
-            instructor_id=model.instructor_id,
-            scheduled_at=model.scheduled_at,
-            price=model.price,
-            status=DomainRideStatus(model.status.value if hasattr(model.status, 'value') else model.status),
-            pickup_latitude=model.pickup_latitude,
-            pickup_longitude=model.pickup_longitude,
-            created_at=model.created_at,
-            updated_at=model.updated_at,
-        )
+        # pending_payment (modelo) corresponde a PENDING (domínio)
+        return RideMapper.to_entity(model)
+
+    @staticmethod
+    def _model_status(status: DomainRideStatus) -> ModelRideStatus:
+        if status == DomainRideStatus.PENDING:
+            return ModelRideStatus.PENDING_PAYMENT
+        return ModelRideStatus(status.value)
     
     def create(self, ride: RideEntity) -> RideEntity:
-        """Persiste uma nova aula."""
-        # Cria diretamente no banco para evitar dependência de RideCreate schema
-        db_ride = Ride(
-            student_id=ride.student_id,
-            instructor_id=ride.instructor_id,
-            scheduled_at=ride.scheduled_at,
-            price=ride.price,
-            status=ModelRideStatus.PENDING_PAYMENT,
-            duration_minutes=50,
-            pickup_latitude=ride.pickup_latitude,
-            pickup_longitude=ride.pickup_longitude,
-        )
-        self._db.add(db_ride)
-        self._db.commit()
+        """
+        Persiste uma nova aula.
+
+        A reserva do horário é garantida pelo banco (exclusion constraint
+        ex_rides_instructor_no_overlap), não pela leitura de disponibilidade
+        feita antes: se outra reserva sobreposta for confirmada primeiro, levanta
+        SlotNotAvailableException. Erros transitórios são tentados novamente.
+        """
+        for attempt in range(1, BOOKING_MAX_ATTEMPTS + 1):
+            # Cria diretamente no banco para evitar dependência de RideCreate schema
+            db_ride = Ride(
+                student_id=ride.student_id,
+                instructor_id=ride.instructor_id,
+                scheduled_at=ride.scheduled_at,
+                price=ride.price,
+                status=ModelRideStatus.PENDING_PAYMENT,
+                duration_minutes=50,
+                pickup_latitude=ride.pickup_latitude,
+                pickup_longitude=ride.pickup_longitude,
+            )
+            self._db.add(db_ride)
+            try:
+                self._db.commit()
+                break
+            except DBAPIError as e:
+                self._db.rollback()
+                if is_slot_conflict(e):
+                    raise SlotNotAvailableException(
+                        ride.instructor_id, ride.scheduled_at.time().isoformat()
+                    )
+                if not is_transient(e) or attempt == BOOKING_MAX_ATTEMPTS:
+                    raise
+                time.sleep(BOOKING_RETRY_BACKOFF_SECONDS * attempt)
+
         self._db.refresh(db_ride)
+        # Segura o horário na agenda exibida enquanto o pagamento não é confirmado
+        slot_holds.hold(
+            db_ride.instructor_id,
+            db_ride.id,
+            db_ride.scheduled_at,
+            db_ride.scheduled_at + timedelta(minutes=db_ride.duration_minutes),
+        )
         return self._model_to_entity(db_ride)
     
     def get_by_id(self, ride_id: int) -> Optional[RideEntity]:
@@ -79,10 +117,24 @@ class RideRepositoryAdapter:
         """Atualiza uma aula existente."""
         model = self._db.query(Ride).filter(Ride.id == ride.id).first()
         if model:
-            model.status = ModelRideStatus(ride.status.value)
+            current_status = model.status
+            was_pending = current_status == ModelRideStatus.PENDING_PAYMENT
+            target_status = self._model_status(ride.status)
+            if target_status == ModelRideStatus.COMPLETED and current_status != ModelRideStatus.COMPLETED:
+                # Aula concluída: aluno e instrutor passam a ter uma avaliação pendente.
+                # Só se o status ainda for o lido (finalizações concorrentes contam uma vez)
+                if not complete_ride(self._db, model.id, current_status):
+                    self._db.rollback()
+                    self._db.refresh(model)
+                    raise RideStatusTransitionException(
+                        current_status=model.status, target_status=target_status
+                    )
+            model.status = target_status
             model.pickup_latitude = ride.pickup_latitude
             model.pickup_longitude = ride.pickup_longitude
             self._db.commit()
             self._db.refresh(model)
+            if was_pending and model.status != ModelRideStatus.PENDING_PAYMENT:
+                slot_holds.release(model.instructor_id, model.id)
             return self._model_to_entity(model)
         raise ValueError(f"Ride {ride.id} não encontrada")
@@ -1,4 +1,6 @@
+from sqlalchemy import select, delete
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.infrastructure.db.models.availability import Availability
 from app.application.dtos import CreateAvailabilityDTO
 
@@ -25,4 +27,31 @@ class AvailabilityRepository:
     # Opcional: Útil para o instrutor limpar a agenda
     def delete_all_by_instructor(self, db: Session, instructor_id: int):
         db.query(Availability).filter(Availability.instructor_id == instructor_id).delete()
-        db.commit()
\ No newline at end of file
+        db.commit()
+
+class AsyncAvailabilityRepository:
+    """Versão assíncrona (AsyncSession) do AvailabilityRepository."""
+
+    async def create(self, db: AsyncSession, instructor_id: int, availability: CreateAvailabilityDTO):
+        db_obj = Availability(
+            instructor_id=instructor_id,
+            day_of_week=availability.day_of_week,
+            start_time=availability.start_time,
+            end_time=availability.end_time
+        )
+        db.add(db_obj)
+        await db.commit()
+        await db.refresh(db_obj)
+        return db_obj
+
+    async def get_by_instructor(self, db: AsyncSession, instructor_id: int):
+        result = await db.execute(
+            select(Availability)
+            .where(Availability.instructor_id == instructor_id)
+            .order_by(Availability.day_of_week, Availability.start_time)
+        )
+        return result.scalars().all()
+
+    async def delete_all_by_instructor(self, db: AsyncSession, instructor_id: int):
+        await db.execute(delete(Availability).where(Availability.instructor_id == instructor_id))
+        await db.commit()
@@ -1,23 +1,60 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Iterable, Set
+from sqlalchemy import desc, select, update
 from app.infrastructure.db.models.course import Course, Module, Lesson, Enrollment
 from app.application.dtos import CreateCourseDTO, CreateModuleDTO, CreateLessonDTO
 
+def _with_curriculum(stmt):
+    """Módulos e aulas em duas consultas IN (...), já ordenados por `order` (sem N+1)."""
+    return stmt.options(selectinload(Course.modules).selectinload(Module.lessons))
+
+def _catalog_stmt(skip: int, limit: int, published_only: bool, *columns):
+    stmt = select(*columns) if columns else select(Course)
+    if published_only:
+        stmt = stmt.where(Course.is_published == True)
+    return stmt.order_by(desc(Course.created_at), desc(Course.id)).offset(skip).limit(limit)
+
+def _head_stmt(course_id: int):
+    """Só o necessário para achar a grade no cache: publicado + versão (lookup pela PK)."""
+    return select(Course.id, Course.is_published, Course.curriculum_version).where(Course.id == course_id)
+
+def _enrolled_ids_stmt(user_id: int):
+    return select(Enrollment.course_id).where(Enrollment.user_id == user_id)
+
+def _is_enrolled_stmt(user_id: int, course_id: int):
+    # Lookup pela unique (user_id, course_id)
+    return select(Enrollment.id).where(
+        Enrollment.user_id == user_id,
+        Enrollment.course_id == course_id,
+    ).limit(1)
+
+def _bump_curriculum_stmt(course_id):
+    # Na mesma transação da alteração: a versão nova nunca aponta para uma grade antiga
+    return update(Course).where(Course.id == course_id).values(
+        curriculum_version=Course.curriculum_version + 1
+    ).execution_options(synchronize_session=False)
+
+def _module_course_id(module_id: int):
+    return select(Module.course_id).where(Module.id == module_id).scalar_subquery()
+
 class CourseRepository:
     
     # --- CURSOS ---
 
     def get_all(self, db: Session, skip: int = 0, limit: int = 100, published_only: bool = True):
-        """Lista cursos (padrão: apenas os publicados)."""
-        query = db.query(Course)
-        if published_only:
-            query = query.filter(Course.is_published == True)
-        return query.order_by(desc(Course.created_at)).offset(skip).limit(limit).all()
+        """Lista cursos (padrão: apenas os publicados), com a grade carregada."""
+        stmt = _with_curriculum(_catalog_stmt(skip, limit, published_only))
+        return db.execute(stmt).scalars().all()
 
     def get_by_id(self, db: Session, course_id: int):
         """Busca um curso pelo ID."""
         return db.query(Course).filter(Course.id == course_id).first()
 
+    def get_with_curriculum(self, db: Session, course_id: int):
+        """Busca um curso pelo ID com módulos e aulas carregados (para serializar a grade)."""
+        return db.execute(_with_curriculum(select(Course)).where(Course.id == course_id)).scalars().first()
+
     def create(self, db: Session, course: CreateCourseDTO):
         db_obj = Course(
             title=course.title,
@@ -40,6 +77,7 @@ class CourseRepository:
             order=module.order
         )
         db.add(db_module)
+        db.execute(_bump_curriculum_stmt(course_id))
         db.commit()
         db.refresh(db_module)
         return db_module
@@ -54,6 +92,7 @@ class CourseRepository:
             order=lesson.order
         )
         db.add(db_lesson)
+        db.execute(_bump_curriculum_stmt(_module_course_id(module_id)))
         db.commit()
         db.refresh(db_lesson)
         return db_lesson
@@ -70,6 +109,9 @@ class CourseRepository:
         db.add(db_enrollment)
         db.commit()
         db.refresh(db_enrollment)
+        # Import tardio: app.infrastructure.courses importa este módulo
+        from app.infrastructure.courses.entitlements import entitlements
+        entitlements.grant(user_id, course_id)
         return db_enrollment
 
     def get_enrollment(self, db: Session, user_id: int, course_id: int):
@@ -79,6 +121,13 @@ class CourseRepository:
             Enrollment.course_id == course_id
         ).first()
 
+    def is_enrolled(self, db: Session, user_id: int, course_id: int) -> bool:
+        return db.execute(_is_enrolled_stmt(user_id, course_id)).first() is not None
+
+    def get_enrolled_course_ids(self, db: Session, user_id: int) -> Set[int]:
+        """Ids dos cursos comprados pelo aluno (uma consulta, coberta pela unique (user_id, course_id))."""
+        return set(db.execute(_enrolled_ids_stmt(user_id)).scalars())
+
     def get_my_courses(self, db: Session, user_id: int):
         """Lista todos os cursos comprados por um aluno."""
         # Join para trazer os dados do curso junto com a matrícula
@@ -86,4 +135,103 @@ class CourseRepository:
                  .join(Course)\
                  .filter(Enrollment.user_id == user_id)\
                  .order_by(desc(Enrollment.purchased_at))\
-                 .all()
\ No newline at end of file
+                 .all()
+
+
+class AsyncCourseRepository:
+    """
+    Versão assíncrona (AsyncSession) do CourseRepository.
+    Como AsyncSession não permite lazy loading, módulos e aulas são
+    carregados explicitamente com selectinload.
+    """
+
+    async def get_all(self, db: AsyncSession, skip: int = 0, limit: int = 100, published_only: bool = True):
+        result = await db.execute(_with_curriculum(_catalog_stmt(skip, limit, published_only)))
+        return result.scalars().all()
+
+    async def get_by_id(self, db: AsyncSession, course_id: int):
+        result = await db.execute(_with_curriculum(select(Course)).where(Course.id == course_id))
+        return result.scalars().first()
+
+    async def get_many(self, db: AsyncSession, course_ids: Iterable[int]):
+        """Cursos (com a grade) de uma lista de ids, em três consultas no total."""
+        result = await db.execute(_with_curriculum(select(Course)).where(Course.id.in_(list(course_ids))))
+        return result.scalars().all()
+
+    async def get_head(self, db: AsyncSession, course_id: int):
+        """(id, is_published, curriculum_version) do curso, ou None. Ver curriculum_cache.py."""
+        return (await db.execute(_head_stmt(course_id))).first()
+
+    async def list_heads(self, db: AsyncSession, skip: int = 0, limit: int = 100, published_only: bool = True):
+        """(id, curriculum_version) de uma página do catálogo, na ordem de get_all."""
+        stmt = _catalog_stmt(skip, limit, published_only, Course.id, Course.curriculum_version)
+        return (await db.execute(stmt)).all()
+
+    async def create(self, db: AsyncSession, course: CreateCourseDTO):
+        db_obj = Course(
+            title=course.title,
+            description=course.description,
+            price=course.price,
+            cover_image_url=course.cover_image_url,
+            is_published=course.is_published
+        )
+        db.add(db_obj)
+        await db.commit()
+        await db.refresh(db_obj)
+        return db_obj
+
+    async def create_module(self, db: AsyncSession, course_id: int, module: CreateModuleDTO):
+        db_module = Module(course_id=course_id, title=module.title, order=module.order)
+        db.add(db_module)
+        await db.execute(_bump_curriculum_stmt(course_id))
+        await db.commit()
+        await db.refresh(db_module)
+        return db_module
+
+    async def create_lesson(self, db: AsyncSession, module_id: int, lesson: CreateLessonDTO):
+        db_lesson = Lesson(
+            module_id=module_id,
+            title=lesson.title,
+            video_url=lesson.video_url,
+            duration_seconds=lesson.duration_seconds,
+            description=lesson.description,
+            order=lesson.order
+        )
+        db.add(db_lesson)
+        await db.execute(_bump_curriculum_stmt(_module_course_id(module_id)))
+        await db.commit()
+        await db.refresh(db_lesson)
+        return db_lesson
+
+    async def enroll_user(self, db: AsyncSession, user_id: int, course_id: int, price_paid: float):
+        db_enrollment = Enrollment(user_id=user_id, course_id=course_id, price_paid=price_paid)
+        db.add(db_enrollment)
+        await db.commit()
+        await db.refresh(db_enrollment)
+        from app.infrastructure.courses.entitlements import entitlements
+        await entitlements.grant_async(user_id, course_id)
+        return db_enrollment
+
+    async def get_enrollment(self, db: AsyncSession, user_id: int, course_id: int):
+        result = await db.execute(
+            select(Enrollment).where(
+                Enrollment.user_id == user_id,
+                Enrollment.course_id == course_id
+            )
+        )
+        return result.scalars().first()
+
+    async def is_enrolled(self, db: AsyncSession, user_id: int, course_id: int) -> bool:
+        return (await db.execute(_is_enrolled_stmt(user_id, course_id))).first() is not None
+
+    async def get_enrolled_course_ids(self, db: AsyncSession, user_id: int) -> Set[int]:
+        return set((await db.execute(_enrolled_ids_stmt(user_id))).scalars())
+
+    async def get_my_courses(self, db: AsyncSession, user_id: int):
+        result = await db.execute(
+            select(Enrollment)
+            .join(Course)
+            .where(Enrollment.user_id == user_id)
+            .order_by(desc(Enrollment.purchased_at))
+        )
+        return result.scalars().all()
@@ -1,11 +1,144 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from decimal import Decimal
+from typing import Optional, Tuple
+from sqlalchemy import Numeric, cast, func, literal, select, tuple_
 from app.infrastructure.db.models.instructor import InstructorProfile, InstructorStatus # <--- Importe o Enum
 from app.infrastructure.db.models.user import User
-from app.application.dtos import CreateInstructorDTO
+from app.infrastructure.db.models.rating_summary import RatingSummary
+from app.application.dtos import CreateInstructorDTO, InstructorSearchFiltersDTO
+from app.infrastructure.search.invalidation_bus import instructor_events
 from geoalchemy2.elements import WKTElement
 from geoalchemy2 import Geography
 
+# Cursor da paginação keyset da busca: (distância em km arredondada, id)
+SearchCursor = Tuple[float, int]
+
+def _average_rating_expr():
+    """
+    Média das avaliações recebidas, lida do agregado mantido em rating_summaries
+    (exige o outer join de `_join_rating_summary`). NULL = sem avaliações.
+    """
+    return cast(RatingSummary.rating_sum, Numeric) / func.nullif(RatingSummary.rating_count, 0)
+
+def _join_rating_summary(stmt):
+    return stmt.outerjoin(RatingSummary, RatingSummary.user_id == InstructorProfile.id)
+
+def _search_columns():
+    return (
+        InstructorProfile.id,
+        User.full_name,
+        InstructorProfile.bio,
+        InstructorProfile.hourly_rate,
+        InstructorProfile.cnh_category,
+        InstructorProfile.vehicle_model,
+    )
+
+def _apply_search_filters(stmt, filters: InstructorSearchFiltersDTO, rating_expr):
+    if filters.verified_only:
+        stmt = stmt.where(InstructorProfile.status == InstructorStatus.VERIFIED)
+    if filters.min_price is not None:
+        stmt = stmt.where(InstructorProfile.hourly_rate >= filters.min_price)
+    if filters.max_price is not None:
+        stmt = stmt.where(InstructorProfile.hourly_rate <= filters.max_price)
+    if filters.cnh_category:
+        stmt = stmt.where(func.upper(InstructorProfile.cnh_category) == filters.cnh_category.upper())
+    if filters.vehicle_model:
+        stmt = stmt.where(InstructorProfile.vehicle_model.icontains(filters.vehicle_model, autoescape=True))
+    if filters.min_rating is not None:
+        stmt = stmt.where(rating_expr >= filters.min_rating)
+    return stmt
+
+def _radius_search_stmt(
+    lat: float,
+    long: float,
+    radius_km: float,
+    filters: Optional[InstructorSearchFiltersDTO],
+    after: Optional[SearchCursor],
+    limit: Optional[int],
+):
+    """
+    Busca por raio com filtros e paginação keyset.
+    A ordenação é por (distância arredondada em 2 casas, id): é exatamente o
+    valor devolvido ao cliente, então o último item da página serve de cursor.
+    Distâncias na esfera (use_spheroid=false), como o índice em memória e o
+    cache de busca: o cursor de um caminho continua valendo no outro.
+    """
+    # Usar o tipo Geography do geoalchemy2 para cast — evita erros de cache do SQLAlchemy
+    # O lado da coluna usa 'location_geog' (gerada + GiST): castar 'location' impede o índice
+    ref_geog = func.ST_SetSRID(func.ST_MakePoint(long, lat), 4326).cast(Geography)
+    distance_expr = func.round(
+        cast(func.ST_Distance(InstructorProfile.location_geog, ref_geog, False) / 1000, Numeric), 2
+    )
+    rating_expr = _average_rating_expr()
+
+    stmt = select(
+        *_search_columns(),
+        rating_expr.label("average_rating"),
+        distance_expr.label("distance"),
+    ).join(User, User.id == InstructorProfile.id).where(
+        func.ST_DWithin(
+            InstructorProfile.location_geog,
+            ref_geog,
+            radius_km * 1000,  # Metros
+            False,
+        )
+    )
+    stmt = _join_rating_summary(stmt)
+    stmt = _apply_search_filters(stmt, filters or InstructorSearchFiltersDTO(), rating_expr)
+
+    if after is not None:
+        after_distance, after_id = after
+        stmt = stmt.where(
+            tuple_(distance_expr, InstructorProfile.id)
+            > tuple_(literal(Decimal(str(after_distance)), Numeric), after_id)
+        )
+
+    # Ordena do mais próximo para o mais longe (id desempata)
+    stmt = stmt.order_by(distance_expr, InstructorProfile.id)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return stmt
+
+def _search_row(row) -> dict:
+    return {
+        "id": row.id,
+        "full_name": row.full_name,
+        "bio": row.bio,
+        "hourly_rate": row.hourly_rate,
+        "cnh_category": row.cnh_category,
+        "vehicle_model": row.vehicle_model,
+        "average_rating": round(float(row.average_rating), 1) if row.average_rating is not None else None,
+        "distance": float(row.distance),
+    }
+
+def _candidates_stmt(lat: float, long: float, radius_km: float):
+    """Mesma projeção do índice, restrita a um raio (candidatos do cache de busca)."""
+    ref_geog = func.ST_SetSRID(func.ST_MakePoint(long, lat), 4326).cast(Geography)
+    return _index_rows_stmt().where(
+        func.ST_DWithin(InstructorProfile.location_geog, ref_geog, radius_km * 1000, False)
+    )
+
+def _location_stmt(instructor_id: int):
+    """(lat, long) atual do instrutor, usada nos eventos de invalidação da busca."""
+    return select(
+        func.ST_Y(InstructorProfile.location),
+        func.ST_X(InstructorProfile.location),
+    ).where(InstructorProfile.id == instructor_id)
+
+def _index_rows_stmt():
+    """Projeção plana dos instrutores com localização (lat/long em graus)."""
+    stmt = select(
+        *_search_columns(),
+        InstructorProfile.status,
+        _average_rating_expr().label("average_rating"),
+        func.ST_Y(InstructorProfile.location).label("latitude"),
+        func.ST_X(InstructorProfile.location).label("longitude"),
+    ).join(User, User.id == InstructorProfile.id).where(
+        InstructorProfile.location.isnot(None)
+    )
+    return _join_rating_summary(stmt)
+
 class InstructorRepository:
     
     def create(self, db: Session, user_id: int, profile: CreateInstructorDTO):
@@ -24,51 +157,40 @@ class InstructorRepository:
         db.add(db_profile)
         db.commit()
         db.refresh(db_profile)
+        instructor_events.publish_changed(db_profile.id, [(profile.latitude, profile.longitude)])
         return db_profile
 
-    def get_by_radius(self, db: Session, lat: float, long: float, radius_km: float):
+    def get_by_radius(
+        self,
+        db: Session,
+        lat: float,
+        long: float,
+        radius_km: float,
+        filters: Optional[InstructorSearchFiltersDTO] = None,
+        after: Optional[SearchCursor] = None,
+        limit: Optional[int] = None,
+    ):
         """
         Busca instrutores dentro de um raio de X km.
-        Retorna também a distância calculada.
+        Retorna também a distância calculada e a média de avaliações.
+
+        `after` é o (distance, id) do último item da página anterior.
         """
-        # Ponto de referência (Aluno)
-        ref_point = func.ST_SetSRID(func.ST_MakePoint(long, lat), 4326)
-        
-        # Usar o tipo Geography do geoalchemy2 para cast — evita erros de cache do SQLAlchemy
-        distance_expr = (func.ST_Distance(
-            InstructorProfile.location.cast(Geography),
-            ref_point.cast(Geography)
-        ) / 1000).label("distance")
-        
-        query = db.query(
-            InstructorProfile,
-            distance_expr
-        ).join(User).filter(
-            func.ST_DWithin(
-                InstructorProfile.location.cast(Geography),
-                ref_point.cast(Geography),
-                radius_km * 1000  # Metros
-            )
-        ).order_by(distance_expr)  # Ordena do mais próximo para o mais longe
-        
-        results = query.all()
-        
+        stmt = _radius_search_stmt(lat, long, radius_km, filters, after, limit)
         # Monta a resposta combinando dados do User + Profile + Distance
-        response = []
-        for profile, distance in results:
-            resp = {
-                "id": profile.user.id,
-                "full_name": profile.user.full_name,
-                "bio": profile.bio,
-                "hourly_rate": profile.hourly_rate,
-                "cnh_category": profile.cnh_category,
-                "vehicle_model": profile.vehicle_model,
-                "distance": round(distance, 2) # Arredonda para 2 casas decimais
-            }
-            response.append(resp)
-            
-        return response
-    
+        return [_search_row(row) for row in db.execute(stmt)]
+
+    def list_for_index(self, db: Session):
+        """
+        Linhas (sem ORM) usadas para montar o índice espacial em memória.
+        Ver app/infrastructure/search/instructor_index.py.
+        """
+        return db.execute(_index_rows_stmt()).mappings().all()
+
+    def list_candidates(self, db: Session, lat: float, long: float, radius_km: float):
+        """Linhas (sem ORM) no raio, sem filtros. Ver app/infrastructure/search/search_cache.py."""
+        return db.execute(_candidates_stmt(lat, long, radius_km)).mappings().all()
+
     # --- NOVOS MÉTODOS PARA ADMIN ---
     
     def get_pending(self, db: Session):
@@ -80,6 +202,9 @@ class InstructorRepository:
             profile.status = new_status
             db.commit()
             db.refresh(profile)
+            # Aprovação/rejeição muda quem aparece na busca (filtro verified_only)
+            location = db.execute(_location_stmt(instructor_id)).first()
+            instructor_events.publish_changed(instructor_id, [tuple(location) if location else None])
         return profile
     
     def update_documents(self, db: Session, instructor_id: int, cnh_url: str, vehicle_doc_url: str):
@@ -89,4 +214,79 @@ class InstructorRepository:
             if vehicle_doc_url: profile.vehicle_doc_url = vehicle_doc_url
             db.commit()
             db.refresh(profile)
-        return profile
\ No newline at end of file
+        return profile
+
+
+class AsyncInstructorRepository:
+    """Versão assíncrona (AsyncSession) do InstructorRepository."""
+
+    async def create(self, db: AsyncSession, user_id: int, profile: CreateInstructorDTO):
+        point = f'SRID=4326;POINT({profile.longitude} {profile.latitude})'
+
+        db_profile = InstructorProfile(
+            id=user_id,
+            bio=profile.bio,
+            hourly_rate=profile.hourly_rate,
+            cnh_category=profile.cnh_category,
+            vehicle_model=profile.vehicle_model,
+            location=point
+        )
+        db.add(db_profile)
+        await db.commit()
+        await db.refresh(db_profile)
+        await instructor_events.publish_changed_async(db_profile.id, [(profile.latitude, profile.longitude)])
+        return db_profile
+
+    async def get_by_id(self, db: AsyncSession, instructor_id: int):
+        return await db.get(InstructorProfile, instructor_id)
+
+    async def get_by_radius(
+        self,
+        db: AsyncSession,
+        lat: float,
+        long: float,
+        radius_km: float,
+        filters: Optional[InstructorSearchFiltersDTO] = None,
+        after: Optional[SearchCursor] = None,
+        limit: Optional[int] = None,
+    ):
+        """
+        Ver InstructorRepository.get_by_radius.
+        O nome do usuário é projetado no próprio SELECT (sem lazy load de `profile.user`).
+        """
+        stmt = _radius_search_stmt(lat, long, radius_km, filters, after, limit)
+        result = await db.execute(stmt)
+        return [_search_row(row) for row in result]
+
+    async def list_for_index(self, db: AsyncSession):
+        result = await db.execute(_index_rows_stmt())
+        return result.mappings().all()
+
+    async def list_candidates(self, db: AsyncSession, lat: float, long: float, radius_km: float):
+        result = await db.execute(_candidates_stmt(lat, long, radius_km))
+        return result.mappings().all()
+
+    async def get_pending(self, db: AsyncSession):
+        result = await db.execute(
+            select(InstructorProfile).where(InstructorProfile.status == InstructorStatus.PENDING)
+        )
+        return result.scalars().all()
+
+    async def update_status(self, db: AsyncSession, instructor_id: int, new_status: InstructorStatus):
+        profile = await db.get(InstructorProfile, instructor_id)
+        if profile:
+            profile.status = new_status
+            await db.commit()
+            await db.refresh(profile)
+            location = (await db.execute(_location_stmt(instructor_id))).first()
+            await instructor_events.publish_changed_async(instructor_id, [tuple(location) if location else None])
+        return profile
+
+    async def update_documents(self, db: AsyncSession, instructor_id: int, cnh_url: str, vehicle_doc_url: str):
+        profile = await db.get(InstructorProfile, instructor_id)
+        if profile:
+            if cnh_url: profile.cnh_url = cnh_url
+            if vehicle_doc_url: profile.vehicle_doc_url = vehicle_doc_url
+            await db.commit()
+            await db.refresh(profile)
+        return profile
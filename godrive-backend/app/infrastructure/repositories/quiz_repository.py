@@ -1,5 +1,7 @@
 # app/repositories/quiz_repository.py
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import select
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.infrastructure.db.models.quiz import Quiz, Question, QuestionOption, UserQuizAttempt
 from app.application.dtos import CreateQuizDTO, CreateQuestionDTO
 
@@ -71,4 +73,64 @@ class QuizRepository:
         db.add(db_attempt)
         db.commit()
         db.refresh(db_attempt)
-        return db_attempt
\ No newline at end of file
+        return db_attempt
+
+
+class AsyncQuizRepository:
+    """Versão assíncrona (AsyncSession) do QuizRepository."""
+
+    async def create_quiz(self, db: AsyncSession, quiz_in: CreateQuizDTO):
+        db_quiz = Quiz(
+            module_id=quiz_in.module_id,
+            title=quiz_in.title,
+            description=quiz_in.description,
+            passing_score=quiz_in.passing_score
+        )
+        db.add(db_quiz)
+        await db.commit()
+        await db.refresh(db_quiz)
+        return db_quiz
+
+    async def add_question(self, db: AsyncSession, quiz_id: int, question_in: CreateQuestionDTO):
+        db_question = Question(
+            quiz_id=quiz_id,
+            text=question_in.text,
+            points=question_in.points,
+            order=question_in.order
+        )
+        db.add(db_question)
+        await db.flush()  # Gera o ID da pergunta sem fechar a transação
+
+        for opt in question_in.options:
+            db.add(QuestionOption(
+                question_id=db_question.id,
+                text=opt.text,
+                is_correct=opt.is_correct
+            ))
+
+        await db.commit()
+        return db_question
+
+    async def get_quiz_full(self, db: AsyncSession, quiz_id: int):
+        """
+        Carrega perguntas e opções com selectinload.
+        Obrigatório em AsyncSession: lazy loading não é permitido.
+        """
+        result = await db.execute(
+            select(Quiz)
+            .options(selectinload(Quiz.questions).selectinload(Question.options))
+            .where(Quiz.id == quiz_id)
+        )
+        return result.scalars().first()
+
+    async def create_attempt(self, db: AsyncSession, user_id: int, quiz_id: int, score: float, passed: bool):
+        db_attempt = UserQuizAttempt(
+            user_id=user_id,
+            quiz_id=quiz_id,
+            score_achieved=score,
+            passed=passed
+        )
+        db.add(db_attempt)
+        await db.commit()
+        await db.refresh(db_attempt)
+        return db_attempt
@@ -1,9 +1,91 @@
 # app/repositories/review_repository.py
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import exists, func, select, text, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from app.infrastructure.db.models.review import Review
+from app.infrastructure.db.models.rating_summary import RatingSummary
+from app.infrastructure.db.models.instructor import InstructorProfile
+from app.infrastructure.search.invalidation_bus import instructor_events
+from app.infrastructure.repositories.user_repository import pending_reviews_delta_stmt
 from app.application.dtos import CreateReviewDTO
 
+STARS = range(1, 6)
+_COUNTER_COLUMNS = ["rating_count", "rating_sum"] + [f"count_{star}" for star in STARS]
+
+def _bump_summary_stmt(reviewee_id: int, rating: int):
+    """Soma uma avaliação ao agregado do avaliado (upsert; a linha fica travada até o commit)."""
+    if rating not in STARS:
+        raise ValueError(f"Nota inválida: {rating}")
+    star = f"count_{rating}"
+    stmt = pg_insert(RatingSummary).values(
+        user_id=reviewee_id, rating_count=1, rating_sum=rating, **{star: 1}
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=[RatingSummary.user_id],
+        set_={
+            "rating_count": RatingSummary.rating_count + 1,
+            "rating_sum": RatingSummary.rating_sum + rating,
+            star: getattr(RatingSummary, star) + 1,
+            "updated_at": func.now(),
+        },
+    )
+
+def _rebuild_summaries_stmts():
+    """
+    Recalcula todos os agregados a partir de reviews (backfill / correção de drift).
+    O lock vem primeiro: SHARE ROW EXCLUSIVE conflita com o upsert de `create`,
+    então nenhum incremento concorrente é sobrescrito pelo recálculo; avaliações
+    ainda não commitadas somam por cima do valor recalculado, depois do commit.
+    """
+    lock = text(f"LOCK TABLE {RatingSummary.__tablename__} IN SHARE ROW EXCLUSIVE MODE")
+    aggregate = select(
+        Review.reviewee_id,
+        func.count(),
+        func.sum(Review.rating),
+        *[func.count().filter(Review.rating == star) for star in STARS],
+    ).group_by(Review.reviewee_id)
+    upsert = pg_insert(RatingSummary).from_select(["user_id"] + _COUNTER_COLUMNS, aggregate)
+    upsert = upsert.on_conflict_do_update(
+        index_elements=[RatingSummary.user_id],
+        set_={**{col: upsert.excluded[col] for col in _COUNTER_COLUMNS}, "updated_at": func.now()},
+    )
+    # Usuários sem nenhuma avaliação restante voltam a zero
+    reset = update(RatingSummary).where(
+        ~exists().where(Review.reviewee_id == RatingSummary.user_id)
+    ).values({**{col: 0 for col in _COUNTER_COLUMNS}, "updated_at": func.now()})
+    return lock, upsert, reset
+
+def _instructor_rating_stmt(user_id: int):
+    """
+    (lat, long, rating_sum, rating_count) do avaliado se ele for instrutor
+    (nenhuma linha caso contrário).
+    """
+    return select(
+        func.ST_Y(InstructorProfile.location),
+        func.ST_X(InstructorProfile.location),
+        RatingSummary.rating_sum,
+        RatingSummary.rating_count,
+    ).outerjoin(
+        RatingSummary, RatingSummary.user_id == InstructorProfile.id
+    ).where(InstructorProfile.id == user_id)
+
+def _rating_event(row):
+    """(posição, média) publicados na invalidação da busca."""
+    lat, long, rating_sum, rating_count = row
+    average = rating_sum / rating_count if rating_count else None
+    return (lat, long), average
+
+def _summary_dict(summary) -> dict:
+    """Formato do resumo de avaliações (média com 1 casa, total e histograma)."""
+    if summary is None or not summary.rating_count:
+        return {"average": 0.0, "count": 0, "histogram": {star: 0 for star in STARS}}
+    return {
+        "average": round(summary.average, 1),
+        "count": summary.rating_count,
+        "histogram": summary.histogram,
+    }
+
 class ReviewRepository:
     
     def create(self, db: Session, reviewer_id: int, reviewee_id: int, review_in: CreateReviewDTO):
@@ -15,8 +97,16 @@ class ReviewRepository:
             comment=review_in.comment
         )
         db.add(db_review)
+        db.flush()
+        # Agregado e contador de pendências atualizados na mesma transação: entram juntos ou não entram
+        db.execute(_bump_summary_stmt(reviewee_id, review_in.rating))
+        db.execute(pending_reviews_delta_stmt([reviewer_id], -1))
         db.commit()
         db.refresh(db_review)
+        # A média aparece na busca: troca no índice e invalida o cache da região do instrutor
+        row = db.execute(_instructor_rating_stmt(reviewee_id)).first()
+        if row is not None:
+            instructor_events.publish_rating_changed(reviewee_id, *_rating_event(row))
         return db_review
 
     def get_by_user(self, db: Session, user_id: int, limit: int = 20):
@@ -28,20 +118,65 @@ class ReviewRepository:
                  .all()
 
     def get_stats_by_user(self, db: Session, user_id: int):
-        """Calcula a média e o total de avaliações recebidas."""
-        result = db.query(
-            func.avg(Review.rating).label("average"),
-            func.count(Review.id).label("count")
-        ).filter(Review.reviewee_id == user_id).first()
-        
-        return {
-            "average": round(result.average, 1) if result.average else 0.0,
-            "count": result.count
-        }
+        """Média, total e histograma das avaliações recebidas (agregado mantido, sem AVG)."""
+        return _summary_dict(db.get(RatingSummary, user_id))
+
+    def rebuild_summaries(self, db: Session):
+        """Recalcula todos os agregados a partir de reviews. Retorna (atualizados, zerados)."""
+        lock, upsert, reset = _rebuild_summaries_stmts()
+        db.execute(lock)
+        updated = db.execute(upsert).rowcount
+        reset_count = db.execute(reset).rowcount
+        db.commit()
+        return updated, reset_count
     
     def get_existing_review(self, db: Session, ride_id: int, reviewer_id: int):
         """Verifica se já existe avaliação deste usuário para esta aula."""
         return db.query(Review).filter(
             Review.ride_id == ride_id,
             Review.reviewer_id == reviewer_id
-        ).first()
\ No newline at end of file
+        ).first()
+
+
+class AsyncReviewRepository:
+    """Versão assíncrona (AsyncSession) do ReviewRepository."""
+
+    async def create(self, db: AsyncSession, reviewer_id: int, reviewee_id: int, review_in: CreateReviewDTO):
+        db_review = Review(
+            ride_id=review_in.ride_id,
+            reviewer_id=reviewer_id,
+            reviewee_id=reviewee_id,
+            rating=review_in.rating,
+            comment=review_in.comment
+        )
+        db.add(db_review)
+        await db.flush()
+        await db.execute(_bump_summary_stmt(reviewee_id, review_in.rating))
+        await db.execute(pending_reviews_delta_stmt([reviewer_id], -1))
+        await db.commit()
+        await db.refresh(db_review)
+        row = (await db.execute(_instructor_rating_stmt(reviewee_id))).first()
+        if row is not None:
+            await instructor_events.publish_rating_changed_async(reviewee_id, *_rating_event(row))
+        return db_review
+
+    async def get_by_user(self, db: AsyncSession, user_id: int, limit: int = 20):
+        result = await db.execute(
+            select(Review)
+            .where(Review.reviewee_id == user_id)
+            .order_by(Review.created_at.desc())
+            .limit(limit)
+        )
+        return result.scalars().all()
+
+    async def get_stats_by_user(self, db: AsyncSession, user_id: int):
+        return _summary_dict(await db.get(RatingSummary, user_id))
+
+    async def get_existing_review(self, db: AsyncSession, ride_id: int, reviewer_id: int):
+        result = await db.execute(
+            select(Review).where(
+                Review.ride_id == ride_id,
+                Review.reviewer_id == reviewer_id
+            )
+        )
+        return result.scalars().first()
@@ -1,9 +1,185 @@
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.infrastructure.db.models.ride import Ride, RideStatus
-from app.application.dtos import CreateRideDTO
-from sqlalchemy import extract, cast, Date, and_, or_
-from datetime import date
+from app.application.dtos import CreateRideDTO, RideHistoryFiltersDTO
+from sqlalchemy import extract, and_, or_, select, update, exists, union_all, func, tuple_
+from sqlalchemy.exc import DBAPIError
+from datetime import date, datetime, time, timedelta, timezone, tzinfo
+from typing import List, Optional, Tuple
+from zoneinfo import ZoneInfo
 from app.infrastructure.db.models.review import Review
+from app.infrastructure.config.settings import settings
+from app.infrastructure.db.models.user import User
+from app.infrastructure.repositories.user_repository import pending_reviews_delta_stmt
+
+# Exclusion constraint que impede aulas sobrepostas do mesmo instrutor (ver modelo Ride)
+SLOT_CONFLICT_CONSTRAINT = "ex_rides_instructor_no_overlap"
+
+# SQLSTATEs que valem nova tentativa: serialization_failure, deadlock_detected, lock_not_available
+TRANSIENT_SQLSTATES = {"40001", "40P01", "55P03"}
+
+def _sqlstate(exc: DBAPIError) -> Optional[str]:
+    # psycopg2 expõe `pgcode`; asyncpg (via adaptador do SQLAlchemy) expõe `sqlstate`
+    orig = getattr(exc, "orig", None)
+    return getattr(orig, "pgcode", None) or getattr(orig, "sqlstate", None)
+
+def is_slot_conflict(exc: DBAPIError) -> bool:
+    """True se a escrita falhou porque o horário do instrutor já está reservado."""
+    return _sqlstate(exc) == "23P01" and SLOT_CONFLICT_CONSTRAINT in str(exc.orig)
+
+def is_transient(exc: DBAPIError) -> bool:
+    return _sqlstate(exc) in TRANSIENT_SQLSTATES
+
+def instructor_timezone() -> tzinfo:
+    """Fuso da agenda do instrutor (hoje único para a plataforma, ver settings.DEFAULT_TIMEZONE)."""
+    return ZoneInfo(settings.DEFAULT_TIMEZONE)
+
+def local_day_range(day: date, tz: tzinfo) -> Tuple[datetime, datetime]:
+    """
+    Intervalo semiaberto [00:00 do dia, 00:00 do dia seguinte) no fuso `tz`.
+    Calculado por data (e não somando 24h) para respeitar horário de verão.
+    """
+    start = datetime.combine(day, time.min, tzinfo=tz)
+    end = datetime.combine(day + timedelta(days=1), time.min, tzinfo=tz)
+    return start, end
+
+def _expire_pending_stmt(ttl_seconds: float):
+    # Checkouts abandonados: pending_payment há mais de ttl_seconds
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=ttl_seconds)
+    return (
+        update(Ride)
+        .where(Ride.status == RideStatus.PENDING_PAYMENT, Ride.created_at < cutoff)
+        .values(status=RideStatus.CANCELLED)
+        .returning(Ride.id, Ride.instructor_id)
+    )
+
+def _complete_stmt(ride_id: int, from_status: str = RideStatus.IN_PROGRESS):
+    # Compare-and-set: só uma requisição conclui a aula (e soma o contador de pendências)
+    return (
+        update(Ride)
+        .where(Ride.id == ride_id, Ride.status == from_status)
+        .values(status=RideStatus.COMPLETED, updated_at=datetime.now(timezone.utc))
+        .returning(Ride.student_id, Ride.instructor_id)
+        .execution_options(synchronize_session=False)
+    )
+
+def complete_ride(db: Session, ride_id: int, from_status: str = RideStatus.IN_PROGRESS) -> bool:
+    """
+    Conclui a aula se ela ainda estiver em `from_status` e soma uma avaliação
+    pendente para aluno e instrutor. Não faz commit (transação de quem chama).
+    False se outra requisição já mudou o status: nada é alterado.
+    """
+    row = db.execute(_complete_stmt(ride_id, from_status)).first()
+    if row is None:
+        return False
+    db.execute(pending_reviews_delta_stmt([row.student_id, row.instructor_id], 1))
+    return True
+
+def _busy_intervals_stmt(instructor_id: int, start: datetime, end: datetime):
+    # Intervalo semiaberto direto na coluna (usa o índice (instructor_id, scheduled_at),
+    # ao contrário do cast para Date).
+    # Aulas em pending_payment ocupam o horário enquanto o checkout está vivo
+    # (mesmo prazo do reaper): o banco é a fonte, os holds são só um complemento.
+    hold_cutoff = datetime.now(timezone.utc) - timedelta(seconds=settings.SLOT_HOLD_TTL_SECONDS)
+    return select(Ride.scheduled_at, Ride.duration_minutes).where(
+        Ride.instructor_id == instructor_id,
+        Ride.status != RideStatus.CANCELLED,
+        or_(Ride.status != RideStatus.PENDING_PAYMENT, Ride.created_at >= hold_cutoff),
+        Ride.scheduled_at >= start,
+        Ride.scheduled_at < end,
+    ).order_by(Ride.scheduled_at)
+
+# Cursor do histórico de aulas: (scheduled_at, id) do último item da página
+HistoryCursor = Tuple[datetime, int]
+
+# Projeção das listagens: só as colunas do card, sem instanciar o ORM (identity map)
+HISTORY_COLUMNS = (
+    Ride.id,
+    Ride.student_id,
+    Ride.instructor_id,
+    Ride.scheduled_at,
+    Ride.duration_minutes,
+    Ride.price,
+    Ride.status,
+)
+
+def _history_stmt(
+    participant_column,
+    user_id: int,
+    filters: Optional[RideHistoryFiltersDTO],
+    after: Optional[HistoryCursor],
+    limit: int,
+):
+    """
+    Histórico do participante, mais recentes primeiro, com paginação keyset
+    por (scheduled_at, id). Usa os índices (student_id, scheduled_at, id) e
+    (instructor_id, scheduled_at) das aulas.
+    """
+    stmt = select(*HISTORY_COLUMNS).where(participant_column == user_id)
+    filters = filters or RideHistoryFiltersDTO()
+    if filters.statuses:
+        stmt = stmt.where(Ride.status.in_(filters.statuses))
+    if filters.scheduled_from is not None:
+        stmt = stmt.where(Ride.scheduled_at >= filters.scheduled_from)
+    if filters.scheduled_to is not None:
+        stmt = stmt.where(Ride.scheduled_at < filters.scheduled_to)
+    if after is not None:
+        stmt = stmt.where(tuple_(Ride.scheduled_at, Ride.id) < tuple_(*after))
+    return stmt.order_by(Ride.scheduled_at.desc(), Ride.id.desc()).limit(limit)
+
+def _not_reviewed_by(user_id):
+    # Anti-join pela unique (ride_id, reviewer_id) de reviews
+    # correlate_except: `user_id` pode ser a coluna users.id do UPDATE de recálculo
+    return ~exists().where(
+        Review.ride_id == Ride.id, Review.reviewer_id == user_id
+    ).correlate_except(Review)
+
+def _pending_review_exists(user_id: int, participant_column):
+    # Um EXISTS por papel: cada um usa o índice parcial de aulas concluídas
+    # (rides.student_id / rides.instructor_id WHERE status = 'completed'); um OR
+    # entre as duas colunas não usaria nenhum dos dois.
+    return exists().where(
+        participant_column == user_id,
+        Ride.status == RideStatus.COMPLETED,
+        _not_reviewed_by(user_id),
+    )
+
+def _pending_reviews_stmt(user_id: int):
+    return select(Ride).where(
+        Ride.status == RideStatus.COMPLETED,
+        or_(Ride.student_id == user_id, Ride.instructor_id == user_id),
+        _not_reviewed_by(user_id),
+    )
+
+def _rebuild_pending_review_counts_stmts():
+    """Recalcula users.pending_review_count a partir de rides/reviews (backfill / drift)."""
+    participations = union_all(
+        select(Ride.id.label("ride_id"), Ride.student_id.label("user_id"))
+        .where(Ride.status == RideStatus.COMPLETED),
+        select(Ride.id, Ride.instructor_id)
+        .where(Ride.status == RideStatus.COMPLETED),
+    ).subquery()
+    pending = (
+        select(participations.c.user_id, func.count().label("pending"))
+        .where(~exists().where(
+            Review.ride_id == participations.c.ride_id,
+            Review.reviewer_id == participations.c.user_id,
+        ))
+        .group_by(participations.c.user_id)
+        .subquery()
+    )
+    # updated_at do usuário é do perfil: o contador não mexe nele
+    fix = update(User).where(
+        User.id == pending.c.user_id,
+        User.pending_review_count != pending.c.pending,
+    ).values(pending_review_count=pending.c.pending, updated_at=User.updated_at)
+    # Contador > 0 sem nenhuma aula pendente (EXISTS por papel, pelos índices parciais)
+    reset = update(User).where(
+        User.pending_review_count != 0,
+        ~_pending_review_exists(User.id, Ride.student_id),
+        ~_pending_review_exists(User.id, Ride.instructor_id),
+    ).values(pending_review_count=0, updated_at=User.updated_at)
+    return [stmt.execution_options(synchronize_session=False) for stmt in (fix, reset)]
 
 class RideRepository:
     
@@ -27,24 +203,32 @@ class RideRepository:
     def get_by_student(self, db: Session, student_id: int):
         return db.query(Ride).filter(Ride.student_id == student_id).order_by(Ride.scheduled_at.desc()).all()
 
+    def list_history(
+        self,
+        db: Session,
+        user_id: int,
+        as_instructor: bool = False,
+        filters: Optional[RideHistoryFiltersDTO] = None,
+        after: Optional[HistoryCursor] = None,
+        limit: int = 20,
+    ):
+        """Página do histórico (aluno ou instrutor) como linhas leves (mappings), não ORM."""
+        column = Ride.instructor_id if as_instructor else Ride.student_id
+        return db.execute(_history_stmt(column, user_id, filters, after, limit)).mappings().all()
+
     def get_pending_reviews_for_user(self, db: Session, user_id: int):
         """
         Busca aulas que foram concluídas mas que o usuário (Aluno ou Instrutor) 
         ainda não avaliou.
+        Para saber só se existe alguma, use o contador users.pending_review_count.
         """
-        return db.query(Ride).outerjoin(
-            Review,
-            and_(
-                Review.ride_id == Ride.id,
-                Review.reviewer_id == user_id
-            )
-        ).filter(
-            Ride.status == RideStatus.COMPLETED,
-            # O usuário deve ser participante da aula
-            or_(Ride.student_id == user_id, Ride.instructor_id == user_id),
-            # E não deve ter avaliação criada por ele (Review.id IS NULL)
-            Review.id == None
-        ).all()
+        return db.execute(_pending_reviews_stmt(user_id)).scalars().all()
+
+    def rebuild_pending_review_counts(self, db: Session) -> int:
+        """Recalcula o contador de avaliações pendentes de todos os usuários. Retorna os corrigidos."""
+        fixed = sum(db.execute(stmt).rowcount for stmt in _rebuild_pending_review_counts_stmts())
+        db.commit()
+        return fixed
 
     def get_by_instructor(self, db: Session, instructor_id: int):
         return db.query(Ride).filter(Ride.instructor_id == instructor_id).order_by(Ride.scheduled_at.desc()).all()
@@ -52,12 +236,133 @@ class RideRepository:
     def get_by_id(self, db: Session, ride_id: int):
         return db.query(Ride).filter(Ride.id == ride_id).first()
     
-    def get_by_instructor_and_date(self, db: Session, instructor_id: int, date_filter: date):
+    def get_by_instructor_and_date(
+        self, db: Session, instructor_id: int, date_filter: date, tz: Optional[tzinfo] = None
+    ):
         """
-        Busca todas as aulas de um instrutor que ocorrem em uma data específica (ano-mes-dia).
+        Busca todas as aulas de um instrutor que ocorrem em uma data específica (ano-mes-dia),
+        considerando o dia no fuso do instrutor.
         """
+        day_start, day_end = local_day_range(date_filter, tz or instructor_timezone())
         return db.query(Ride).filter(
             Ride.instructor_id == instructor_id,
-            # Faz o cast do campo DateTime para Date para comparar apenas o dia
-            cast(Ride.scheduled_at, Date) == date_filter
-        ).all()
\ No newline at end of file
+            # Intervalo semiaberto direto na coluna: usa o índice (instructor_id, scheduled_at).
+            # O antigo cast(scheduled_at, Date) impedia o índice e usava o fuso da sessão.
+            Ride.scheduled_at >= day_start,
+            Ride.scheduled_at < day_end
+        ).all()
+
+    def get_busy_intervals_in_range(self, db: Session, instructor_id: int, start: datetime, end: datetime):
+        """
+        (scheduled_at, duration_minutes) das aulas do instrutor que ocupam o horário
+        (não canceladas; em pending_payment só dentro do prazo do checkout) e
+        começam no intervalo [start, end).
+        Uma única query para o calendário inteiro.
+        """
+        return db.execute(_busy_intervals_stmt(instructor_id, start, end)).all()
+
+    def cancel_expired_pending(self, db: Session, ttl_seconds: float) -> List[Tuple[int, int]]:
+        """Cancela aulas aguardando pagamento há mais de ttl_seconds. Retorna (ride_id, instructor_id)."""
+        expired = [tuple(row) for row in db.execute(_expire_pending_stmt(ttl_seconds)).all()]
+        db.commit()
+        return expired
+
+
+class AsyncRideRepository:
+    """Versão assíncrona (AsyncSession) do RideRepository."""
+
+    async def create(self, db: AsyncSession, student_id: int, ride_in: CreateRideDTO, price: float):
+        db_ride = Ride(
+            student_id=student_id,
+            instructor_id=ride_in.instructor_id,
+            scheduled_at=ride_in.scheduled_at,
+            price=price,
+            status=RideStatus.PENDING_PAYMENT,
+            duration_minutes=50,
+            pickup_latitude=ride_in.pickup_latitude,
+            pickup_longitude=ride_in.pickup_longitude
+        )
+        db.add(db_ride)
+        await db.commit()
+        await db.refresh(db_ride)
+        return db_ride
+
+    async def get_by_id(self, db: AsyncSession, ride_id: int):
+        return await db.get(Ride, ride_id)
+
+    async def get_participants(self, db: AsyncSession, ride_id: int) -> Optional[Tuple[int, int]]:
+        """(student_id, instructor_id) da aula, sem carregar a linha inteira. None se não existir."""
+        result = await db.execute(
+            select(Ride.student_id, Ride.instructor_id).where(Ride.id == ride_id)
+        )
+        row = result.first()
+        return (row.student_id, row.instructor_id) if row else None
+
+    async def get_by_student(self, db: AsyncSession, student_id: int):
+        result = await db.execute(
+            select(Ride).where(Ride.student_id == student_id).order_by(Ride.scheduled_at.desc())
+        )
+        return result.scalars().all()
+
+    async def list_history(
+        self,
+        db: AsyncSession,
+        user_id: int,
+        as_instructor: bool = False,
+        filters: Optional[RideHistoryFiltersDTO] = None,
+        after: Optional[HistoryCursor] = None,
+        limit: int = 20,
+    ):
+        """Ver RideRepository.list_history."""
+        column = Ride.instructor_id if as_instructor else Ride.student_id
+        result = await db.execute(_history_stmt(column, user_id, filters, after, limit))
+        return result.mappings().all()
+
+    async def get_by_instructor(self, db: AsyncSession, instructor_id: int):
+        result = await db.execute(
+            select(Ride).where(Ride.instructor_id == instructor_id).order_by(Ride.scheduled_at.desc())
+        )
+        return result.scalars().all()
+
+    async def get_pending_reviews_for_user(self, db: AsyncSession, user_id: int):
+        """Ver RideRepository.get_pending_reviews_for_user."""
+        result = await db.execute(_pending_reviews_stmt(user_id))
+        return result.scalars().all()
+
+    async def complete(self, db: AsyncSession, ride: Ride) -> Optional[Ride]:
+        """
+        Conclui a aula em andamento e soma uma avaliação pendente para aluno e
+        instrutor, na mesma transação. None se ela não estava mais em andamento
+        (ex: duas requisições de finalização concorrentes): o contador não muda.
+        """
+        row = (await db.execute(_complete_stmt(ride.id))).first()
+        if row is None:
+            await db.rollback()
+            return None
+        await db.execute(pending_reviews_delta_stmt([row.student_id, row.instructor_id], 1))
+        await db.commit()
+        await db.refresh(ride)
+        return ride
+
+    async def get_by_instructor_and_date(
+        self, db: AsyncSession, instructor_id: int, date_filter: date, tz: Optional[tzinfo] = None
+    ):
+        day_start, day_end = local_day_range(date_filter, tz or instructor_timezone())
+        result = await db.execute(
+            select(Ride).where(
+                Ride.instructor_id == instructor_id,
+                Ride.scheduled_at >= day_start,
+                Ride.scheduled_at < day_end
+            )
+        )
+        return result.scalars().all()
+
+    async def get_busy_intervals_in_range(self, db: AsyncSession, instructor_id: int, start: datetime, end: datetime):
+        result = await db.execute(_busy_intervals_stmt(instructor_id, start, end))
+        return result.all()
+
+    async def cancel_expired_pending(self, db: AsyncSession, ttl_seconds: float) -> List[Tuple[int, int]]:
+        result = await db.execute(_expire_pending_stmt(ttl_seconds))
+        expired = [tuple(row) for row in result.all()]
+        await db.commit()
+        return expired
@@ -0,0 +1,77 @@
+from datetime import datetime
+from typing import Sequence, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.infrastructure.db.models.ride_track import RideTrack
+from app.infrastructure.tracking.track_codec import decode_track, encode_track
+
+# (latitude, longitude, instante do ponto)
+TrackSample = Tuple[float, float, datetime]
+
+def _ensure_row_stmt(ride_id: int, sender_id: int, first_at: datetime):
+    # Cria o trajeto vazio se ainda não existir (idempotente entre processos)
+    return pg_insert(RideTrack).values(
+        ride_id=ride_id,
+        sender_id=sender_id,
+        started_at=first_at,
+        ended_at=first_at,
+        point_count=0,
+        data=encode_track([]),
+    ).on_conflict_do_nothing(constraint="uq_ride_track_ride_sender")
+
+def _locked_track_stmt(ride_id: int, sender_id: int):
+    return select(RideTrack).where(
+        RideTrack.ride_id == ride_id,
+        RideTrack.sender_id == sender_id,
+    ).with_for_update()
+
+def _append_samples(track: RideTrack, samples: Sequence[TrackSample]) -> None:
+    """Anexa os pontos ao blob do trajeto (tempos relativos a started_at)."""
+    points = decode_track(track.data)
+    for lat, long, at in samples:
+        t_ms = int((at - track.started_at).total_seconds() * 1000)
+        points.append((lat, long, max(t_ms, 0)))
+    track.data = encode_track(points)
+    track.point_count = len(points)
+    track.ended_at = max(track.ended_at, samples[-1][2])
+
+class RideTrackRepository:
+
+    def append_points(self, db: Session, ride_id: int, sender_id: int, samples: Sequence[TrackSample]):
+        """
+        Anexa um lote de pontos ao trajeto do participante.
+        Não faz commit: o chamador grava vários trajetos na mesma transação.
+        """
+        if not samples:
+            return
+        db.execute(_ensure_row_stmt(ride_id, sender_id, samples[0][2]))
+        track = db.execute(_locked_track_stmt(ride_id, sender_id)).scalar_one()
+        _append_samples(track, samples)
+
+    def get_by_ride(self, db: Session, ride_id: int):
+        return db.query(RideTrack)\
+                 .filter(RideTrack.ride_id == ride_id)\
+                 .order_by(RideTrack.sender_id)\
+                 .all()
+
+class AsyncRideTrackRepository:
+    """Versão assíncrona (AsyncSession) do RideTrackRepository."""
+
+    async def append_points(self, db: AsyncSession, ride_id: int, sender_id: int, samples: Sequence[TrackSample]):
+        if not samples:
+            return
+        await db.execute(_ensure_row_stmt(ride_id, sender_id, samples[0][2]))
+        track = (await db.execute(_locked_track_stmt(ride_id, sender_id))).scalar_one()
+        _append_samples(track, samples)
+
+    async def get_by_ride(self, db: AsyncSession, ride_id: int):
+        result = await db.execute(
+            select(RideTrack)
+            .where(RideTrack.ride_id == ride_id)
+            .order_by(RideTrack.sender_id)
+        )
+        return result.scalars().all()
@@ -1,7 +1,24 @@
+from typing import Iterable
+from sqlalchemy import func, select, update
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.infrastructure.db.models.user import User
 from app.application.dtos import CreateUserDTO
 
+def pending_reviews_delta_stmt(user_ids: Iterable[int], delta: int):
+    """
+    Soma `delta` ao contador de avaliações pendentes (nunca abaixo de zero).
+    Executado na transação de quem muda o estado (aula concluída / avaliação criada).
+    """
+    return update(User).where(User.id.in_(list(user_ids))).values(
+        pending_review_count=func.greatest(User.pending_review_count + delta, 0),
+        # updated_at é do perfil: o contador não mexe nele
+        updated_at=User.updated_at,
+    ).execution_options(synchronize_session=False)
+
+def _pending_review_count_stmt(user_id: int):
+    return select(User.pending_review_count).where(User.id == user_id)
+
 class UserRepository:
     def get_by_email(self, db: Session, email: str):
         return db.query(User).filter(User.email == email).first()
@@ -15,4 +32,33 @@ class UserRepository:
         db.add(db_user)
         db.commit()
         db.refresh(db_user)
-        return db_user
\ No newline at end of file
+        return db_user
+
+    def get_pending_review_count(self, db: Session, user_id: int) -> int:
+        """Contador mantido de avaliações pendentes (lookup pela PK)."""
+        return db.execute(_pending_review_count_stmt(user_id)).scalar() or 0
+
+
+class AsyncUserRepository:
+    """Versão assíncrona (AsyncSession) do UserRepository."""
+
+    async def get_by_email(self, db: AsyncSession, email: str):
+        result = await db.execute(select(User).where(User.email == email))
+        return result.scalars().first()
+
+    async def get_by_id(self, db: AsyncSession, user_id: int):
+        return await db.get(User, user_id)
+
+    async def create(self, db: AsyncSession, user: CreateUserDTO, hashed_password: str):
+        db_user = User(
+            email=user.email,
+            hashed_password=hashed_password,
+            full_name=user.full_name
+        )
+        db.add(db_user)
+        await db.commit()
+        await db.refresh(db_user)
+        return db_user
+
+    async def get_pending_review_count(self, db: AsyncSession, user_id: int) -> int:
+        return (await db.execute(_pending_review_count_stmt(user_id))).scalar() or 0
@@ -0,0 +1,10 @@
+# Infrastructure Scheduling
+# Estado temporário da agenda dos instrutores (ex: holds de horário no checkout).
+
+from .slot_holds import SlotHoldRegistry, slot_holds, run_pending_reaper
+
+__all__ = [
+    "SlotHoldRegistry",
+    "slot_holds",
+    "run_pending_reaper",
+]
@@ -0,0 +1,220 @@
+"""
+Slot Holds
+
+Reservas temporárias de horário durante o checkout.
+
+Uma aula criada em `pending_payment` segura o horário do instrutor por
+`ttl_seconds` (o tempo do checkout). Depois disso, ou o webhook do Stripe
+confirma a aula (`scheduled`) e o hold é liberado, ou o reaper cancela a aula
+abandonada e o horário volta a ficar livre.
+
+- Redis: um hash por instrutor (`godrive:slot-holds:{instructor_id}`), com um
+  campo por aula. É a fonte compartilhada entre os workers.
+- Memória: cada processo mantém um espelho dos holds, atualizado via pub/sub
+  (e recarregado do Redis ao (re)conectar). O AvailabilityService soma esse
+  espelho às aulas lidas do banco, que já incluem as pendentes dentro do prazo
+  do checkout: o espelho é só um complemento, nunca a única fonte.
+
+A exclusividade do horário continua sendo garantida pela constraint do banco
+(ex_rides_instructor_no_overlap); os holds só tornam a agenda exibida correta.
+Falhas no Redis nunca derrubam a reserva: o espelho local é atualizado de
+qualquer forma e o reaper cobre o restante.
+"""
+import asyncio
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import redis
+
+from app.infrastructure.config.settings import settings
+
+KEY_PREFIX = "godrive:slot-holds"
+CHANNEL = "godrive:slot-holds:changed"
+
+# Espera antes de reassinar o canal após perder a conexão
+RESUBSCRIBE_DELAY_SECONDS = 1.0
+
+# (início, fim, expira_em) em epoch seconds
+Hold = Tuple[float, float, float]
+
+
+def _key(instructor_id: int) -> str:
+    return f"{KEY_PREFIX}:{instructor_id}"
+
+
+def _epoch(value: datetime) -> float:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+class SlotHoldRegistry:
+    """Holds de horário por instrutor: Redis compartilhado + espelho em memória."""
+
+    def __init__(self, redis_url: str, ttl_seconds: int = 900):
+        self.redis_url = redis_url
+        self.ttl_seconds = ttl_seconds
+        self._client: Optional[redis.Redis] = None
+        # { instructor_id: { ride_id: (início, fim, expira_em) } }
+        self._holds: Dict[int, Dict[int, Hold]] = {}
+        self._lock = threading.Lock()
+        self._stats = {"held": 0, "released": 0, "received": 0, "errors": 0}
+
+    def _sync_client(self) -> redis.Redis:
+        if self._client is None:
+            # Timeouts curtos: roda dentro da requisição de reserva
+            self._client = redis.Redis.from_url(
+                self.redis_url,
+                decode_responses=True,
+                socket_timeout=2,
+                socket_connect_timeout=2,
+            )
+        return self._client
+
+    # --- Espelho em memória ---
+
+    def _apply(self, op: str, instructor_id: int, ride_id: int, hold: Optional[Hold] = None) -> None:
+        with self._lock:
+            if op == "hold":
+                self._holds.setdefault(instructor_id, {})[ride_id] = hold
+            else:
+                holds = self._holds.get(instructor_id)
+                if holds is not None:
+                    holds.pop(ride_id, None)
+                    if not holds:
+                        del self._holds[instructor_id]
+
+    def intervals(self, instructor_id: int, start: datetime, end: datetime) -> List[Tuple[datetime, datetime]]:
+        """Holds vigentes do instrutor que encostam em [start, end), como datetimes UTC."""
+        now = time.time()
+        start_ts, end_ts = _epoch(start), _epoch(end)
+        with self._lock:
+            holds = list(self._holds.get(instructor_id, {}).values())
+        return [
+            (datetime.fromtimestamp(h_start, timezone.utc), datetime.fromtimestamp(h_end, timezone.utc))
+            for h_start, h_end, expires_at in holds
+            if expires_at > now and h_start < end_ts and h_end > start_ts
+        ]
+
+    # --- Escrita (cliente síncrono: chamada nos endpoints `def`) ---
+
+    def hold(self, instructor_id: int, ride_id: int, start: datetime, end: datetime) -> None:
+        """Segura o horário da aula recém-criada por `ttl_seconds`."""
+        hold = (_epoch(start), _epoch(end), time.time() + self.ttl_seconds)
+        self._apply("hold", instructor_id, ride_id, hold)
+        self._stats["held"] += 1
+        self._publish("hold", instructor_id, ride_id, hold)
+
+    def release(self, instructor_id: int, ride_id: int) -> None:
+        """Libera o hold (aula confirmada, cancelada ou expirada)."""
+        self._apply("release", instructor_id, ride_id)
+        self._stats["released"] += 1
+        self._publish("release", instructor_id, ride_id)
+
+    async def release_async(self, instructor_id: int, ride_id: int) -> None:
+        """Versão para código assíncrono (não bloqueia o event loop)."""
+        await asyncio.to_thread(self.release, instructor_id, ride_id)
+
+    def _publish(self, op: str, instructor_id: int, ride_id: int, hold: Optional[Hold] = None) -> None:
+        message = {"op": op, "instructor_id": instructor_id, "ride_id": ride_id, "hold": hold}
+        try:
+            client = self._sync_client()
+            pipe = client.pipeline(transaction=False)
+            if op == "hold":
+                pipe.hset(_key(instructor_id), str(ride_id), json.dumps(hold))
+                pipe.expire(_key(instructor_id), self.ttl_seconds)
+            else:
+                pipe.hdel(_key(instructor_id), str(ride_id))
+            pipe.publish(CHANNEL, json.dumps(message))
+            pipe.execute()
+        except Exception as e:
+            self._stats["errors"] += 1
+            print(f"⚠️ Falha ao propagar hold ({op}) da aula {ride_id}: {e}")
+
+    # --- Sincronização entre workers ---
+
+    def _handle(self, data: str) -> None:
+        self._stats["received"] += 1
+        message = json.loads(data)
+        hold = tuple(message["hold"]) if message.get("hold") else None
+        self._apply(message["op"], int(message["instructor_id"]), int(message["ride_id"]), hold)
+
+    async def load(self, client) -> int:
+        """Recarrega o espelho a partir do Redis (cliente asyncio)."""
+        now = time.time()
+        holds: Dict[int, Dict[int, Hold]] = {}
+        async for key in client.scan_iter(match=f"{KEY_PREFIX}:*"):
+            instructor_id = int(key.rsplit(":", 1)[1])
+            for ride_id, value in (await client.hgetall(key)).items():
+                hold = tuple(json.loads(value))
+                if hold[2] > now:
+                    holds.setdefault(instructor_id, {})[int(ride_id)] = hold
+        with self._lock:
+            self._holds = holds
+        return sum(len(h) for h in holds.values())
+
+    async def listen(self, client) -> None:
+        """Loop de background (um por worker) que mantém o espelho atualizado."""
+        while True:
+            pubsub = client.pubsub()
+            try:
+                await pubsub.subscribe(CHANNEL)
+                # Assina antes de carregar: nenhum evento entre os dois passos se perde
+                await self.load(client)
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self._handle(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._stats["errors"] += 1
+                print(f"⚠️ Conexão com o canal de holds perdida: {e}")
+                await asyncio.sleep(RESUBSCRIBE_DELAY_SECONDS)
+            finally:
+                close = getattr(pubsub, "aclose", None) or pubsub.close
+                try:
+                    await close()
+                except Exception:
+                    pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            active = sum(len(h) for h in self._holds.values())
+        return {**self._stats, "active": active, "ttl_seconds": self.ttl_seconds}
+
+
+async def reap_pending_rides(ttl_seconds: float) -> int:
+    """
+    Cancela aulas em `pending_payment` criadas há mais de `ttl_seconds`
+    (checkout abandonado) e libera os holds. Idempotente: vários workers podem rodar.
+    """
+    # Import tardio: evita ciclo session -> settings -> holds no import da app
+    from app.infrastructure.db.session import AsyncSessionLocal
+    from app.infrastructure.repositories.ride_repository import AsyncRideRepository
+
+    async with AsyncSessionLocal() as db:
+        expired = await AsyncRideRepository().cancel_expired_pending(db, ttl_seconds)
+    for ride_id, instructor_id in expired:
+        await slot_holds.release_async(instructor_id, ride_id)
+    if expired:
+        print(f"🧹 {len(expired)} aula(s) com pagamento pendente expiradas.")
+    return len(expired)
+
+
+async def run_pending_reaper(interval_seconds: float, ttl_seconds: float) -> None:
+    """Loop de background (iniciado no lifespan) que expira checkouts abandonados."""
+    while True:
+        try:
+            await reap_pending_rides(ttl_seconds)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"⚠️ Falha ao expirar aulas pendentes: {e}")
+        await asyncio.sleep(interval_seconds)
+
+
+# Instância global (por processo)
+slot_holds = SlotHoldRegistry(settings.REDIS_URL, ttl_seconds=settings.SLOT_HOLD_TTL_SECONDS)
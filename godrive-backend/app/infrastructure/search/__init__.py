@@ -0,0 +1,15 @@
+# Infrastructure Search
+# Índices em memória e cache usados pelas buscas (ex: instrutores por raio).
+
+from .instructor_index import InstructorSpatialIndex, instructor_index
+from .search_cache import InstructorSearchCache, instructor_search_cache
+from .invalidation_bus import InstructorInvalidationBus, instructor_events
+
+__all__ = [
+    "InstructorSpatialIndex",
+    "instructor_index",
+    "InstructorSearchCache",
+    "instructor_search_cache",
+    "InstructorInvalidationBus",
+    "instructor_events",
+]
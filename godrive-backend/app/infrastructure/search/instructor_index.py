@@ -0,0 +1,382 @@
+"""
+Instructor Spatial Index
+
+Índice espacial em memória (por processo) dos instrutores, usado por
+`/instructors/search` para responder buscas por raio / vizinhos mais próximos
+sem ir ao PostGIS.
+
+- Grade regular em graus (células de `cell_deg` x `cell_deg`). Cada instrutor
+  recebe a chave da célula `linha * COLS + coluna`, e os arrays NumPy são
+  ordenados por essa chave: as células de uma mesma linha da grade ficam
+  contíguas e são recortadas com `searchsorted`.
+- Distância pela fórmula de haversine (esfera). Difere do esferoide do PostGIS
+  em no máximo ~0,5%, o que não altera a ordenação de forma perceptível.
+- O snapshot é imutável e trocado atomicamente em `load()`: leituras nunca
+  bloqueiam durante um refresh.
+- `mark_stale()` (ex: novo perfil, aprovação) faz a busca cair no PostGIS até o
+  próximo refresh, que roda em background (ver `run_refresher`). Um refresh cuja
+  query começou antes da invalidação não marca o snapshot como atualizado.
+- `update_rating()` (nova avaliação) troca só a média do instrutor, sem
+  invalidar o índice; o próximo `load()` reaplica a média sobre as linhas lidas.
+- Filtros e paginação keyset seguem a mesma semântica de
+  `InstructorRepository.get_by_radius` (ordem por distância arredondada + id).
+"""
+import asyncio
+import math
+import threading
+import time
+from dataclasses import dataclass, replace
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.application.dtos import InstructorSearchFiltersDTO
+from app.infrastructure.config.settings import settings
+from app.infrastructure.db.models.instructor import InstructorStatus
+
+# Raio médio do WGS84 ((2a + b) / 3): a mesma esfera do PostGIS com use_spheroid=false,
+# então índice e banco calculam a mesma distância e o cursor vale nos dois caminhos
+EARTH_RADIUS_KM = 6371.0087714
+# Derivado do mesmo raio: um valor maior (ex: 111,32) encolhe o bbox e perde quem
+# está na borda do raio, que o haversine e o ST_DWithin aceitam
+KM_PER_DEGREE_LAT = math.pi * EARTH_RADIUS_KM / 180
+
+# Quantidade de colunas da grade (360° / menor célula suportada, com folga)
+GRID_COLS = 1 << 24
+
+# Intervalo de verificação do refresher (o refresh em si respeita `refresh_seconds`)
+REFRESH_POLL_SECONDS = 1.0
+
+# Colunas copiadas para o resultado da busca (mesmo formato do InstructorRepository)
+RESULT_FIELDS = ("id", "full_name", "bio", "hourly_rate", "cnh_category", "vehicle_model")
+
+
+@dataclass(frozen=True)
+class _Snapshot:
+    cell_keys: np.ndarray   # int64, ordenado
+    lat_rad: np.ndarray     # float64
+    lon_rad: np.ndarray     # float64
+    ids: np.ndarray         # int64
+    hourly_rate: np.ndarray # float64 (NaN = sem preço)
+    rating: np.ndarray      # float64 (NaN = sem avaliações)
+    verified: np.ndarray    # bool
+    rows: tuple             # payload (dict) de cada posição, mesma ordem dos arrays
+    loaded_at: float
+
+
+def round_distance_km(dist: np.ndarray) -> np.ndarray:
+    """
+    Arredonda como o `round(numeric, 2)` do PostGIS: o cast de double para numeric
+    fica com 15 dígitos significativos e o empate vai para longe do zero
+    (`np.round` empata para o par e divergiria do banco em 1,005 km, por exemplo).
+    """
+    return np.floor(np.round(dist * 100, 9) + 0.5) / 100
+
+
+class InstructorSpatialIndex:
+    """
+    Índice em grade para busca por raio e kNN.
+
+    Uso:
+        index.load(rows)   # rows: mapeamentos com latitude/longitude + RESULT_FIELDS
+        if index.is_ready():
+            index.search_radius(lat, long, radius_km)
+    """
+
+    def __init__(self, cell_deg: float = 0.05, max_age_seconds: float = 300.0):
+        self.cell_deg = cell_deg
+        self.max_age_seconds = max_age_seconds
+        self._snapshot: Optional[_Snapshot] = None
+        self._stale = True
+        # Incrementado a cada mark_stale(): um refresh só limpa `_stale` se nenhuma
+        # invalidação chegou enquanto a query dele rodava
+        self._generation = 0
+        # Médias recebidas desde o último load(), reaplicadas sobre as linhas dele
+        self._rating_patches: Dict[int, Optional[float]] = {}
+        # Serializa a troca do snapshot (update_rating roda na threadpool)
+        self._swap_lock = threading.Lock()
+        self.hits = 0
+        self.fallbacks = 0
+
+    # --- Carga ---
+
+    def _cell_row(self, lat_deg):
+        return np.floor((np.asarray(lat_deg) + 90.0) / self.cell_deg).astype(np.int64)
+
+    def _cell_col(self, lon_deg):
+        return np.floor((np.asarray(lon_deg) + 180.0) / self.cell_deg).astype(np.int64)
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def load(self, rows: Sequence[Mapping[str, Any]], generation: Optional[int] = None) -> int:
+        """
+        Reconstrói o índice a partir das linhas do banco. Retorna o total indexado.
+
+        `generation` é o valor de `generation` lido antes da query: se `mark_stale()`
+        rodou depois disso, o snapshot é trocado mas continua marcado como stale.
+        """
+        rows = [r for r in rows if r["latitude"] is not None and r["longitude"] is not None]
+        lat = np.fromiter((r["latitude"] for r in rows), dtype=np.float64, count=len(rows))
+        lon = np.fromiter((r["longitude"] for r in rows), dtype=np.float64, count=len(rows))
+
+        keys = self._cell_row(lat) * GRID_COLS + self._cell_col(lon)
+        order = np.argsort(keys, kind="stable")
+        ordered = [rows[i] for i in order]
+
+        def _floats(field: str) -> np.ndarray:
+            values = (np.nan if r.get(field) is None else float(r[field]) for r in ordered)
+            return np.fromiter(values, dtype=np.float64, count=len(ordered))
+
+        snapshot = _Snapshot(
+            cell_keys=keys[order],
+            lat_rad=np.radians(lat[order]),
+            lon_rad=np.radians(lon[order]),
+            ids=np.fromiter((r["id"] for r in ordered), dtype=np.int64, count=len(ordered)),
+            hourly_rate=_floats("hourly_rate"),
+            rating=_floats("average_rating"),
+            verified=np.fromiter(
+                (r.get("status") == InstructorStatus.VERIFIED for r in ordered),
+                dtype=bool, count=len(ordered)
+            ),
+            rows=tuple(dict(r) for r in ordered),
+            loaded_at=time.monotonic(),
+        )
+        with self._swap_lock:
+            # A query pode ter lido a média de antes de uma avaliação já aplicada
+            self._snapshot = self._patch_ratings(snapshot, self._rating_patches)
+            self._rating_patches = {}
+            if generation is None or generation == self._generation:
+                self._stale = False
+        return len(rows)
+
+    def mark_stale(self) -> None:
+        """Invalida o snapshot atual: buscas caem no PostGIS até o próximo refresh."""
+        self._generation += 1
+        self._stale = True
+
+    def update_rating(self, instructor_id: int, average_rating: Optional[float]) -> bool:
+        """
+        Troca a média de um instrutor sem recarregar o índice (nova avaliação: a
+        posição e o status não mudaram). Retorna True se ele estava no snapshot.
+        """
+        with self._swap_lock:
+            self._rating_patches[instructor_id] = average_rating
+            snapshot = self._snapshot
+            if snapshot is None:
+                return False
+            patched = self._patch_ratings(snapshot, {instructor_id: average_rating})
+            self._snapshot = patched
+            return patched is not snapshot
+
+    @staticmethod
+    def _patch_ratings(snapshot: _Snapshot, ratings: Mapping[int, Optional[float]]) -> _Snapshot:
+        """Cópia do snapshot com as médias trocadas (leituras em andamento seguem no antigo)."""
+        if not ratings:
+            return snapshot
+        positions = np.flatnonzero(np.isin(snapshot.ids, np.fromiter(ratings, dtype=np.int64)))
+        if positions.size == 0:
+            return snapshot
+        rating = snapshot.rating.copy()
+        rows = list(snapshot.rows)
+        for pos in positions:
+            average = ratings[int(snapshot.ids[pos])]
+            rating[pos] = np.nan if average is None else float(average)
+            rows[pos] = {**rows[pos], "average_rating": average}
+        return replace(snapshot, rating=rating, rows=tuple(rows))
+
+    def is_ready(self) -> bool:
+        snapshot = self._snapshot
+        if snapshot is None or self._stale:
+            return False
+        return time.monotonic() - snapshot.loaded_at <= self.max_age_seconds
+
+    def needs_refresh(self, refresh_seconds: float) -> bool:
+        snapshot = self._snapshot
+        if snapshot is None or self._stale:
+            return True
+        return time.monotonic() - snapshot.loaded_at >= refresh_seconds
+
+    # --- Consulta ---
+
+    def _candidates(self, snapshot: _Snapshot, lat: float, long: float, radius_km: float) -> np.ndarray:
+        """Posições cujas células intersectam o bounding box do raio."""
+        dlat = radius_km / KM_PER_DEGREE_LAT
+        south, north = max(-90.0, lat - dlat), min(90.0, lat + dlat)
+        # A longitude encolhe com a latitude: usa a borda mais próxima do polo.
+        # Perto dos polos o bbox em longitude cobre o globo inteiro
+        cos_lat = math.cos(math.radians(max(abs(south), abs(north))))
+        dlon = 180.0 if cos_lat < 1e-6 else min(180.0, radius_km / (KM_PER_DEGREE_LAT * cos_lat))
+
+        row_min = int(self._cell_row(south))
+        row_max = int(self._cell_row(north))
+
+        keys = snapshot.cell_keys
+        slices = []
+        for row in range(row_min, row_max + 1):
+            for col_min, col_max in self._col_ranges(long, dlon):
+                lo = np.searchsorted(keys, row * GRID_COLS + col_min, side="left")
+                hi = np.searchsorted(keys, row * GRID_COLS + col_max, side="right")
+                if hi > lo:
+                    slices.append(np.arange(lo, hi))
+        if not slices:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(slices)
+
+    def _col_ranges(self, long: float, dlon: float) -> List[Tuple[int, int]]:
+        """Faixas de colunas do bbox; atravessando o antimeridiano vira duas faixas."""
+        west, east = long - dlon, long + dlon
+        if dlon >= 180.0:
+            west, east = -180.0, 180.0
+        elif west < -180.0:
+            return [
+                (int(self._cell_col(west + 360.0)), int(self._cell_col(180.0))),
+                (int(self._cell_col(-180.0)), int(self._cell_col(east))),
+            ]
+        elif east > 180.0:
+            return [
+                (int(self._cell_col(west)), int(self._cell_col(180.0))),
+                (int(self._cell_col(-180.0)), int(self._cell_col(east - 360.0))),
+            ]
+        return [(int(self._cell_col(west)), int(self._cell_col(east)))]
+
+    @staticmethod
+    def _haversine_km(snapshot: _Snapshot, idx: np.ndarray, lat: float, long: float) -> np.ndarray:
+        lat0, lon0 = math.radians(lat), math.radians(long)
+        lat1, lon1 = snapshot.lat_rad[idx], snapshot.lon_rad[idx]
+        a = (
+            np.sin((lat1 - lat0) / 2) ** 2
+            + math.cos(lat0) * np.cos(lat1) * np.sin((lon1 - lon0) / 2) ** 2
+        )
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+    @staticmethod
+    def _filter_mask(snapshot: _Snapshot, idx: np.ndarray, filters: InstructorSearchFiltersDTO) -> np.ndarray:
+        """Filtros numéricos vetorizados; texto é comparado linha a linha (poucos candidatos)."""
+        mask = np.ones(idx.size, dtype=bool)
+        if filters.verified_only:
+            mask &= snapshot.verified[idx]
+        # Comparações com NaN são falsas: sem preço/avaliação não passa no filtro
+        with np.errstate(invalid="ignore"):
+            if filters.min_price is not None:
+                mask &= snapshot.hourly_rate[idx] >= filters.min_price
+            if filters.max_price is not None:
+                mask &= snapshot.hourly_rate[idx] <= filters.max_price
+            if filters.min_rating is not None:
+                mask &= snapshot.rating[idx] >= filters.min_rating
+
+        if filters.cnh_category or filters.vehicle_model:
+            category = filters.cnh_category.upper() if filters.cnh_category else None
+            model = filters.vehicle_model.lower() if filters.vehicle_model else None
+            for pos in np.flatnonzero(mask):
+                row = snapshot.rows[idx[pos]]
+                if category and (row.get("cnh_category") or "").upper() != category:
+                    mask[pos] = False
+                elif model and model not in (row.get("vehicle_model") or "").lower():
+                    mask[pos] = False
+        return mask
+
+    @staticmethod
+    def _build_result(row: Mapping[str, Any], distance: float) -> Dict[str, Any]:
+        item = {field: row.get(field) for field in RESULT_FIELDS}
+        rating = row.get("average_rating")
+        item["average_rating"] = round(float(rating), 1) if rating is not None else None
+        item["distance"] = distance
+        return item
+
+    def search_radius(
+        self,
+        lat: float,
+        long: float,
+        radius_km: float,
+        filters: Optional[InstructorSearchFiltersDTO] = None,
+        after: Optional[Tuple[float, int]] = None,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Instrutores a até `radius_km`, do mais próximo para o mais distante.
+        `after` é o (distance, id) do último item da página anterior.
+        """
+        snapshot = self._snapshot
+        self.hits += 1
+        idx = self._candidates(snapshot, lat, long, radius_km)
+        if idx.size == 0:
+            return []
+
+        dist = self._haversine_km(snapshot, idx, lat, long)
+        keep = dist <= radius_km
+        idx, dist = idx[keep], dist[keep]
+
+        if filters is not None:
+            keep = self._filter_mask(snapshot, idx, filters)
+            idx, dist = idx[keep], dist[keep]
+
+        # Mesma chave de ordenação do PostGIS: distância arredondada (2 casas) + id
+        dist = round_distance_km(dist)
+        ids = snapshot.ids[idx]
+        if after is not None:
+            after_distance, after_id = after
+            keep = (dist > after_distance) | ((dist == after_distance) & (ids > after_id))
+            idx, dist, ids = idx[keep], dist[keep], ids[keep]
+
+        order = np.lexsort((ids, dist))
+        if limit is not None:
+            order = order[:limit]
+        return [self._build_result(snapshot.rows[idx[pos]], float(dist[pos])) for pos in order]
+
+    def nearest(self, lat: float, long: float, k: int, max_radius_km: float = 100.0) -> List[Dict[str, Any]]:
+        """Os `k` instrutores mais próximos, expandindo o raio até `max_radius_km`."""
+        radius = min(max_radius_km, self.cell_deg * KM_PER_DEGREE_LAT)
+        while True:
+            results = self.search_radius(lat, long, radius)
+            if len(results) >= k or radius >= max_radius_km:
+                return results[:k]
+            radius = min(max_radius_km, radius * 2)
+
+    def stats(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            "ready": self.is_ready(),
+            "stale": self._stale,
+            "size": len(snapshot.rows) if snapshot else 0,
+            "age_seconds": round(time.monotonic() - snapshot.loaded_at, 1) if snapshot else None,
+            "cell_deg": self.cell_deg,
+            "hits": self.hits,
+            "fallbacks": self.fallbacks,
+        }
+
+
+# Instância global (por processo)
+instructor_index = InstructorSpatialIndex(
+    cell_deg=settings.INSTRUCTOR_INDEX_CELL_DEG,
+    max_age_seconds=settings.INSTRUCTOR_INDEX_MAX_AGE_SECONDS,
+)
+
+
+async def refresh_instructor_index() -> int:
+    """Recarrega o índice global a partir do banco (sessão assíncrona própria)."""
+    # Import tardio: evita ciclo session -> settings -> index no import da app
+    from app.infrastructure.db.session import AsyncSessionLocal
+    from app.infrastructure.repositories.instructor_repository import AsyncInstructorRepository
+
+    generation = instructor_index.generation
+    async with AsyncSessionLocal() as db:
+        rows = await AsyncInstructorRepository().list_for_index(db)
+    return instructor_index.load(rows, generation=generation)
+
+
+async def run_refresher(refresh_seconds: float) -> None:
+    """Loop de background (iniciado no lifespan) que mantém o índice atualizado."""
+    while True:
+        delay = REFRESH_POLL_SECONDS
+        if instructor_index.needs_refresh(refresh_seconds):
+            try:
+                await refresh_instructor_index()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Sem índice a busca continua funcionando via PostGIS
+                print(f"⚠️ Falha ao recarregar o índice espacial de instrutores: {e}")
+                delay = max(REFRESH_POLL_SECONDS, refresh_seconds)
+        await asyncio.sleep(delay)
@@ -0,0 +1,144 @@
+"""
+Instructor Invalidation Bus
+
+Propaga alterações de instrutores (criação, aprovação, preço, localização)
+para os caches da busca, permitindo TTLs longos sem servir dados velhos.
+
+- Publicação (`publish_changed`): roda no processo que fez a escrita. Remove do
+  Redis apenas as células do cache de busca que cobrem as posições afetadas
+  (antiga e nova) e publica o evento no canal pub/sub.
+- Assinatura (`listen`): cada worker mantém uma task (iniciada no lifespan) que
+  recebe os eventos e invalida o índice espacial em memória daquele processo.
+- Nova avaliação (`publish_rating_changed`): só a média mudou. As células são
+  removidas do mesmo jeito, mas os workers trocam a média no índice em vez de
+  recarregá-lo (a busca continua servida da memória).
+
+A publicação usa o cliente Redis síncrono porque as escritas acontecem em
+endpoints `def` (threadpool). Falhas no Redis nunca derrubam a escrita: o
+índice local é invalidado de qualquer forma e o TTL cobre o restante.
+"""
+import asyncio
+import json
+from typing import Optional, Sequence
+
+import redis
+
+from app.infrastructure.config.settings import settings
+from app.infrastructure.search.instructor_index import instructor_index
+from app.infrastructure.search.search_cache import Point, instructor_search_cache
+
+CHANNEL = "godrive:instructors:changed"
+
+# Espera antes de reassinar o canal após perder a conexão
+RESUBSCRIBE_DELAY_SECONDS = 1.0
+
+
+class InstructorInvalidationBus:
+    """Barramento de invalidação (Redis pub/sub) dos caches da busca de instrutores."""
+
+    def __init__(self, redis_url: str):
+        self.redis_url = redis_url
+        self._client: Optional[redis.Redis] = None
+        self.published = 0
+        self.received = 0
+        self.errors = 0
+
+    def _sync_client(self) -> redis.Redis:
+        if self._client is None:
+            # Timeouts curtos: a publicação roda dentro da requisição de escrita
+            self._client = redis.Redis.from_url(
+                self.redis_url,
+                decode_responses=True,
+                socket_timeout=2,
+                socket_connect_timeout=2,
+            )
+        return self._client
+
+    # --- Publicação ---
+
+    def publish_changed(self, instructor_id: int, points: Sequence[Optional[Point]]) -> None:
+        """
+        Notifica que o instrutor mudou. `points` são as posições (lat, long)
+        afetadas: a antiga e a nova, em caso de mudança de localização.
+        """
+        points = [p for p in points if p is not None and None not in p]
+        instructor_index.mark_stale()
+        self._publish({"instructor_id": instructor_id, "points": points})
+
+    def publish_rating_changed(
+        self, instructor_id: int, point: Optional[Point], average_rating: Optional[float]
+    ) -> None:
+        """Notifica que só a média de avaliações do instrutor mudou (posição `point`)."""
+        points = [point] if point is not None and None not in point else []
+        instructor_index.update_rating(instructor_id, average_rating)
+        self._publish({
+            "instructor_id": instructor_id,
+            "points": points,
+            "rating_only": True,
+            "average_rating": average_rating,
+        })
+
+    def _publish(self, event: dict) -> None:
+        try:
+            client = self._sync_client()
+            if event["points"]:
+                instructor_search_cache.evict_points(client, event["points"])
+            client.publish(CHANNEL, json.dumps(event))
+            self.published += 1
+        except Exception as e:
+            self.errors += 1
+            print(f"⚠️ Falha ao publicar invalidação do instrutor {event['instructor_id']}: {e}")
+
+    async def publish_changed_async(self, instructor_id: int, points: Sequence[Optional[Point]]) -> None:
+        """Versão para código assíncrono (não bloqueia o event loop)."""
+        await asyncio.to_thread(self.publish_changed, instructor_id, points)
+
+    async def publish_rating_changed_async(
+        self, instructor_id: int, point: Optional[Point], average_rating: Optional[float]
+    ) -> None:
+        await asyncio.to_thread(self.publish_rating_changed, instructor_id, point, average_rating)
+
+    # --- Assinatura ---
+
+    def _handle(self, data: str) -> None:
+        self.received += 1
+        try:
+            event = json.loads(data)
+        except (TypeError, ValueError):
+            event = {}
+        if event.get("rating_only"):
+            instructor_index.update_rating(event["instructor_id"], event.get("average_rating"))
+            return
+        # O snapshot em memória não sabe quais linhas mudaram: recarrega por completo
+        instructor_index.mark_stale()
+
+    async def listen(self, client) -> None:
+        """Loop de background (um por worker) que consome o canal de invalidação."""
+        while True:
+            pubsub = client.pubsub()
+            try:
+                await pubsub.subscribe(CHANNEL)
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self._handle(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                print(f"⚠️ Conexão com o canal de invalidação perdida: {e}")
+                # Eventos perdidos enquanto desconectado: não dá para saber o que mudou
+                instructor_index.mark_stale()
+                await asyncio.sleep(RESUBSCRIBE_DELAY_SECONDS)
+            finally:
+                close = getattr(pubsub, "aclose", None) or pubsub.close
+                try:
+                    await close()
+                except Exception:
+                    pass
+
+    def stats(self) -> dict:
+        return {"published": self.published, "received": self.received, "errors": self.errors}
+
+
+# Instância global (por processo)
+instructor_events = InstructorInvalidationBus(settings.REDIS_URL)
@@ -0,0 +1,391 @@
+"""
+Instructor Search Cache
+
+Cache (Redis) da busca por raio com chave "encaixada" na grade.
+
+A chave antiga usava lat/long/raio crus: como quase toda requisição tem
+coordenadas GPS únicas, o hit rate era praticamente zero. Aqui:
+
+- A coordenada é encaixada numa célula de `cell_deg` graus e o raio é
+  arredondado para cima em múltiplos de `radius_step_km`.
+- O valor cacheado é o conjunto de CANDIDATOS da célula: todos os instrutores
+  a até `raio arredondado + meia diagonal da célula` do centro da célula.
+  Qualquer ponto dentro da célula tem o seu raio coberto por esse conjunto.
+- Distância exata, filtros e paginação são calculados por requisição sobre os
+  candidatos (mesmo código do índice em memória), então filtros diferentes
+  compartilham a mesma entrada do cache.
+- Single-flight: uma célula fria é calculada uma única vez. Dentro do processo
+  as requisições concorrentes aguardam o mesmo Future (se o dono for
+  cancelado, um dos waiters assume o cálculo); entre processos, um lock
+  `SET NX PX` no Redis faz os demais aguardarem o valor ser publicado.
+
+Invalidação por evento (ver invalidation_bus.py): cada chave gravada é
+registrada nos ZSETs dos ladrilhos (`tile_deg` graus, bem maiores que a célula)
+que o seu círculo de candidatos toca. Uma alteração de instrutor lê só o
+ladrilho da posição alterada e remove as chaves que a cobrem; o custo não
+cresce com o total de chaves vivas. A época global é incrementada antes, e a
+gravação confere a época e grava atomicamente (script Lua), então um cálculo
+iniciado antes da invalidação nunca regrava dados antigos.
+
+Sem Redis (não inicializado ou fora do ar) a busca vai direto ao loader.
+"""
+import asyncio
+import json
+import math
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from app.application.dtos import InstructorSearchFiltersDTO
+from app.infrastructure.config.settings import settings
+from app.infrastructure.search.instructor_index import (
+    EARTH_RADIUS_KM,
+    InstructorSpatialIndex,
+    KM_PER_DEGREE_LAT,
+)
+
+KEY_PREFIX = "godrive-cache:search:cell"
+# ZSET por ladrilho { chave: expira_em (epoch) } com as chaves de célula que o tocam
+TILE_PREFIX = "godrive-cache:search:tile"
+# Incrementada a cada invalidação; cálculos iniciados antes dela não são gravados
+EPOCH_KEY = "godrive-cache:search:epoch"
+
+# Intervalo de polling enquanto outro processo calcula a célula
+LOCK_POLL_SECONDS = 0.05
+
+# Resultado do Future quando o dono do cálculo é cancelado: os waiters tentam de novo
+_RETRY = object()
+
+# Libera o lock apenas se ainda for o dono (evita apagar o lock de outro processo)
+_RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+# Grava a célula e a registra nos ladrilhos apenas se a época não mudou desde o
+# início do cálculo. KEYS: época, chave da célula, ladrilhos.
+# ARGV: época lida ("" se inexistente), valor, ttl, expira_em.
+_WRITE_IF_EPOCH_SCRIPT = """
+if (redis.call("get", KEYS[1]) or "") ~= ARGV[1] then
+    return 0
+end
+redis.call("set", KEYS[2], ARGV[2], "EX", ARGV[3])
+for i = 3, #KEYS do
+    redis.call("zadd", KEYS[i], ARGV[4], KEYS[2])
+    redis.call("expire", KEYS[i], ARGV[3])
+end
+return 1
+"""
+
+# loader(lat_centro, long_centro, raio_km) -> linhas com latitude/longitude
+CandidateLoader = Callable[[float, float, float], Awaitable[Sequence[Mapping[str, Any]]]]
+
+# (latitude, longitude) em graus
+Point = Tuple[float, float]
+
+
+def _haversine_km(lat1: float, long1: float, lat2: float, long2: float) -> float:
+    lat1, long1, lat2, long2 = map(math.radians, (lat1, long1, lat2, long2))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((long2 - long1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(a, 1.0)))
+
+
+def _serialize_row(row: Mapping[str, Any]) -> Dict[str, Any]:
+    item = dict(row)
+    # Decimal (avg) e Enum não são serializáveis diretamente
+    if item.get("average_rating") is not None:
+        item["average_rating"] = float(item["average_rating"])
+    if item.get("status") is not None:
+        item["status"] = getattr(item["status"], "value", item["status"])
+    return item
+
+
+class InstructorSearchCache:
+    """Candidatos da busca por célula da grade (Redis), com single-flight."""
+
+    def __init__(
+        self,
+        cell_deg: float = 0.01,
+        radius_step_km: float = 5.0,
+        max_radius_km: float = 50.0,
+        ttl_seconds: int = 60,
+        lock_seconds: float = 5.0,
+        tile_deg: float = 0.5,
+    ):
+        self.cell_deg = cell_deg
+        self.radius_step_km = radius_step_km
+        self.max_radius_km = max_radius_km
+        self.ttl_seconds = ttl_seconds
+        self.lock_seconds = lock_seconds
+        self.tile_deg = tile_deg
+        self._tile_cols = math.ceil(360.0 / tile_deg)
+        self._tile_rows = math.ceil(180.0 / tile_deg)
+        self._redis = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._stats = {
+            "hits": 0, "misses": 0, "coalesced": 0, "lock_waits": 0, "errors": 0,
+            "evicted": 0, "stale_writes_skipped": 0, "owner_cancelled": 0,
+        }
+
+    def init(self, redis) -> None:
+        """Configura o cliente Redis (asyncio). Chamado no lifespan da aplicação."""
+        self._redis = redis
+
+    def accepts(self, radius_km: float) -> bool:
+        """Raios muito grandes geram conjuntos enormes: vão direto ao banco."""
+        return self._redis is not None and radius_km <= self.max_radius_km
+
+    # --- Geometria da chave ---
+
+    def cell_of(self, lat: float, long: float) -> Tuple[int, int]:
+        return math.floor((lat + 90.0) / self.cell_deg), math.floor((long + 180.0) / self.cell_deg)
+
+    def cell_center(self, cell: Tuple[int, int]) -> Tuple[float, float]:
+        row, col = cell
+        return (row + 0.5) * self.cell_deg - 90.0, (col + 0.5) * self.cell_deg - 180.0
+
+    def radius_bucket(self, radius_km: float) -> float:
+        steps = max(1, math.ceil(radius_km / self.radius_step_km))
+        return steps * self.radius_step_km
+
+    def candidate_radius(self, center_lat: float, radius_bucket_km: float) -> float:
+        """Raio arredondado + meia diagonal da célula (cobre qualquer ponto dentro dela)."""
+        half_lat_km = self.cell_deg * KM_PER_DEGREE_LAT / 2
+        half_lon_km = half_lat_km * math.cos(math.radians(center_lat))
+        return radius_bucket_km + math.hypot(half_lat_km, half_lon_km)
+
+    def key_for(self, cell: Tuple[int, int], radius_bucket_km: float) -> str:
+        # Ex: godrive-cache:search:cell:0.01:11350:13340:10.0
+        return f"{KEY_PREFIX}:{self.cell_deg}:{cell[0]}:{cell[1]}:{radius_bucket_km}"
+
+    def is_affected(self, key: str, point: Point) -> bool:
+        """True se o conjunto de candidatos da chave cobre `point` (deve ser descartado)."""
+        try:
+            cell_deg, row, col, bucket = key[len(KEY_PREFIX) + 1:].split(":")
+            if float(cell_deg) != self.cell_deg:
+                return True  # Chave de outra configuração: descarta por segurança
+            center_lat, center_long = self.cell_center((int(row), int(col)))
+            radius = self.candidate_radius(center_lat, float(bucket))
+        except ValueError:
+            return True
+        return _haversine_km(center_lat, center_long, point[0], point[1]) <= radius
+
+    # --- Ladrilhos (registro das chaves para invalidação) ---
+
+    def _tile_row(self, lat: float) -> int:
+        return min(max(math.floor((lat + 90.0) / self.tile_deg), 0), self._tile_rows - 1)
+
+    def _tile_col(self, long: float) -> int:
+        return math.floor((long + 180.0) / self.tile_deg) % self._tile_cols
+
+    def tile_key(self, row: int, col: int) -> str:
+        # Ex: godrive-cache:search:tile:0.5:226:267
+        return f"{TILE_PREFIX}:{self.tile_deg}:{row}:{col}"
+
+    def tile_of(self, point: Point) -> str:
+        return self.tile_key(self._tile_row(point[0]), self._tile_col(point[1]))
+
+    def tiles_covering(self, lat: float, long: float, radius_km: float) -> List[str]:
+        """Ladrilhos tocados pelo bbox do círculo (colunas dão a volta no antimeridiano)."""
+        dlat = radius_km / KM_PER_DEGREE_LAT
+        south, north = max(lat - dlat, -90.0), min(lat + dlat, 90.0)
+        # A longitude encolhe com a latitude: usa a borda mais próxima do polo
+        cos_lat = math.cos(math.radians(max(abs(south), abs(north))))
+        dlon = radius_km / (KM_PER_DEGREE_LAT * cos_lat) if cos_lat > 1e-9 else 180.0
+        if dlon >= 180.0:
+            cols = range(self._tile_cols)
+        else:
+            first = math.floor((long - dlon + 180.0) / self.tile_deg)
+            last = math.floor((long + dlon + 180.0) / self.tile_deg)
+            cols = sorted({col % self._tile_cols for col in range(first, last + 1)})
+        return [
+            self.tile_key(row, col)
+            for row in range(self._tile_row(south), self._tile_row(north) + 1)
+            for col in cols
+        ]
+
+    # --- Invalidação (chamada pelo barramento, com cliente Redis síncrono) ---
+
+    def evict_points(self, client, points: Sequence[Point]) -> int:
+        """
+        Remove as chaves de célula que cobrem alguma das posições.
+        `client` é um redis.Redis síncrono com decode_responses=True.
+        """
+        # Primeiro a época: gravações em andamento a partir daqui são descartadas
+        client.incr(EPOCH_KEY)
+        tiles = sorted({self.tile_of(p) for p in points})
+        now = time.time()
+        pipe = client.pipeline(transaction=False)
+        for tile in tiles:
+            pipe.zremrangebyscore(tile, "-inf", now)
+            pipe.zrange(tile, 0, -1)
+        members = pipe.execute()[1::2]
+
+        affected: Dict[str, List[str]] = {}
+        for tile, keys in zip(tiles, members):
+            for key in keys:
+                if any(self.is_affected(key, p) for p in points):
+                    affected.setdefault(key, []).append(tile)
+        if affected:
+            pipe = client.pipeline(transaction=False)
+            pipe.delete(*affected)
+            for key, key_tiles in affected.items():
+                for tile in key_tiles:
+                    pipe.zrem(tile, key)
+            pipe.execute()
+            self._stats["evicted"] += len(affected)
+        # Membros em outros ladrilhos apontam para chaves já apagadas e expiram sozinhos
+        return len(affected)
+
+    # --- Busca ---
+
+    async def search(
+        self,
+        lat: float,
+        long: float,
+        radius_km: float,
+        loader: CandidateLoader,
+        filters: Optional[InstructorSearchFiltersDTO] = None,
+        after: Optional[Tuple[float, int]] = None,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        cell = self.cell_of(lat, long)
+        bucket = self.radius_bucket(radius_km)
+        center_lat, center_long = self.cell_center(cell)
+        candidate_radius = self.candidate_radius(center_lat, bucket)
+
+        async def load() -> List[Dict[str, Any]]:
+            rows = await loader(center_lat, center_long, candidate_radius)
+            return [_serialize_row(row) for row in rows]
+
+        tiles = self.tiles_covering(center_lat, center_long, candidate_radius)
+        rows = await self._get_candidates(self.key_for(cell, bucket), load, tiles)
+
+        # Distância exata + filtros + keyset sobre os candidatos da célula
+        index = InstructorSpatialIndex(cell_deg=self.cell_deg)
+        index.load(rows)
+        return index.search_radius(lat, long, radius_km, filters=filters, after=after, limit=limit)
+
+    async def _get_candidates(
+        self,
+        key: str,
+        load: Callable[[], Awaitable[List[Dict[str, Any]]]],
+        tiles: Sequence[str] = (),
+    ):
+        try:
+            cached = await self._redis.get(key)
+        except Exception:
+            # Redis fora do ar: não derruba a busca
+            self._stats["errors"] += 1
+            return await load()
+
+        if cached is not None:
+            self._stats["hits"] += 1
+            return json.loads(cached)
+
+        # Single-flight dentro do processo. Se o dono for cancelado (cliente
+        # desconectou), o primeiro waiter a acordar vira o novo dono e recalcula;
+        # o cancelamento de um não se propaga para os outros.
+        while True:
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                break
+            self._stats["coalesced"] += 1
+            rows = await asyncio.shield(inflight)
+            if rows is not _RETRY:
+                return rows
+
+        self._stats["misses"] += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            rows = await self._load_with_lock(key, load, tiles)
+            future.set_result(rows)
+            return rows
+        except asyncio.CancelledError:
+            self._stats["owner_cancelled"] += 1
+            future.set_result(_RETRY)
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Marca como consumida (sem waiters não há warning)
+            raise
+        finally:
+            del self._inflight[key]
+
+    async def _load_with_lock(
+        self,
+        key: str,
+        load: Callable[[], Awaitable[List[Dict[str, Any]]]],
+        tiles: Sequence[str] = (),
+    ):
+        """Single-flight entre processos: só o dono do lock consulta o banco."""
+        lock_key = f"{key}:lock"
+        token = uuid.uuid4().hex
+        try:
+            acquired = await self._redis.set(lock_key, token, nx=True, px=int(self.lock_seconds * 1000))
+        except Exception:
+            self._stats["errors"] += 1
+            return await load()
+
+        if not acquired:
+            self._stats["lock_waits"] += 1
+            deadline = time.monotonic() + self.lock_seconds
+            while time.monotonic() < deadline:
+                await asyncio.sleep(LOCK_POLL_SECONDS)
+                cached = await self._redis.get(key)
+                if cached is not None:
+                    return json.loads(cached)
+            # O dono do lock demorou demais (ou morreu): calcula localmente
+            return await load()
+
+        try:
+            epoch = await self._redis.get(EPOCH_KEY)
+            rows = await load()
+            written = await self._redis.eval(
+                _WRITE_IF_EPOCH_SCRIPT,
+                2 + len(tiles),
+                EPOCH_KEY,
+                key,
+                *tiles,
+                epoch or "",
+                json.dumps(rows, separators=(",", ":")),
+                self.ttl_seconds,
+                time.time() + self.ttl_seconds,
+            )
+            if not written:
+                # Houve invalidação durante o cálculo: responde, mas não grava
+                self._stats["stale_writes_skipped"] += 1
+            return rows
+        finally:
+            try:
+                await self._redis.eval(_RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+            except Exception:
+                # O lock expira sozinho (PX)
+                self._stats["errors"] += 1
+
+    def stats(self) -> dict:
+        return {
+            **self._stats,
+            "inflight": len(self._inflight),
+            "enabled": self._redis is not None,
+            "cell_deg": self.cell_deg,
+            "radius_step_km": self.radius_step_km,
+            "tile_deg": self.tile_deg,
+        }
+
+
+# Instância global (por processo)
+instructor_search_cache = InstructorSearchCache(
+    cell_deg=settings.SEARCH_CACHE_CELL_DEG,
+    radius_step_km=settings.SEARCH_CACHE_RADIUS_STEP_KM,
+    max_radius_km=settings.SEARCH_CACHE_MAX_RADIUS_KM,
+    ttl_seconds=settings.SEARCH_CACHE_TTL_SECONDS,
+    lock_seconds=settings.SEARCH_CACHE_LOCK_SECONDS,
+    tile_deg=settings.SEARCH_CACHE_TILE_DEG,
+)
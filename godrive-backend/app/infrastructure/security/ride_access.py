@@ -0,0 +1,162 @@
+"""
+Ride Access
+
+Autorização do WebSocket das aulas sem consultar o banco a cada conexão.
+
+- `RideAccessCache`: cache em memória (TTL + LRU) de (usuário, aula) -> papel
+  ("student", "instructor" ou None se não participa). Os participantes de
+  uma aula não mudam, então o TTL só limita a memória.
+- Ticket da aula: JWT curto, assinado com a SECRET_KEY, válido só para uma
+  aula e um usuário (`scope = "ride_ws"`). É entregue ao cliente após o
+  primeiro handshake; as reconexões com o ticket não tocam no banco nem no
+  cache. Tickets emitidos antes de uma revogação do usuário são recusados
+  (ver `user_cache.revoke`).
+"""
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+
+from jose import jwt, JWTError
+
+from app.infrastructure.config.settings import settings
+from app.infrastructure.security.user_cache import user_cache
+
+TICKET_SCOPE = "ride_ws"
+
+STUDENT = "student"
+INSTRUCTOR = "instructor"
+
+
+class RideTicket:
+    """Claims validadas de um ticket de aula."""
+    __slots__ = ("user_id", "ride_id", "role", "issued_at", "expires_at")
+
+    def __init__(self, user_id: int, ride_id: int, role: str, issued_at: float, expires_at: float):
+        self.user_id = user_id
+        self.ride_id = ride_id
+        self.role = role
+        self.issued_at = issued_at
+        self.expires_at = expires_at
+
+
+def create_ride_ticket(user_id: int, ride_id: int, role: str) -> Tuple[str, int]:
+    """Emite o ticket da aula. Retorna (ticket, validade em segundos)."""
+    ttl = settings.RIDE_WS_TICKET_TTL_SECONDS
+    now = datetime.now(timezone.utc)
+    claims = {
+        "sub": str(user_id),
+        "rid": ride_id,
+        "role": role,
+        "scope": TICKET_SCOPE,
+        "iat": now,
+        "exp": now + timedelta(seconds=ttl),
+    }
+    return jwt.encode(claims, settings.SECRET_KEY, algorithm=settings.ALGORITHM), ttl
+
+
+def decode_ride_ticket(ticket: str, ride_id: int) -> Optional[RideTicket]:
+    """Valida assinatura, validade, escopo e aula do ticket. None se for inválido."""
+    try:
+        claims = jwt.decode(ticket, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        if claims.get("scope") != TICKET_SCOPE or claims.get("rid") != ride_id:
+            return None
+        parsed = RideTicket(
+            user_id=int(claims["sub"]),
+            ride_id=ride_id,
+            role=claims["role"],
+            issued_at=float(claims["iat"]),
+            expires_at=float(claims["exp"]),
+        )
+    except (JWTError, KeyError, TypeError, ValueError):
+        return None
+    if user_cache.is_token_stale(parsed.user_id, parsed.issued_at):
+        return None
+    return parsed
+
+
+def role_for(user_id: int, participants: Optional[Tuple[int, int]]) -> Optional[str]:
+    """Papel do usuário na aula a partir de (student_id, instructor_id)."""
+    if participants is None:
+        return None
+    student_id, instructor_id = participants
+    # O id do perfil de instrutor é o próprio id do usuário
+    if user_id == student_id:
+        return STUDENT
+    if user_id == instructor_id:
+        return INSTRUCTOR
+    return None
+
+
+_MISSING = object()
+
+
+class RideAccessCache:
+    """LRU com expiração por TTL de (user_id, ride_id) -> papel. Thread-safe."""
+
+    def __init__(self, max_size: int = 4096, ttl_seconds: float = 300.0):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple[int, int], Tuple[float, Optional[str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: int, ride_id: int):
+        """Papel em cache (pode ser None = não participa) ou `_MISSING` em caso de miss."""
+        key = (user_id, ride_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return _MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, user_id: int, ride_id: int, role: Optional[str]) -> None:
+        with self._lock:
+            self._entries[(user_id, ride_id)] = (time.monotonic() + self.ttl_seconds, role)
+            self._entries.move_to_end((user_id, ride_id))
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate_ride(self, ride_id: int) -> None:
+        with self._lock:
+            for key in [key for key in self._entries if key[1] == ride_id]:
+                del self._entries[key]
+
+    async def resolve(self, user_id: int, ride_id: int) -> Optional[str]:
+        """Papel do usuário na aula: cache ou, em caso de miss, uma consulta assíncrona leve."""
+        role = self.get(user_id, ride_id)
+        if role is not _MISSING:
+            return role
+
+        # Import tardio: evita ciclo session -> settings no import da app
+        from app.infrastructure.db.session import AsyncSessionLocal
+        from app.infrastructure.repositories.ride_repository import AsyncRideRepository
+
+        async with AsyncSessionLocal() as db:
+            participants = await AsyncRideRepository().get_participants(db, ride_id)
+        role = role_for(user_id, participants)
+        self.set(user_id, ride_id, role)
+        return role
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+# Instância global (por processo)
+ride_access_cache = RideAccessCache(
+    max_size=settings.RIDE_ACCESS_CACHE_MAX_SIZE,
+    ttl_seconds=settings.RIDE_ACCESS_CACHE_TTL_SECONDS,
+)
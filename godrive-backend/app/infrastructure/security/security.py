@@ -1,6 +1,6 @@
 # app/core/security.py
 from datetime import datetime, timedelta, timezone # <--- Adicione o timezone aqui
-from typing import Any, Union
+from typing import Any, Dict, Optional, Union
 from jose import jwt
 from passlib.context import CryptContext
 from app.infrastructure.config.settings import settings
@@ -13,7 +13,23 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
-def create_access_token(subject: Union[str, Any], expires_delta: timedelta = None) -> str:
+def build_user_claims(user: Any) -> Dict[str, Any]:
+    """
+    Claims usadas pela autenticação stateless (ver deps.get_current_principal).
+    Permitem resolver o usuário atual sem consultar o banco.
+    """
+    return {
+        "uid": user.id,
+        "user_type": user.user_type,
+        "is_superuser": bool(user.is_superuser),
+        "is_active": bool(user.is_active),
+    }
+
+def create_access_token(
+    subject: Union[str, Any],
+    expires_delta: timedelta = None,
+    claims: Optional[Dict[str, Any]] = None,
+) -> str:
     # Cria a data atual já com a informação de fuso horário UTC
     now = datetime.now(timezone.utc) # <--- Correção aqui
     
@@ -23,6 +39,7 @@ def create_access_token(subject: Union[str, Any], expires_delta: timedelta = Non
         expire = now + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     
     # O .timestamp() do Python converte corretamente datas aware para Unix Timestamp
-    to_encode = {"exp": expire, "sub": str(subject)}
+    # 'iat' permite invalidar claims de tokens emitidos antes de uma revogação
+    to_encode = {**(claims or {}), "exp": expire, "iat": now, "sub": str(subject)}
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
\ No newline at end of file
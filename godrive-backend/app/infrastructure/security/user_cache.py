@@ -0,0 +1,265 @@
+"""
+User Cache
+
+Cache em memória (TTL + LRU) dos dados do usuário autenticado, com revogação.
+
+Guarda apenas um snapshot imutável das colunas de `users` (nunca a instância
+ORM, que pertence a uma sessão). A cada requisição uma nova instância é
+reconstruída e anexada à sessão sem SELECT (ver `build_user`), então
+relacionamentos lazy como `instructor_profile` continuam funcionando.
+
+`revoke(user_id)` descarta o snapshot e marca os tokens emitidos antes deste
+instante como não confiáveis para o caminho stateless (as claims podem estar
+desatualizadas), forçando a releitura do banco. A revogação vale para todos os
+workers:
+
+- Redis: `godrive:revoked:{user_id}` guarda o instante da revogação, com
+  expiração igual à validade máxima de um token (access token ou ticket de aula).
+- Memória: cada processo mantém um espelho das revogações, atualizado via
+  pub/sub (e recarregado do Redis ao (re)conectar), então `is_token_stale`
+  continua sem I/O por requisição.
+"""
+import asyncio
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import redis
+from sqlalchemy import inspect
+from sqlalchemy.orm import make_transient_to_detached
+
+from app.infrastructure.config.settings import settings
+from app.infrastructure.db.models.user import User
+
+UserSnapshot = Dict[str, object]
+
+REVOKED_PREFIX = "godrive:revoked"
+REVOKED_CHANNEL = "godrive:revoked:changed"
+
+# Espera antes de reassinar o canal após perder a conexão
+RESUBSCRIBE_DELAY_SECONDS = 1.0
+
+
+def _revoked_key(user_id: int) -> str:
+    return f"{REVOKED_PREFIX}:{user_id}"
+
+
+def _revocation_horizon() -> int:
+    """Validade máxima de um token que consulta `is_token_stale`, em segundos."""
+    return max(settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60, settings.RIDE_WS_TICKET_TTL_SECONDS)
+
+
+class UserCache:
+    """
+    LRU com expiração por TTL, indexado por id e por email.
+
+    Thread-safe: é usado tanto pelo event loop quanto pelo threadpool do FastAPI.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl_seconds: float = 60.0, redis_url: Optional[str] = None):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[int, Tuple[float, UserSnapshot]]" = OrderedDict()
+        self._ids_by_email: Dict[str, int] = {}
+        # { user_id: timestamp } - tokens com iat anterior não são confiáveis
+        self._revoked_at: Dict[int, float] = {}
+        self._lock = threading.Lock()
+        self.redis_url = redis_url
+        self._client: Optional[redis.Redis] = None
+        self.hits = 0
+        self.misses = 0
+        self.revocation_errors = 0
+
+    def _sync_client(self) -> redis.Redis:
+        if self._client is None:
+            # Timeouts curtos: roda dentro da requisição que altera o usuário
+            self._client = redis.Redis.from_url(
+                self.redis_url,
+                decode_responses=True,
+                socket_timeout=2,
+                socket_connect_timeout=2,
+            )
+        return self._client
+
+    # --- Snapshot <-> ORM ---
+
+    @staticmethod
+    def snapshot(user: User) -> UserSnapshot:
+        """Extrai os valores das colunas já carregadas (sem disparar I/O)."""
+        state = inspect(user)
+        return {
+            attr.key: state.dict[attr.key]
+            for attr in state.mapper.column_attrs
+            if attr.key in state.dict
+        }
+
+    @staticmethod
+    def build_user(snapshot: UserSnapshot) -> User:
+        """
+        Reconstrói um `User` desanexado a partir do snapshot.
+        Use `db.add(user)` para anexá-lo à sessão da requisição (sem SELECT).
+        """
+        user = User(**snapshot)
+        make_transient_to_detached(user)
+        return user
+
+    # --- Leitura/escrita ---
+
+    def _get_entry(self, user_id: int) -> Optional[UserSnapshot]:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        expires_at, snapshot = entry
+        if expires_at < time.monotonic():
+            self._drop(user_id)
+            return None
+        self._entries.move_to_end(user_id)
+        return snapshot
+
+    def _drop(self, user_id: int) -> None:
+        entry = self._entries.pop(user_id, None)
+        if entry is not None:
+            email = entry[1].get("email")
+            if self._ids_by_email.get(email) == user_id:
+                del self._ids_by_email[email]
+
+    def get(self, user_id: Optional[int] = None, email: Optional[str] = None) -> Optional[UserSnapshot]:
+        """Busca por id (preferencial) ou email. Retorna None em caso de miss/expiração."""
+        with self._lock:
+            if user_id is None and email is not None:
+                user_id = self._ids_by_email.get(email)
+            snapshot = self._get_entry(user_id) if user_id is not None else None
+            if snapshot is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return snapshot
+
+    def set(self, user: User) -> None:
+        snapshot = self.snapshot(user)
+        user_id = snapshot.get("id")
+        if user_id is None:
+            return
+        with self._lock:
+            self._drop(user_id)
+            self._entries[user_id] = (time.monotonic() + self.ttl_seconds, snapshot)
+            self._ids_by_email[snapshot.get("email")] = user_id
+            while len(self._entries) > self.max_size:
+                oldest_id = next(iter(self._entries))
+                self._drop(oldest_id)
+
+    def invalidate(self, user_id: int) -> None:
+        """Descarta o snapshot (ex: após alterar nome/email)."""
+        with self._lock:
+            self._drop(user_id)
+
+    # --- Revogação ---
+
+    def revoke(self, user_id: int) -> None:
+        """
+        Invalida o snapshot e as claims de tokens já emitidos, em todos os workers.
+        Use quando user_type, is_active ou is_superuser mudarem.
+        """
+        revoked_at = time.time()
+        self._apply_revocation(user_id, revoked_at)
+        self._publish_revocation(user_id, revoked_at)
+
+    def _apply_revocation(self, user_id: int, revoked_at: float) -> None:
+        with self._lock:
+            self._drop(user_id)
+            # Mensagens podem chegar fora de ordem: vale a revogação mais recente
+            if revoked_at > self._revoked_at.get(user_id, 0.0):
+                self._revoked_at[user_id] = revoked_at
+            self._prune_revocations()
+
+    def _publish_revocation(self, user_id: int, revoked_at: float) -> None:
+        if self.redis_url is None:
+            return
+        try:
+            pipe = self._sync_client().pipeline(transaction=False)
+            pipe.set(_revoked_key(user_id), revoked_at, ex=_revocation_horizon())
+            pipe.publish(REVOKED_CHANNEL, json.dumps({"user_id": user_id, "revoked_at": revoked_at}))
+            pipe.execute()
+        except Exception as e:
+            # O espelho local já foi atualizado; os demais workers recarregam ao reconectar
+            self.revocation_errors += 1
+            print(f"⚠️ Falha ao propagar a revogação do usuário {user_id}: {e}")
+
+    def is_token_stale(self, user_id: int, issued_at: Optional[float]) -> bool:
+        """True se o token foi emitido antes da última revogação do usuário."""
+        with self._lock:
+            revoked_at = self._revoked_at.get(user_id)
+        if revoked_at is None:
+            return False
+        return issued_at is None or issued_at < revoked_at
+
+    def _prune_revocations(self) -> None:
+        # Revogações mais antigas que a validade máxima de um token não importam mais
+        horizon = time.time() - _revocation_horizon()
+        for user_id in [uid for uid, ts in self._revoked_at.items() if ts < horizon]:
+            del self._revoked_at[user_id]
+
+    # --- Sincronização entre workers ---
+
+    def _handle_revocation(self, data: str) -> None:
+        message = json.loads(data)
+        self._apply_revocation(int(message["user_id"]), float(message["revoked_at"]))
+
+    async def load_revocations(self, client) -> int:
+        """Recarrega as revogações vigentes a partir do Redis (cliente asyncio)."""
+        loaded = 0
+        async for key in client.scan_iter(match=f"{REVOKED_PREFIX}:*"):
+            suffix = key.rsplit(":", 1)[1]
+            if not suffix.isdigit():
+                continue
+            value = await client.get(key)
+            if value is not None:
+                self._apply_revocation(int(suffix), float(value))
+                loaded += 1
+        return loaded
+
+    async def listen(self, client) -> None:
+        """Loop de background (um por worker) que mantém as revogações atualizadas."""
+        while True:
+            pubsub = client.pubsub()
+            try:
+                await pubsub.subscribe(REVOKED_CHANNEL)
+                # Assina antes de carregar: nenhuma revogação entre os dois passos se perde
+                await self.load_revocations(client)
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self._handle_revocation(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.revocation_errors += 1
+                print(f"⚠️ Conexão com o canal de revogações perdida: {e}")
+                await asyncio.sleep(RESUBSCRIBE_DELAY_SECONDS)
+            finally:
+                close = getattr(pubsub, "aclose", None) or pubsub.close
+                try:
+                    await close()
+                except Exception:
+                    pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "revocations": len(self._revoked_at),
+                "revocation_errors": self.revocation_errors,
+            }
+
+
+# Instância global (por processo)
+user_cache = UserCache(
+    max_size=settings.USER_CACHE_MAX_SIZE,
+    ttl_seconds=settings.USER_CACHE_TTL_SECONDS,
+    redis_url=settings.REDIS_URL,
+)
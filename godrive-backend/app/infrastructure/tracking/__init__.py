@@ -0,0 +1,18 @@
+# Infrastructure Tracking
+# Rastreamento das aulas em tempo real (entrada das posições enviadas pelo WebSocket)
+# e gravação do trajeto de cada aula.
+
+from .telemetry import LocationSample, TelemetryIngestor, telemetry
+from .track_recorder import TrackRecorder, track_recorder
+from .track_codec import decode_track, encode_track, simplify_track
+
+__all__ = [
+    "LocationSample",
+    "TelemetryIngestor",
+    "telemetry",
+    "TrackRecorder",
+    "track_recorder",
+    "encode_track",
+    "decode_track",
+    "simplify_track",
+]
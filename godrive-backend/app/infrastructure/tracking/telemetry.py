@@ -0,0 +1,252 @@
+"""
+Telemetry Ingestion
+
+Etapa de entrada das posições enviadas pelo WebSocket da aula, antes do
+broadcast para a sala.
+
+- Validação: cada frame vira um `LocationSample` tipado (lat/long dentro dos
+  limites, números finitos). Frames inválidos são descartados.
+- Modo por remetente, decidido no servidor: "em movimento" pela velocidade
+  informada pelo GPS ou, sem ela, pelo deslocamento desde o último envio;
+  "parado" caso contrário. O intervalo recomendado (5 s em movimento, 30 s
+  parado, ver PROJECT_GUIDELINES) é informado ao cliente quando o modo muda.
+- Coalescência: dentro do intervalo mínimo do modo, só a amostra mais
+  recente de cada remetente é guardada e enviada no fim do intervalo.
+  Mudança de modo é enviada na hora.
+- Gravação: toda amostra válida (antes da coalescência) vai para o
+  `record`, que monta o trajeto persistido da aula (ver track_recorder.py).
+
+Assim o tráfego da sala acompanha o movimento, e não a frequência (ou os
+bugs) do cliente. O estado é por processo: os frames de um remetente sempre
+chegam pelo socket dele, no mesmo nó.
+"""
+import asyncio
+import math
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Mapping, Optional, Set, Tuple
+
+METERS_PER_DEGREE = 111_320.0
+
+# Fração do intervalo do modo abaixo da qual frames são coalescidos (tolera jitter do cliente)
+INTERVAL_TOLERANCE = 0.8
+
+# Janela mínima para estimar a velocidade pelo deslocamento (evita ruído do GPS)
+MIN_SPEED_WINDOW_SECONDS = 1.0
+
+
+@dataclass(frozen=True)
+class LocationSample:
+    """Posição validada de um participante da aula."""
+    sender_id: int
+    lat: float
+    long: float
+    received_at: float            # time.time() do servidor
+    speed: Optional[float] = None     # m/s, informado pelo GPS
+    heading: Optional[float] = None   # graus (0-360)
+    accuracy: Optional[float] = None  # metros
+
+    def to_message(self, moving: bool) -> Dict[str, Any]:
+        message = {
+            "sender_id": self.sender_id,
+            "lat": round(self.lat, 6),
+            "long": round(self.long, 6),
+            "ts": int(self.received_at * 1000),
+            "moving": moving,
+        }
+        if self.speed is not None:
+            message["speed"] = round(self.speed, 1)
+        if self.heading is not None:
+            message["heading"] = round(self.heading)
+        return message
+
+
+def _number(value: Any) -> Optional[float]:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    value = float(value)
+    return value if math.isfinite(value) else None
+
+
+def _optional_in_range(raw: Mapping[str, Any], key: str, low: float, high: float) -> Optional[float]:
+    value = _number(raw.get(key))
+    return value if value is not None and low <= value <= high else None
+
+
+def parse_frame(raw: Any, sender_id: int, received_at: float) -> Optional[LocationSample]:
+    """Valida o frame recebido ({"lat", "long", ...}). Retorna None se for inválido."""
+    if not isinstance(raw, dict):
+        return None
+    lat = _number(raw.get("lat", raw.get("latitude")))
+    long = _number(raw.get("long", raw.get("longitude")))
+    if lat is None or long is None or not (-90 <= lat <= 90 and -180 <= long <= 180):
+        return None
+    return LocationSample(
+        sender_id=sender_id,
+        lat=lat,
+        long=long,
+        received_at=received_at,
+        # Campos opcionais fora da faixa são ignorados, não invalidam a posição
+        speed=_optional_in_range(raw, "speed", 0, 100),
+        heading=_optional_in_range(raw, "heading", 0, 360),
+        accuracy=_optional_in_range(raw, "accuracy", 0, 10_000),
+    )
+
+
+def distance_m(a: LocationSample, b: LocationSample) -> float:
+    """Distância aproximada (equiretangular): precisa para os poucos metros entre amostras."""
+    mean_lat = math.radians((a.lat + b.lat) / 2)
+    dx = (b.long - a.long) * METERS_PER_DEGREE * math.cos(mean_lat)
+    dy = (b.lat - a.lat) * METERS_PER_DEGREE
+    return math.hypot(dx, dy)
+
+
+class _SenderState:
+    __slots__ = ("last_sent", "last_sent_at", "moving", "pending", "flush_handle")
+
+    def __init__(self):
+        self.last_sent: Optional[LocationSample] = None
+        self.last_sent_at = 0.0
+        self.moving = False
+        self.pending: Optional[LocationSample] = None
+        self.flush_handle: Optional[asyncio.TimerHandle] = None
+
+
+class TelemetryIngestor:
+    """Valida, classifica (em movimento/parado) e coalesce as posições antes do broadcast."""
+
+    def __init__(
+        self,
+        publish: Callable[[int, Dict[str, Any]], Awaitable[None]],
+        moving_interval: float = 5.0,
+        stopped_interval: float = 30.0,
+        moving_speed_mps: float = 1.5,
+        moving_displacement_m: float = 15.0,
+        record: Optional[Callable[[int, LocationSample], None]] = None,
+    ):
+        self._publish = publish
+        self._record = record
+        self.moving_interval = moving_interval
+        self.stopped_interval = stopped_interval
+        self.moving_speed_mps = moving_speed_mps
+        self.moving_displacement_m = moving_displacement_m
+        self._senders: Dict[Tuple[int, int], _SenderState] = {}
+        # Referência forte às tasks de flush: o loop só guarda referência fraca
+        self._flush_tasks: Set[asyncio.Task] = set()
+        self._stats = {"frames": 0, "invalid": 0, "coalesced": 0, "published": 0, "mode_changes": 0}
+
+    def interval_for(self, moving: bool) -> float:
+        return self.moving_interval if moving else self.stopped_interval
+
+    def _is_moving(self, state: _SenderState, sample: LocationSample) -> bool:
+        if sample.speed is not None:
+            return sample.speed >= self.moving_speed_mps
+        if state.last_sent is None:
+            return False
+
+        # Sem velocidade do GPS: estima pelo deslocamento desde o último envio
+        distance = distance_m(state.last_sent, sample)
+        if sample.accuracy is not None and distance <= sample.accuracy:
+            return False  # Dentro do erro do GPS: não é deslocamento
+        if distance >= self.moving_displacement_m:
+            return True
+        elapsed = sample.received_at - state.last_sent_at
+        if elapsed < MIN_SPEED_WINDOW_SECONDS:
+            return state.moving  # Janela curta demais para estimar: mantém o modo
+        return distance / elapsed >= self.moving_speed_mps
+
+    async def ingest(self, ride_id: int, sender_id: int, raw: Any) -> Optional[float]:
+        """
+        Processa um frame do remetente. Retorna o novo intervalo recomendado (s)
+        quando o modo muda (ou no primeiro frame válido), para ser enviado ao cliente.
+        """
+        self._stats["frames"] += 1
+        now = time.time()
+        sample = parse_frame(raw, sender_id, now)
+        if sample is None:
+            self._stats["invalid"] += 1
+            return None
+        if self._record is not None:
+            self._record(ride_id, sample)
+
+        key = (ride_id, sender_id)
+        state = self._senders.get(key)
+        first = state is None
+        if first:
+            state = self._senders[key] = _SenderState()
+
+        moving = self._is_moving(state, sample)
+        mode_changed = first or moving != state.moving
+        state.moving = moving
+
+        min_gap = self.interval_for(moving) * INTERVAL_TOLERANCE
+        if mode_changed or now - state.last_sent_at >= min_gap:
+            if not first:
+                self._stats["mode_changes"] += int(mode_changed)
+            await self._send(ride_id, state, sample)
+        else:
+            # Dentro do intervalo: guarda só a mais recente e agenda o envio
+            if state.pending is not None:
+                self._stats["coalesced"] += 1
+            state.pending = sample
+            if state.flush_handle is None:
+                delay = state.last_sent_at + min_gap - now
+                state.flush_handle = asyncio.get_running_loop().call_later(
+                    delay, self._start_flush, ride_id, key
+                )
+
+        return self.interval_for(moving) if mode_changed else None
+
+    async def _send(self, ride_id: int, state: _SenderState, sample: LocationSample) -> None:
+        if state.flush_handle is not None:
+            state.flush_handle.cancel()
+            state.flush_handle = None
+        if state.pending is not None and state.pending is not sample:
+            self._stats["coalesced"] += 1
+        state.pending = None
+        state.last_sent = sample
+        state.last_sent_at = sample.received_at
+        self._stats["published"] += 1
+        await self._publish(ride_id, sample.to_message(state.moving))
+
+    def _start_flush(self, ride_id: int, key: Tuple[int, int]) -> None:
+        task = asyncio.create_task(self._flush(ride_id, key))
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
+
+    async def _flush(self, ride_id: int, key: Tuple[int, int]) -> None:
+        state = self._senders.get(key)
+        if state is None:
+            return
+        state.flush_handle = None
+        if state.pending is not None:
+            await self._send(ride_id, state, state.pending)
+
+    def forget(self, ride_id: int, sender_id: int) -> None:
+        """Descarta o estado do remetente (socket desconectado)."""
+        state = self._senders.pop((ride_id, sender_id), None)
+        if state is not None and state.flush_handle is not None:
+            state.flush_handle.cancel()
+
+    def stats(self) -> dict:
+        return {**self._stats, "senders": len(self._senders)}
+
+
+def _build_ingestor() -> TelemetryIngestor:
+    # Import tardio: o socket_manager só é necessário para publicar
+    from app.infrastructure.config.settings import settings
+    from app.infrastructure.external.socket_service import socket_manager
+    from app.infrastructure.tracking.track_recorder import track_recorder
+
+    return TelemetryIngestor(
+        publish=socket_manager.broadcast_location,
+        moving_interval=settings.TRACKING_MOVING_INTERVAL_SECONDS,
+        stopped_interval=settings.TRACKING_STOPPED_INTERVAL_SECONDS,
+        moving_speed_mps=settings.TRACKING_MOVING_SPEED_MPS,
+        moving_displacement_m=settings.TRACKING_MOVING_DISPLACEMENT_M,
+        record=track_recorder.record,
+    )
+
+
+# Instância global (por processo)
+telemetry = _build_ingestor()
@@ -0,0 +1,96 @@
+"""
+Track Codec
+
+Codificação compacta do trajeto (GPS) de uma aula, guardado como um único
+blob por participante em vez de uma linha por ponto.
+
+Formato (versão 1):
+    b"\\x01" + zlib( deltas(lat * 1e6) | deltas(long * 1e6) | deltas(t_ms) )
+
+Cada coluna é um array int32 little-endian com a diferença para o ponto
+anterior (o primeiro valor é absoluto). Pontos vizinhos têm deltas pequenos,
+que o zlib comprime muito bem (~3-4 bytes por ponto). `t_ms` é o tempo em
+milissegundos desde o início do trajeto. Precisão de 1e-6 grau (~0,1 m).
+
+Inclui a simplificação Douglas–Peucker usada no GET do trajeto.
+"""
+import math
+import zlib
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+FORMAT_VERSION = 1
+SCALE = 1_000_000
+
+# (latitude, longitude, t_ms)
+TrackPoint = Tuple[float, float, int]
+
+METERS_PER_DEGREE = 111_320.0
+
+
+def encode_track(points: Sequence[TrackPoint]) -> bytes:
+    if not points:
+        return bytes([FORMAT_VERSION]) + zlib.compress(b"")
+    columns = np.asarray(points, dtype=np.float64)
+    lat = np.round(columns[:, 0] * SCALE).astype(np.int64)
+    long = np.round(columns[:, 1] * SCALE).astype(np.int64)
+    t = columns[:, 2].astype(np.int64)
+    deltas = np.concatenate([np.diff(col, prepend=0) for col in (lat, long, t)]).astype("<i4")
+    return bytes([FORMAT_VERSION]) + zlib.compress(deltas.tobytes(), 6)
+
+
+def decode_track(blob: bytes) -> List[TrackPoint]:
+    if not blob:
+        return []
+    if blob[0] != FORMAT_VERSION:
+        raise ValueError(f"Versão de trajeto desconhecida: {blob[0]}")
+    deltas = np.frombuffer(zlib.decompress(blob[1:]), dtype="<i4").astype(np.int64)
+    if deltas.size == 0:
+        return []
+    lat, long, t = np.cumsum(deltas.reshape(3, -1), axis=1)
+    return list(zip((lat / SCALE).tolist(), (long / SCALE).tolist(), t.tolist()))
+
+
+def _to_meters(points: Sequence[TrackPoint]) -> np.ndarray:
+    """Projeção local equiretangular (metros), suficiente para o trajeto de uma aula."""
+    coords = np.asarray([(p[0], p[1]) for p in points], dtype=np.float64)
+    mean_lat = math.radians(float(coords[:, 0].mean()))
+    return np.column_stack((
+        coords[:, 1] * METERS_PER_DEGREE * math.cos(mean_lat),
+        coords[:, 0] * METERS_PER_DEGREE,
+    ))
+
+
+def simplify_track(points: Sequence[TrackPoint], tolerance_m: float) -> List[TrackPoint]:
+    """
+    Douglas–Peucker (iterativo): remove pontos a menos de `tolerance_m` metros
+    da reta entre os pontos mantidos. Primeiro e último pontos sempre ficam.
+    """
+    if tolerance_m <= 0 or len(points) < 3:
+        return list(points)
+
+    xy = _to_meters(points)
+    keep = np.zeros(len(points), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        a, b = xy[start], xy[end]
+        segment = b - a
+        inner = xy[start + 1:end] - a
+        length = math.hypot(*segment)
+        if length == 0:
+            distances = np.hypot(inner[:, 0], inner[:, 1])
+        else:
+            # Distância perpendicular à reta a-b (produto vetorial / comprimento)
+            distances = np.abs(segment[0] * inner[:, 1] - segment[1] * inner[:, 0]) / length
+        index = int(distances.argmax())
+        if distances[index] > tolerance_m:
+            split = start + 1 + index
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+    return [point for point, kept in zip(points, keep) if kept]
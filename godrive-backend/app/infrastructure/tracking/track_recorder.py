@@ -0,0 +1,132 @@
+"""
+Track Recorder
+
+Gravação do trajeto (GPS) das aulas. As posições válidas que chegam pelo
+WebSocket ficam num buffer em memória por (aula, remetente) e são gravadas
+em lote no Postgres (tabela ride_tracks, um blob comprimido por participante,
+ver track_codec.py): a cada `flush_interval` segundos, quando o buffer de um
+remetente chega a `flush_points` pontos, ou ao finalizar a aula.
+
+O buffer é por processo (os frames de um remetente chegam sempre pelo socket
+dele, no mesmo nó). Se o processo cair, perde-se no máximo o último intervalo
+de flush do trajeto; as posições continuam sendo transmitidas normalmente.
+"""
+import asyncio
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.infrastructure.tracking.telemetry import LocationSample
+
+# (latitude, longitude, instante do ponto), mesmo formato do repositório
+TrackSample = Tuple[float, float, datetime]
+
+
+class TrackRecorder:
+    """Buffer em memória dos trajetos, gravado em lote no banco."""
+
+    def __init__(self, flush_interval: float = 10.0, flush_points: int = 100, max_buffered: int = 5000):
+        self.flush_interval = flush_interval
+        self.flush_points = flush_points
+        # Limite por remetente se o banco ficar fora do ar (descarta os mais antigos)
+        self.max_buffered = max_buffered
+        self._buffers: Dict[Tuple[int, int], List[TrackSample]] = {}
+        self._lock = asyncio.Lock()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stats = {"recorded": 0, "flushed": 0, "flushes": 0, "errors": 0, "dropped": 0}
+
+    def record(self, ride_id: int, sample: LocationSample) -> None:
+        key = (ride_id, sample.sender_id)
+        buffer = self._buffers.setdefault(key, [])
+        buffer.append((
+            sample.lat,
+            sample.long,
+            datetime.fromtimestamp(sample.received_at, tz=timezone.utc),
+        ))
+        self._stats["recorded"] += 1
+        if len(buffer) >= self.flush_points and self._wakeup is not None:
+            self._wakeup.set()
+
+    async def flush(self, ride_id: Optional[int] = None) -> int:
+        """
+        Grava os pontos em buffer (de todas as aulas, ou só de `ride_id`) numa
+        única transação. Em caso de falha os pontos voltam para o buffer.
+        """
+        async with self._lock:
+            keys = [key for key in self._buffers if ride_id is None or key[0] == ride_id]
+            # Ordem fixa das chaves: evita deadlock entre workers gravando as mesmas aulas
+            batch = {key: self._buffers.pop(key) for key in sorted(keys)}
+            batch = {key: samples for key, samples in batch.items() if samples}
+            if not batch:
+                return 0
+            try:
+                await self._write(batch.items())
+            except Exception as e:
+                self._stats["errors"] += 1
+                print(f"⚠️ Falha ao gravar trajetos ({len(batch)} participante(s)): {e}")
+                self._restore(batch)
+                return 0
+
+        points = sum(len(samples) for samples in batch.values())
+        self._stats["flushed"] += points
+        self._stats["flushes"] += 1
+        return points
+
+    async def flush_ride(self, ride_id: int) -> int:
+        """Grava o que falta do trajeto de uma aula (ex: ao finalizar)."""
+        return await self.flush(ride_id)
+
+    async def _write(self, batch: Iterable[Tuple[Tuple[int, int], List[TrackSample]]]) -> None:
+        # Import tardio: evita ciclo session -> settings no import da app
+        from app.infrastructure.db.session import AsyncSessionLocal
+        from app.infrastructure.repositories.ride_track_repository import AsyncRideTrackRepository
+
+        repo = AsyncRideTrackRepository()
+        async with AsyncSessionLocal() as db:
+            for (ride_id, sender_id), samples in batch:
+                await repo.append_points(db, ride_id, sender_id, samples)
+            await db.commit()
+
+    def _restore(self, batch: Dict[Tuple[int, int], List[TrackSample]]) -> None:
+        for key, samples in batch.items():
+            merged = samples + self._buffers.get(key, [])
+            overflow = len(merged) - self.max_buffered
+            if overflow > 0:
+                self._stats["dropped"] += overflow
+                merged = merged[overflow:]
+            self._buffers[key] = merged
+
+    async def run_flusher(self) -> None:
+        """Loop de background (iniciado no lifespan) que grava os trajetos em lote."""
+        self._wakeup = asyncio.Event()
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ Falha no flush dos trajetos: {e}")
+
+    def stats(self) -> dict:
+        return {
+            **self._stats,
+            "buffered": sum(len(samples) for samples in self._buffers.values()),
+            "senders": len(self._buffers),
+        }
+
+
+def _build_recorder() -> TrackRecorder:
+    from app.infrastructure.config.settings import settings
+
+    return TrackRecorder(
+        flush_interval=settings.TRACK_FLUSH_SECONDS,
+        flush_points=settings.TRACK_FLUSH_POINTS,
+    )
+
+
+# Instância global (por processo)
+track_recorder = _build_recorder()
@@ -1,54 +1,229 @@
 # app/api/deps.py
-from typing import Generator
-from fastapi import Depends, HTTPException, status
+from contextlib import AsyncExitStack, ExitStack, contextmanager
+from dataclasses import dataclass
+from typing import AsyncGenerator, Generator, Optional
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
 from sqlalchemy.orm import Session
-from app.infrastructure.db.session import SessionLocal
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.util import await_only
+from app.infrastructure.db.session import (
+    ON_CHECKOUT,
+    SessionLocal,
+    AsyncSessionLocal,
+    pool_monitor,
+    async_pool_monitor,
+)
+from app.infrastructure.db.pool_metrics import ConnectionBudgetExceeded, DEFAULT_ROUTE
 from app.infrastructure.config.settings import settings
 from app.interface.api.schemas.token import TokenPayload
 from app.infrastructure.db.models.user import User
-from app.infrastructure.repositories.user_repository import UserRepository
+from app.infrastructure.repositories.user_repository import UserRepository, AsyncUserRepository
+from app.infrastructure.security.user_cache import user_cache, UserSnapshot
 
 # Define que o token deve vir no header: "Authorization: Bearer <token>"
 reusable_oauth2 = OAuth2PasswordBearer(
     tokenUrl=f"{settings.API_V1_STR}/login/access-token"
 )
 
+def _route_key(request: Request) -> str:
+    """
+    Identifica o grupo de rotas para o budget de conexões.
+    Usa a tag do router (ex: "instructors", "payments") definida em v1/router.py.
+    """
+    route = request.scope.get("route")
+    tags = getattr(route, "tags", None)
+    return str(tags[0]) if tags else DEFAULT_ROUTE
+
+def _budget_exhausted(exc: ConnectionBudgetExceeded) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Serviço temporariamente sobrecarregado. Tente novamente.",
+        headers={"Retry-After": "1"},
+    )
+
 # Dependência para pegar a sessão do banco (já usamos no endpoint de users)
-def get_db() -> Generator:
+# A vaga no budget do router e a medição do checkout acontecem na primeira query
+# (ver LazyCheckoutSession): handlers que respondem sem tocar o banco não seguram
+# conexão nem vaga. A vaga fica reservada até a sessão ser fechada.
+def get_db(request: Request) -> Generator:
+    route = _route_key(request)
+    budget = ExitStack()
+
+    @contextmanager
+    def on_checkout():
+        budget.enter_context(pool_monitor.route_slot_sync(route, timeout=settings.DB_POOL_TIMEOUT))
+        with pool_monitor.track_checkout(route):
+            yield
+
+    db = SessionLocal()
+    db.info[ON_CHECKOUT] = on_checkout
     try:
-        db = SessionLocal()
         yield db
+    except ConnectionBudgetExceeded as e:
+        raise _budget_exhausted(e)
     finally:
         db.close()
+        budget.close()
+
+# Versão assíncrona: usada pelos handlers `async def` (não bloqueia o event loop)
+async def get_async_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    route = _route_key(request)
+    budget = AsyncExitStack()
+
+    @contextmanager
+    def on_checkout():
+        # Roda no greenlet da AsyncSession: await_only aguarda a vaga no event loop
+        await_only(budget.enter_async_context(
+            async_pool_monitor.route_slot(route, timeout=settings.DB_POOL_TIMEOUT)
+        ))
+        with async_pool_monitor.track_checkout(route):
+            yield
 
-# Dependência crítica: Valida o Token e retorna o Usuário Atual
-def get_current_user(
-    db: Session = Depends(get_db),
-    token: str = Depends(reusable_oauth2)
-) -> User:
+    try:
+        async with AsyncSessionLocal() as db:
+            db.info[ON_CHECKOUT] = on_checkout
+            yield db
+    except ConnectionBudgetExceeded as e:
+        raise _budget_exhausted(e)
+    finally:
+        await budget.aclose()
+
+def _decode_token(token: str) -> TokenPayload:
+    """Decodifica e valida o JWT, levantando 403 se for inválido."""
     try:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
         )
-        token_data = TokenPayload(**payload)
+        return TokenPayload(**payload)
     except (JWTError, KeyError):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Não foi possível validar as credenciais",
         )
-        
-    user_repo = UserRepository()
-    user = user_repo.get_by_email(db, email=token_data.sub)
-    
+
+def _ensure_active(user: User | None) -> User:
     if not user:
         raise HTTPException(status_code=404, detail="Usuário não encontrado")
     if not user.is_active:
         raise HTTPException(status_code=400, detail="Usuário inativo")
-        
     return user
 
+@dataclass(frozen=True)
+class CurrentPrincipal:
+    """
+    Usuário autenticado resolvido a partir das claims do JWT, sem acesso ao banco.
+    Use em endpoints que só precisam de id/tipo/permissões; para a linha completa
+    (ex: `instructor_profile`), use `get_current_user`.
+    """
+    id: int
+    email: str
+    user_type: str
+    is_superuser: bool = False
+    is_active: bool = True
+
+def _principal_from_snapshot(snapshot: UserSnapshot) -> CurrentPrincipal:
+    return CurrentPrincipal(
+        id=snapshot["id"],
+        email=snapshot["email"],
+        user_type=snapshot.get("user_type") or "student",
+        is_superuser=bool(snapshot.get("is_superuser")),
+        is_active=snapshot.get("is_active") is not False,
+    )
+
+def _claims_are_trusted(token_data: TokenPayload) -> bool:
+    return (
+        settings.AUTH_STATELESS
+        and token_data.uid is not None
+        and token_data.user_type is not None
+        and not user_cache.is_token_stale(token_data.uid, token_data.iat)
+    )
+
+def _user_from_cache(token_data: TokenPayload) -> Optional[User]:
+    """Reconstrói o User a partir do cache (None em caso de miss)."""
+    snapshot = user_cache.get(user_id=token_data.uid, email=token_data.sub)
+    if snapshot is None:
+        return None
+    return user_cache.build_user(snapshot)
+
+# Dependência crítica: Valida o Token e retorna o Usuário Atual
+def get_current_user(
+    db: Session = Depends(get_db),
+    token: str = Depends(reusable_oauth2)
+) -> User:
+    token_data = _decode_token(token)
+
+    user = _user_from_cache(token_data)
+    if user is not None:
+        # Anexa à sessão sem SELECT; relacionamentos lazy continuam disponíveis
+        db.add(user)
+    else:
+        user_repo = UserRepository()
+        user = user_repo.get_by_email(db, email=token_data.sub)
+        if user:
+            user_cache.set(user)
+
+    return _ensure_active(user)
+
+async def get_current_user_async(
+    db: AsyncSession = Depends(get_async_db),
+    token: str = Depends(reusable_oauth2)
+) -> User:
+    """
+    Equivalente assíncrono de `get_current_user`.
+    Atenção: relacionamentos lazy (ex: `instructor_profile`) não podem ser
+    acessados fora de `await` em AsyncSession.
+    """
+    token_data = _decode_token(token)
+
+    user = _user_from_cache(token_data)
+    if user is not None:
+        db.add(user)
+    else:
+        user_repo = AsyncUserRepository()
+        user = await user_repo.get_by_email(db, email=token_data.sub)
+        if user:
+            user_cache.set(user)
+
+    return _ensure_active(user)
+
+async def get_current_principal(
+    token: str = Depends(reusable_oauth2)
+) -> CurrentPrincipal:
+    """
+    Autenticação stateless: confia nas claims do token (uid, user_type,
+    is_superuser, is_active) e não abre sessão no banco.
+
+    Tokens antigos (sem claims) ou emitidos antes de uma revogação caem no
+    cache de usuários e, em último caso, em um lookup no banco.
+    """
+    token_data = _decode_token(token)
+
+    if _claims_are_trusted(token_data):
+        if token_data.is_active is False:
+            raise HTTPException(status_code=400, detail="Usuário inativo")
+        return CurrentPrincipal(
+            id=token_data.uid,
+            email=token_data.sub,
+            user_type=token_data.user_type,
+            is_superuser=bool(token_data.is_superuser),
+            is_active=True,
+        )
+
+    snapshot = user_cache.get(user_id=token_data.uid, email=token_data.sub)
+    if snapshot is None:
+        async with AsyncSessionLocal() as db:
+            user = await AsyncUserRepository().get_by_email(db, email=token_data.sub)
+            _ensure_active(user)
+            user_cache.set(user)
+            snapshot = user_cache.snapshot(user)
+
+    principal = _principal_from_snapshot(snapshot)
+    if not principal.is_active:
+        raise HTTPException(status_code=400, detail="Usuário inativo")
+    return principal
+
 def get_current_active_superuser(
     current_user: User = Depends(get_current_user),
 ) -> User:
@@ -56,4 +231,13 @@ def get_current_active_superuser(
         raise HTTPException(
             status_code=400, detail="O usuário não tem privilégios suficientes (Admin Required)"
         )
-    return current_user
\ No newline at end of file
+    return current_user
+
+async def get_current_active_superuser_async(
+    current_user: User = Depends(get_current_user_async),
+) -> User:
+    if not current_user.is_superuser:
+        raise HTTPException(
+            status_code=400, detail="O usuário não tem privilégios suficientes (Admin Required)"
+        )
+    return current_user
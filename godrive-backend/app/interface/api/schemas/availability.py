@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from datetime import time
+from datetime import date, time
 from typing import List
 
 # O que o Front envia para criar um horário
@@ -16,4 +16,15 @@ class AvailabilityResponse(BaseModel):
     end_time: time
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+# Calendário de disponibilidade (vários dias de uma vez)
+class AvailabilityDay(BaseModel):
+    date: date
+    slots: List[time] # Horários de início livres (aulas de 1h)
+
+class AvailabilityCalendarResponse(BaseModel):
+    instructor_id: int
+    start_date: date
+    end_date: date
+    days: List[AvailabilityDay]
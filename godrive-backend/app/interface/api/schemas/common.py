@@ -0,0 +1,28 @@
+# app/schemas/common.py
+import base64
+import json
+from typing import Any, Tuple
+
+from fastapi import HTTPException, status
+
+# --- Paginação keyset (cursor opaco) ---
+# O cursor é a chave de ordenação do último item da página, em JSON + base64 url-safe.
+# Ex: (1.25, 42) -> "WzEuMjUsIDQyXQ"
+
+def encode_cursor(*values: Any) -> str:
+    raw = json.dumps(list(values), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str, *types: type) -> Tuple[Any, ...]:
+    """Decodifica e valida o cursor (quantidade e tipo dos valores). 400 se inválido."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError(cursor)
+        return tuple(cast_to(value) for cast_to, value in zip(types, values))
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor de paginação inválido"
+        )
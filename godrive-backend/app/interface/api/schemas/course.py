@@ -69,6 +69,10 @@ class CourseResponse(BaseModel):
 
 # --- MATRÍCULAS (ENROLLMENTS) ---
 
+class OwnedCoursesResponse(BaseModel):
+    # Subconjunto dos cursos consultados que o aluno já comprou
+    course_ids: List[int]
+
 class EnrollmentResponse(BaseModel):
     id: int
     user_id: int
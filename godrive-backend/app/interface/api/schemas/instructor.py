@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 
 # Input: Criação do Perfil
 class InstructorCreate(BaseModel):
@@ -21,8 +21,15 @@ class InstructorResponse(BaseModel):
     cnh_category: str | None = None
     vehicle_model: str | None = None
     
-    # Campo calculado na busca (opcional, pois na criação ele não existe)
+    # Campos calculados na busca (opcionais, pois na criação eles não existem)
     distance: float | None = None 
+    average_rating: float | None = None
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+# Output: Página da busca por raio (paginação keyset)
+class InstructorSearchPage(BaseModel):
+    items: List[InstructorResponse]
+    # Passe em ?cursor= para buscar a próxima página (None = última página)
+    next_cursor: Optional[str] = None
\ No newline at end of file
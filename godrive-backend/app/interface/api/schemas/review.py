@@ -1,7 +1,7 @@
 # app/schemas/review.py
 from pydantic import BaseModel, Field, validator
 from datetime import datetime
-from typing import Optional
+from typing import Dict, Optional
 
 # Input: O que o front envia
 class ReviewCreate(BaseModel):
@@ -28,4 +28,6 @@ class ReviewResponse(BaseModel):
 # Output para Média (usado no perfil do instrutor)
 class RatingSummary(BaseModel):
     average: float
-    count: int
\ No newline at end of file
+    count: int
+    # Quantidade de avaliações por nota: {1: n, ..., 5: n}
+    histogram: Dict[int, int] = {}
\ No newline at end of file
@@ -1,7 +1,7 @@
 # app/schemas/ride.py
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional, Tuple
 from app.infrastructure.db.models.ride import RideStatus
 
 # Input: Criação da reserva (Booking)
@@ -34,4 +34,47 @@ class RideResponse(BaseModel):
     created_at: datetime
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+# Output: Item do histórico de aulas (projeção leve para listas)
+class RideSummary(BaseModel):
+    id: int
+    student_id: int
+    instructor_id: int
+    scheduled_at: datetime
+    duration_minutes: int
+    price: float
+    status: RideStatus
+
+# Output: Página do histórico (paginação keyset)
+class RidePage(BaseModel):
+    items: List[RideSummary]
+    # Passe em ?cursor= para buscar a próxima página (None = última página)
+    next_cursor: Optional[str] = None
+# Output: Trajeto gravado da aula (um por participante que enviou posição)
+class RideTrackSegment(BaseModel):
+    sender_id: int
+    started_at: datetime
+    ended_at: datetime
+    point_count: int
+    # [latitude, longitude, ms desde started_at]
+    points: List[Tuple[float, float, int]]
+
+class RideTrackResponse(BaseModel):
+    ride_id: int
+    tracks: List[RideTrackSegment]
+
+# Output: Ticket do WebSocket da aula (reconexões sem consultar o banco)
+class RideWsTicket(BaseModel):
+    ticket: str
+    expires_in: int
+
+# Output: Presença na sala da aula (WebSocket)
+class RideParticipantPresence(BaseModel):
+    user_id: int
+    online: bool
+    last_seen: datetime
+
+class RidePresenceResponse(BaseModel):
+    ride_id: int
+    participants: List[RideParticipantPresence]
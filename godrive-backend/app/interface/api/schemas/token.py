@@ -6,4 +6,10 @@ class Token(BaseModel):
     token_type: str
 
 class TokenPayload(BaseModel):
-    sub: str | None = None
\ No newline at end of file
+    sub: str | None = None
+    # Claims da autenticação stateless (ausentes em tokens antigos)
+    uid: int | None = None
+    user_type: str | None = None
+    is_superuser: bool | None = None
+    is_active: bool | None = None
+    iat: int | None = None
\ No newline at end of file
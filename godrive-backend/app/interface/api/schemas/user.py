@@ -15,6 +15,7 @@ class UserResponse(BaseModel):
     email: EmailStr
     is_active: bool
     has_pending_reviews: bool = False
+    pending_review_count: int = 0
     
     # 👇 ADICIONE ESTA LINHA
     user_type: str | None = None 
@@ -7,6 +7,16 @@ from app.infrastructure.db.models.user import User
 from app.infrastructure.db.models.instructor import InstructorStatus
 from app.interface.api.schemas.instructor import InstructorResponse
 from app.infrastructure.repositories.instructor_repository import InstructorRepository
+from app.infrastructure.db.session import pool_monitor, async_pool_monitor
+from app.infrastructure.security.user_cache import user_cache
+from app.infrastructure.security.ride_access import ride_access_cache
+from app.infrastructure.search.instructor_index import instructor_index
+from app.infrastructure.search.search_cache import instructor_search_cache
+from app.infrastructure.search.invalidation_bus import instructor_events
+from app.infrastructure.scheduling.slot_holds import slot_holds
+from app.infrastructure.external.socket_service import socket_manager
+from app.infrastructure.tracking import telemetry, track_recorder
+from app.infrastructure.courses import curriculum_cache, entitlements
 
 router = APIRouter()
 instructor_repo = InstructorRepository()
@@ -43,4 +53,89 @@ def reject_instructor(
     current_user: User = Depends(deps.get_current_active_superuser)
 ):
     instructor = instructor_repo.update_status(db, instructor_id, InstructorStatus.REJECTED)
-    return {"message": "Instrutor rejeitado."}
\ No newline at end of file
+    return {"message": "Instrutor rejeitado."}
+
+@router.get("/db/pool")
+def get_db_pool_metrics(
+    current_user: User = Depends(deps.get_current_active_superuser)
+):
+    """
+    Métricas dos pools de conexão: latência de checkout (histograma),
+    fila de espera e uso dos budgets por router.
+    """
+    return {
+        "sync": pool_monitor.snapshot(),
+        "async": async_pool_monitor.snapshot(),
+    }
+
+@router.get("/auth/user-cache")
+def get_user_cache_metrics(
+    current_user: User = Depends(deps.get_current_active_superuser)
+):
+    """Tamanho, hit/miss e revogações ativas do cache de usuários autenticados."""
+    return user_cache.stats()
+
+@router.get("/auth/ride-access")
+def get_ride_access_metrics(
+    current_user: User = Depends(deps.get_current_active_superuser)
+):
+    """Tamanho e hit/miss do cache de participantes usado no handshake do WebSocket das aulas."""
+    return ride_access_cache.stats()
+
+@router.get("/search/instructor-index")
+def get_instructor_index_metrics(
+    current_user: User = Depends(deps.get_current_active_superuser)
+):
+    """Estado do índice espacial em memória (tamanho, idade, hits e fallbacks para o PostGIS)."""
+    return instructor_index.stats()
+
+@router.get("/search/cache")
+def get_search_cache_metrics(
+    current_user: User = Depends(deps.get_current_active_superuser)
+):
+    """
+    Hits/misses do cache de busca por célula, requisições coalescidas pelo
+    single-flight e eventos do barramento de invalidação.
+    """
+    return {
+        **instructor_search_cache.stats(),
+        "invalidation_bus": instructor_events.stats(),
+    }
+
+@router.get("/scheduling/slot-holds")
+def get_slot_hold_metrics(
+    current_user: User = Depends(deps.get_current_active_superuser)
+):
+    """Holds de horário ativos (checkouts em andamento) neste processo e eventos propagados."""
+    return slot_holds.stats()
+
+@router.get("/sockets")
+def get_socket_metrics(
+    limit: int = 100,
+    current_user: User = Depends(deps.get_current_active_superuser)
+):
+    """
+    Salas de WebSocket deste processo: conexões, filas, sockets removidos
+    (lentos/ociosos), presença, conexões por sala (as `limit` maiores),
+    telemetria e gravação dos trajetos.
+    """
+    return {
+        **socket_manager.stats(),
+        "rooms_by_size": socket_manager.room_counts(limit),
+        "telemetry": telemetry.stats(),
+        "track_recorder": track_recorder.stats(),
+    }
+
+@router.get("/courses/curriculum-cache")
+def get_curriculum_cache_metrics(
+    current_user: User = Depends(deps.get_current_active_superuser)
+):
+    """Hit rate do cache (Redis) da grade dos cursos publicados neste processo."""
+    return curriculum_cache.stats()
+
+@router.get("/courses/entitlements")
+def get_entitlement_metrics(
+    current_user: User = Depends(deps.get_current_active_superuser)
+):
+    """Cache de cursos comprados por usuário: acertos locais/Redis e cargas do banco neste processo."""
+    return entitlements.stats()
@@ -1,27 +1,39 @@
 from typing import List, Any
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError
 
 from app.interface.api import deps
 from app.infrastructure.db.models.user import User
 from app.interface.api.schemas.course import CourseCreate, CourseResponse, ModuleCreate, LessonCreate, EnrollmentResponse
+from app.interface.api.schemas.course import OwnedCoursesResponse
 from app.infrastructure.repositories.course_repository import CourseRepository
+from app.infrastructure.courses.curriculum_cache import curriculum_cache
+from app.infrastructure.courses.entitlements import entitlements
 from app.application.dtos import CreateCourseDTO, CreateModuleDTO, CreateLessonDTO
 
 router = APIRouter()
 course_repo = CourseRepository()
 
 @router.get("/", response_model=List[CourseResponse])
-def list_courses(
+async def list_courses(
     skip: int = 0,
     limit: int = 20,
-    db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user)
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: deps.CurrentPrincipal = Depends(deps.get_current_principal)
 ):
     """
     Lista todos os cursos publicados disponíveis na plataforma.
+    A grade de cada curso vem do cache por versão (ver curriculum_cache.py);
+    `video_url` só aparece nos cursos que o aluno comprou.
     """
-    return course_repo.get_all(db, skip=skip, limit=limit, published_only=True)
+    catalog = await curriculum_cache.list_published(db, skip=skip, limit=limit)
+    if current_user.is_superuser:
+        return [views.full for views in catalog]
+    # Uma checagem em lote para a página inteira
+    owned = await entitlements.owned(db, current_user.id, [views.course_id for views in catalog])
+    return [views.for_viewer(views.course_id in owned) for views in catalog]
 
 @router.post("/", response_model=CourseResponse, status_code=status.HTTP_201_CREATED)
 def create_course(
@@ -42,37 +54,46 @@ def create_course(
     )
     return course_repo.create(db, course=course_dto)
 
+@router.get("/owned", response_model=OwnedCoursesResponse)
+async def get_owned_courses(
+    course_ids: List[int] = Query(..., max_length=100, description="Cursos a verificar (pode repetir)"),
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: deps.CurrentPrincipal = Depends(deps.get_current_principal)
+):
+    """
+    Quais destes cursos o aluno já comprou (ex: selos "Comprado" na tela do catálogo).
+    Checagem em lote no cache de matrículas: não consulta o banco com o cache quente.
+    """
+    owned = await entitlements.owned(db, current_user.id, course_ids)
+    return {"course_ids": sorted(owned)}
+
 @router.get("/{course_id}", response_model=CourseResponse)
-def get_course_details(
+async def get_course_details(
     course_id: int,
-    db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user)
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: deps.CurrentPrincipal = Depends(deps.get_current_principal)
 ):
     """
     Retorna a grade curricular do curso.
     **Regra de Negócio:** Se o aluno NÃO estiver matriculado, o campo `video_url` das aulas será removido (None).
     """
-    course = course_repo.get_by_id(db, course_id=course_id)
-    if not course:
+    # Grade publicada vem do cache por versão; rascunhos vão direto ao banco
+    views = await curriculum_cache.get_views(db, course_id)
+    if not views:
         raise HTTPException(status_code=404, detail="Curso não encontrado.")
     
-    # Verifica se o usuário comprou o curso
-    enrollment = course_repo.get_enrollment(db, user_id=current_user.id, course_id=course.id)
-    
     # Lógica de Proteção de Conteúdo (DRM light)
-    # Se não for Admin E não estiver matriculado: esconde os links dos vídeos
-    if not current_user.is_superuser and not enrollment:
-        for module in course.modules:
-            for lesson in module.lessons:
-                lesson.video_url = None # Mascara o link
-                
-    return course
+    # Se não for Admin E não estiver matriculado: visão pública, sem os links dos vídeos.
+    # As visões são compartilhadas e imutáveis: nada é alterado por requisição.
+    if current_user.is_superuser:
+        return views.full
+    return views.for_viewer(await entitlements.has(db, current_user.id, course_id))
 
 @router.post("/{course_id}/enroll", response_model=EnrollmentResponse)
 def enroll_student(
     course_id: int,
     db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user)
+    current_user: deps.CurrentPrincipal = Depends(deps.get_current_principal)
 ):
     """
     Realiza a matrícula do aluno no curso.
@@ -84,11 +105,17 @@ def enroll_student(
     if not course:
         raise HTTPException(status_code=404, detail="Curso não encontrado.")
     
-    if course_repo.get_enrollment(db, user_id=current_user.id, course_id=course_id):
+    if entitlements.has_sync(db, current_user.id, course_id):
         raise HTTPException(status_code=400, detail="Você já está matriculado neste curso.")
     
     # Registra matrícula
-    return course_repo.enroll_user(db, user_id=current_user.id, course_id=course_id, price_paid=course.price)
+    try:
+        return course_repo.enroll_user(db, user_id=current_user.id, course_id=course_id, price_paid=course.price)
+    except IntegrityError:
+        # Matrícula concorrente (duplo toque, webhook): a unique (user_id, course_id) recusou
+        db.rollback()
+        entitlements.grant(current_user.id, course_id)
+        raise HTTPException(status_code=400, detail="Você já está matriculado neste curso.")
 
 # --- Sub-recursos (Adicionar Conteúdo) ---
 
@@ -107,8 +134,8 @@ def add_module(
     # Converte Pydantic Schema para DTO (Clean Architecture)
     module_dto = CreateModuleDTO(title=module_in.title, order=module_in.order)
     course_repo.create_module(db, course_id, module_dto)
-    db.refresh(course) # Recarrega para retornar a estrutura atualizada
-    return course
+    # Recarrega (com a grade) para retornar a estrutura atualizada
+    return course_repo.get_with_curriculum(db, course_id)
 
 @router.post("/{course_id}/modules/{module_id}/lessons", response_model=CourseResponse)
 def add_lesson(
@@ -129,5 +156,5 @@ def add_lesson(
     )
     course_repo.create_lesson(db, module_id, lesson_dto)
     
-    course = course_repo.get_by_id(db, course_id)
+    course = course_repo.get_with_curriculum(db, course_id)
     return course
\ No newline at end of file
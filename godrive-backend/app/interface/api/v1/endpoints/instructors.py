@@ -1,49 +1,35 @@
-from app.interface.api.schemas.availability import AvailabilityCreate, AvailabilityResponse
+from app.interface.api.schemas.availability import AvailabilityCreate, AvailabilityResponse, AvailabilityCalendarResponse
 from app.infrastructure.repositories.availability_repository import AvailabilityRepository
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.interface.api import deps
-from app.interface.api.schemas.instructor import InstructorCreate, InstructorResponse
-from app.infrastructure.repositories.instructor_repository import InstructorRepository
+from app.interface.api.schemas.instructor import InstructorCreate, InstructorResponse, InstructorSearchPage
+from app.interface.api.schemas.common import encode_cursor, decode_cursor
+from app.infrastructure.repositories.instructor_repository import InstructorRepository, AsyncInstructorRepository
 from app.infrastructure.db.models.user import User
 from app.infrastructure.db.models.instructor import InstructorProfile # <--- ADICIONE ESTE IMPORT
+from app.infrastructure.security.user_cache import user_cache
+from app.infrastructure.search.instructor_index import instructor_index
+from app.infrastructure.search.search_cache import instructor_search_cache
 from datetime import date, time # <--- Importe 'date' e 'time'
-from app.application.use_cases.availability.availability_service import AvailabilityService # <--- Importe o Serviço
+from app.application.use_cases.availability.availability_service import AvailabilityService, MAX_CALENDAR_DAYS # <--- Importe o Serviço
+from app.application.use_cases.availability.weekly_template import weekly_template_cache
 import shutil
 import os
 from fastapi import File, UploadFile
-from fastapi_cache.decorator import cache
 from typing import List, Optional
-from app.application.dtos import CreateInstructorDTO, CreateAvailabilityDTO
+from app.application.dtos import CreateInstructorDTO, CreateAvailabilityDTO, InstructorSearchFiltersDTO
 
 router = APIRouter()
 repo = InstructorRepository()
+async_repo = AsyncInstructorRepository()
 availability_repo = AvailabilityRepository()
 
 UPLOAD_DIR = "uploads"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
-# --- FUNÇÃO HELPER PARA O CACHE ---
-def search_key_builder(
-    func,
-    namespace: Optional[str] = "",
-    _request: Request = None,  # Adicionei o _
-    _response: Response = None, # Adicionei o _
-    *args,
-    **kwargs,
-):
-    """
-    Gera uma chave de cache única baseada APENAS na lat, long e radius.
-    Ignora 'db' e 'current_user' para não quebrar o Redis.
-    """
-    lat = kwargs.get("latitude")
-    lon = kwargs.get("longitude")
-    rad = kwargs.get("radius")
-    
-    # Ex: godrive-cache:search:-23.55:-46.63:10.0
-    return f"godrive-cache:search:{lat}:{lon}:{rad}"
-
 @router.post("/me/documents")
 def upload_documents(
     cnh_file: UploadFile = File(None),
@@ -101,6 +87,8 @@ def create_instructor_profile(
         current_user.user_type = "instructor"
         db.add(current_user)
         db.commit()
+        # Tokens emitidos antes desta alteração carregam user_type="student"
+        user_cache.revoke(current_user.id)
     
     try:
         # Converte Pydantic Schema para DTO (Clean Architecture)
@@ -114,26 +102,73 @@ def create_instructor_profile(
         )
         new_profile = repo.create(db=db, user_id=current_user.id, profile=instructor_dto)
         # Injeta o nome do usuário na resposta
-        new_profile.full_name = current_user.full_name 
+        new_profile.full_name = current_user.full_name
         return new_profile
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Erro ao criar perfil: {str(e)}")
 
-@router.get("/search", response_model=List[InstructorResponse])
-@cache(expire=60, key_builder=search_key_builder) # <--- USAMOS O BUILDER AQUI
-def search_instructors(
+@router.get("/search", response_model=InstructorSearchPage)
+async def search_instructors(
     latitude: float,
     longitude: float,
     radius: float = Query(10.0, description="Raio de busca em Km"),
-    db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user)
+    min_price: Optional[float] = Query(None, ge=0, description="Valor mínimo da hora/aula"),
+    max_price: Optional[float] = Query(None, ge=0, description="Valor máximo da hora/aula"),
+    cnh_category: Optional[str] = Query(None, description="Categoria da CNH (ex: B)"),
+    vehicle_model: Optional[str] = Query(None, description="Modelo do veículo (busca parcial)"),
+    min_rating: Optional[float] = Query(None, ge=1, le=5, description="Média mínima de avaliações"),
+    verified_only: bool = Query(True, description="Apenas instrutores aprovados (ignorado para não administradores)"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor da página anterior"),
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: deps.CurrentPrincipal = Depends(deps.get_current_principal)
 ):
     """
-    Busca instrutores próximos num raio de X km.
-    (Cacheado por 1 minuto no Redis)
+    Busca instrutores próximos num raio de X km, com filtros e paginação
+    keyset ordenada por (distância, id).
+
+    Ordem de resolução: índice em memória -> candidatos da célula no Redis
+    (TTL em settings.SEARCH_CACHE_TTL_SECONDS, invalidados pelo barramento; ver
+    search_cache.py) -> PostGIS.
     """
-    instructors = repo.get_by_radius(db, lat=latitude, long=longitude, radius_km=radius)
-    return instructors
+    filters = InstructorSearchFiltersDTO(
+        min_price=min_price,
+        max_price=max_price,
+        cnh_category=cnh_category,
+        vehicle_model=vehicle_model,
+        min_rating=min_rating,
+        # Só administradores enxergam instrutores pendentes/rejeitados
+        verified_only=verified_only or not current_user.is_superuser,
+    )
+    after = decode_cursor(cursor, float, int) if cursor else None
+
+    # Busca um item a mais para saber se existe próxima página
+    if instructor_index.is_ready():
+        instructors = instructor_index.search_radius(
+            latitude, longitude, radius, filters=filters, after=after, limit=limit + 1
+        )
+    elif instructor_search_cache.accepts(radius):
+        instructor_index.fallbacks += 1
+        instructors = await instructor_search_cache.search(
+            latitude, longitude, radius,
+            loader=lambda lat, long, radius_km: async_repo.list_candidates(db, lat, long, radius_km),
+            filters=filters, after=after, limit=limit + 1
+        )
+    else:
+        # Sem índice nem cache (ou raio grande demais): consulta o PostGIS
+        instructor_index.fallbacks += 1
+        instructors = await async_repo.get_by_radius(
+            db, lat=latitude, long=longitude, radius_km=radius,
+            filters=filters, after=after, limit=limit + 1
+        )
+
+    next_cursor = None
+    if len(instructors) > limit:
+        instructors = instructors[:limit]
+        last = instructors[-1]
+        next_cursor = encode_cursor(last["distance"], last["id"])
+
+    return {"items": instructors, "next_cursor": next_cursor}
 
 @router.post("/availability", response_model=AvailabilityResponse)
 def add_availability(
@@ -158,11 +193,14 @@ def add_availability(
         end_time=availability_in.end_time,
     )
     
-    return availability_repo.create(
+    availability = availability_repo.create(
         db=db, 
         instructor_id=current_user.instructor_profile.id, 
         availability=availability_dto
     )
+    # Template semanal compilado ficou desatualizado neste processo
+    weekly_template_cache.invalidate(current_user.instructor_profile.id)
+    return availability
 
 @router.get("/availability", response_model=List[AvailabilityResponse])
 def list_my_availability(
@@ -182,7 +220,7 @@ def get_instructor_availability_slots(
     instructor_id: int,
     date: date = Query(..., description="Data para consultar disponibilidade (YYYY-MM-DD)"),
     db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user)
+    current_user: deps.CurrentPrincipal = Depends(deps.get_current_principal)
 ):
     """
     Retorna os horários calculados (slots) disponíveis para um instrutor em uma data específica.
@@ -191,4 +229,33 @@ def get_instructor_availability_slots(
     service = AvailabilityService()
     available_slots = service.get_available_slots(db=db, instructor_id=instructor_id, query_date=date)
     
-    return available_slots
\ No newline at end of file
+    return available_slots
+
+@router.get("/{instructor_id}/availability/calendar", response_model=AvailabilityCalendarResponse)
+def get_instructor_availability_calendar(
+    instructor_id: int,
+    start_date: date = Query(..., description="Primeiro dia (YYYY-MM-DD)"),
+    end_date: date = Query(..., description="Último dia, inclusive (YYYY-MM-DD)"),
+    db: Session = Depends(deps.get_db),
+    current_user: deps.CurrentPrincipal = Depends(deps.get_current_principal)
+):
+    """
+    Slots disponíveis de vários dias em uma única chamada (ex: visão de mês do app).
+    Exemplo de uso: /instructors/1/availability/calendar?start_date=2025-01-01&end_date=2025-01-31
+    """
+    if end_date < start_date:
+        raise HTTPException(status_code=400, detail="end_date deve ser igual ou posterior a start_date.")
+    if (end_date - start_date).days + 1 > MAX_CALENDAR_DAYS:
+        raise HTTPException(status_code=400, detail=f"Intervalo máximo de {MAX_CALENDAR_DAYS} dias.")
+
+    service = AvailabilityService()
+    calendar = service.get_available_calendar(
+        db=db, instructor_id=instructor_id, start_date=start_date, end_date=end_date
+    )
+
+    return {
+        "instructor_id": instructor_id,
+        "start_date": start_date,
+        "end_date": end_date,
+        "days": [{"date": day, "slots": slots} for day, slots in calendar.items()],
+    }
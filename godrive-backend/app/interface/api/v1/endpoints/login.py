@@ -40,7 +40,9 @@ def login_access_token(
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     return {
         "access_token": security.create_access_token(
-            subject=user.email, expires_delta=access_token_expires
+            subject=user.email,
+            expires_delta=access_token_expires,
+            claims=security.build_user_claims(user),
         ),
         "token_type": "bearer",
     }
\ No newline at end of file
@@ -1,16 +1,22 @@
 # app/api/v1/endpoints/payments.py
 from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.interface.api import deps
-from app.infrastructure.db.models.user import User
 from app.infrastructure.db.models.ride import Ride, RideStatus
 from app.infrastructure.db.models.course import Course # <--- Novo Import
 from app.application.use_cases.payment.payment_service import PaymentService
-from app.infrastructure.repositories.course_repository import CourseRepository # <--- Novo Import
+from app.infrastructure.repositories.course_repository import CourseRepository, AsyncCourseRepository # <--- Novo Import
+from app.infrastructure.repositories.ride_repository import AsyncRideRepository, is_slot_conflict
+from app.infrastructure.scheduling.slot_holds import slot_holds
+from app.infrastructure.courses.entitlements import entitlements
+from sqlalchemy.exc import DBAPIError, IntegrityError
 
 router = APIRouter()
 payment_service = PaymentService()
 course_repo = CourseRepository() # <--- Instância
+async_course_repo = AsyncCourseRepository()
+async_ride_repo = AsyncRideRepository()
 
 # --- PAGAMENTO DE AULAS (RIDE) ---
 
@@ -18,7 +24,7 @@ course_repo = CourseRepository() # <--- Instância
 def create_ride_payment_intent(
     ride_id: int,
     db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user)
+    current_user: deps.CurrentPrincipal = Depends(deps.get_current_principal)
 ):
     """Inicia o pagamento de uma aula (Booking)."""
     ride = db.query(Ride).filter(Ride.id == ride_id).first()
@@ -54,7 +60,7 @@ def create_ride_payment_intent(
 def create_course_payment_intent(
     course_id: int,
     db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user)
+    current_user: deps.CurrentPrincipal = Depends(deps.get_current_principal)
 ):
     """Inicia o pagamento de um curso (LMS)."""
     course = course_repo.get_by_id(db, course_id)
@@ -62,7 +68,7 @@ def create_course_payment_intent(
         raise HTTPException(status_code=404, detail="Curso não encontrado.")
     
     # Verifica se já comprou
-    if course_repo.get_enrollment(db, current_user.id, course_id):
+    if entitlements.has_sync(db, current_user.id, course_id):
         raise HTTPException(status_code=400, detail="Você já possui este curso.")
 
     try:
@@ -77,7 +83,7 @@ def create_course_payment_intent(
 # --- WEBHOOK (O CÉREBRO) ---
 
 @router.post("/webhook")
-async def stripe_webhook(request: Request, db: Session = Depends(deps.get_db)):
+async def stripe_webhook(request: Request, db: AsyncSession = Depends(deps.get_async_db)):
     body = await request.body()
     sig_header = request.headers.get("stripe-signature")
 
@@ -94,11 +100,21 @@ async def stripe_webhook(request: Request, db: Session = Depends(deps.get_db)):
         # ROTA 1: Pagamento de AULA
         if product_type == "ride":
             ride_id = int(metadata.get("ride_id"))
-            ride = db.query(Ride).filter(Ride.id == ride_id).first()
-            if ride:
+            ride = await async_ride_repo.get_by_id(db, ride_id)
+            if ride and ride.status in (RideStatus.PENDING_PAYMENT, RideStatus.CANCELLED):
+                # CANCELLED aqui = checkout expirado pelo reaper antes do pagamento chegar:
+                # tenta reativar; a constraint do banco recusa se o horário já foi tomado.
+                instructor_id, was_expired = ride.instructor_id, ride.status == RideStatus.CANCELLED
                 ride.status = RideStatus.SCHEDULED
-                db.commit()
-                print(f"WEBHOOK: Aula {ride_id} confirmada.")
+                try:
+                    await db.commit()
+                    print(f"WEBHOOK: Aula {ride_id} confirmada.")
+                except DBAPIError as e:
+                    await db.rollback()
+                    if not (was_expired and is_slot_conflict(e)):
+                        raise
+                    print(f"⚠️ WEBHOOK: Aula {ride_id} paga após expirar e o horário já foi ocupado (requer estorno).")
+                await slot_holds.release_async(instructor_id, ride_id)
 
         # ROTA 2: Pagamento de CURSO
         elif product_type == "course":
@@ -109,9 +125,14 @@ async def stripe_webhook(request: Request, db: Session = Depends(deps.get_db)):
             amount_paid = payment_intent["amount"] / 100.0
             
             # Efetiva a matrícula
-            # Verifica novamente se já não existe para evitar erro de constraint
-            if not course_repo.get_enrollment(db, user_id, course_id):
-                course_repo.enroll_user(db, user_id, course_id, amount_paid)
-                print(f"WEBHOOK: Matrícula confirmada User {user_id} -> Curso {course_id}")
+            # Verifica novamente se já não existe (retentativas do Stripe)
+            if not await entitlements.has(db, user_id, course_id):
+                try:
+                    await async_course_repo.enroll_user(db, user_id, course_id, amount_paid)
+                    print(f"WEBHOOK: Matrícula confirmada User {user_id} -> Curso {course_id}")
+                except IntegrityError:
+                    # Cache desatualizado (ex: Redis fora do ar na matrícula): a constraint garante a unicidade
+                    await db.rollback()
+                    await entitlements.grant_async(user_id, course_id)
 
     return {"status": "success"}
\ No newline at end of file
@@ -67,7 +67,7 @@ def add_question_to_quiz(
 def get_quiz_details(
     quiz_id: int,
     db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user)
+    current_user: deps.CurrentPrincipal = Depends(deps.get_current_principal)
 ):
     """
     Aluno: Abre o simulado para responder.
@@ -83,7 +83,7 @@ def submit_quiz_answers(
     quiz_id: int,
     submission: QuizSubmission,
     db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user)
+    current_user: deps.CurrentPrincipal = Depends(deps.get_current_principal)
 ):
     """
     Aluno: Envia as respostas. O servidor corrige e devolve a nota na hora.
@@ -72,7 +72,7 @@ def create_review(
 def list_user_reviews(
     user_id: int,
     db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user)
+    current_user: deps.CurrentPrincipal = Depends(deps.get_current_principal)
 ):
     """
     Lista as avaliações que um usuário recebeu.
@@ -87,7 +87,7 @@ def list_user_reviews(
 def get_user_rating_summary(
     user_id: int,
     db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user)
+    current_user: deps.CurrentPrincipal = Depends(deps.get_current_principal)
 ):
     """
     Retorna a média de estrelas e o total de avaliações de um usuário.
@@ -1,17 +1,27 @@
-from typing import List
+from typing import List, Optional
 from datetime import datetime, timezone, timedelta
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.interface.api import deps
 from app.infrastructure.db.models.user import User
 from app.infrastructure.db.models.instructor import InstructorProfile
 from app.infrastructure.db.models.ride import Ride, RideStatus
 from app.interface.api.schemas.ride import RideCreate, RideResponse
-from app.infrastructure.repositories.ride_repository import RideRepository
+from app.infrastructure.repositories.ride_repository import RideRepository, AsyncRideRepository
 from app.application.use_cases.availability.availability_service import AvailabilityService
 from app.infrastructure.external.socket_service import socket_manager # [Novo Import] para notificar o app
 from app.interface.api.schemas.ride import RideCreate, RideResponse, RideStart # <--- Importe RideStart
+from app.interface.api.schemas.ride import RideTrackResponse, RideTrackSegment, RideWsTicket
+from app.interface.api.schemas.ride import RidePresenceResponse, RideParticipantPresence
+from app.interface.api.schemas.ride import RidePage
+from app.interface.api.schemas.common import encode_cursor, decode_cursor
+from app.application.dtos import RideHistoryFiltersDTO
+from app.infrastructure.security.ride_access import create_ride_ticket, ride_access_cache
+from app.infrastructure.repositories.ride_track_repository import AsyncRideTrackRepository
+from app.infrastructure.tracking.track_codec import decode_track, simplify_track
+from app.infrastructure.tracking.track_recorder import track_recorder
 from app.utils.geo import haversine # <--- Importe a função
 
 # --- Clean Architecture Imports ---
@@ -32,6 +42,8 @@ from app.domain.exceptions.instructor import InstructorNotFoundException
 
 router = APIRouter()
 ride_repo = RideRepository()
+async_ride_repo = AsyncRideRepository()
+async_track_repo = AsyncRideTrackRepository()
 availability_service = AvailabilityService()
 
 
@@ -91,33 +103,64 @@ def create_ride(
             detail="O instrutor não está disponível neste horário."
         )
 
-@router.get("/", response_model=List[RideResponse])
-def read_my_rides(
-    db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user)
+@router.get("/", response_model=RidePage)
+async def read_my_rides(
+    status_in: Optional[List[RideStatus]] = Query(None, alias="status", description="Filtra por status (pode repetir)"),
+    scheduled_from: Optional[datetime] = Query(None, description="Aulas a partir deste instante (inclusive)"),
+    scheduled_to: Optional[datetime] = Query(None, description="Aulas antes deste instante"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor da página anterior"),
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: deps.CurrentPrincipal = Depends(deps.get_current_principal)
 ):
     """
-    Lista as aulas do usuário logado.
+    Lista as aulas do usuário logado, mais recentes primeiro, com filtros e
+    paginação keyset por (scheduled_at, id).
     """
-    if current_user.user_type == "instructor":
-        if not current_user.instructor_profile:
-            return []
-        return ride_repo.get_by_instructor(db, instructor_id=current_user.instructor_profile.id)
-    else:
-        return ride_repo.get_by_student(db, student_id=current_user.id)
+    filters = RideHistoryFiltersDTO(
+        statuses=[s.value for s in status_in] if status_in else None,
+        scheduled_from=scheduled_from,
+        scheduled_to=scheduled_to,
+    )
+    after = None
+    if cursor:
+        scheduled_at, ride_id = decode_cursor(cursor, str, int)
+        try:
+            after = (datetime.fromisoformat(scheduled_at), ride_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Cursor de paginação inválido")
+
+    # O id do perfil de instrutor é o próprio id do usuário
+    # Busca um item a mais para saber se existe próxima página
+    rides = await async_ride_repo.list_history(
+        db,
+        user_id=current_user.id,
+        as_instructor=current_user.user_type == "instructor",
+        filters=filters,
+        after=after,
+        limit=limit + 1,
+    )
+
+    next_cursor = None
+    if len(rides) > limit:
+        rides = rides[:limit]
+        last = rides[-1]
+        next_cursor = encode_cursor(last["scheduled_at"].isoformat(), last["id"])
+
+    return {"items": rides, "next_cursor": next_cursor}
 
 
 @router.patch("/{ride_id}/finish", response_model=RideResponse)
 async def finish_ride(
     ride_id: int,
-    db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user)
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: deps.CurrentPrincipal = Depends(deps.get_current_principal)
 ):
     """
     Instrutor finaliza a aula.
     Muda status para COMPLETED e encerra rastreamento.
     """
-    ride = ride_repo.get_by_id(db, ride_id)
+    ride = await async_ride_repo.get_by_id(db, ride_id)
     if not ride:
         raise HTTPException(status_code=404, detail="Aula não encontrada.")
 
@@ -129,11 +172,14 @@ async def finish_ride(
     if ride.status != RideStatus.IN_PROGRESS:
         raise HTTPException(status_code=400, detail="A aula não está em andamento.")
 
-    # 3. Atualização de Estado
-    ride.status = RideStatus.COMPLETED
-    ride.updated_at = datetime.now(timezone.utc)
-    db.commit()
-    db.refresh(ride)
+    # 3. Atualização de Estado (+1 avaliação pendente para aluno e instrutor)
+    ride = await async_ride_repo.complete(db, ride)
+    if ride is None:
+        # Outra requisição finalizou (ou cancelou) a aula entre a leitura e a escrita
+        raise HTTPException(status_code=400, detail="A aula não está em andamento.")
+
+    # Grava o restante do trajeto que ainda está em buffer neste processo
+    await track_recorder.flush_ride(ride.id)
 
     # 4. Notificação Final via WebSocket
     await socket_manager.broadcast_location(ride.id, {"type": "RIDE_FINISHED", "message": "A aula foi finalizada."})
@@ -141,17 +187,19 @@ async def finish_ride(
     # Opcional: Forçar desconexão dos sockets desta sala
     # socket_manager.close_room(ride.id) 
 
+    return ride
+
 @router.patch("/{ride_id}/start", response_model=RideResponse)
 async def start_ride(
     ride_id: int,
     start_in: RideStart, # <--- Novo Payload
-    db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user)
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: deps.CurrentPrincipal = Depends(deps.get_current_principal)
 ):
     """
     Instrutor inicia a aula. Valida se ele está próximo ao local de encontro.
     """
-    ride = ride_repo.get_by_id(db, ride_id)
+    ride = await async_ride_repo.get_by_id(db, ride_id)
     if not ride:
         raise HTTPException(status_code=404, detail="Aula não encontrada.")
 
@@ -185,10 +233,88 @@ async def start_ride(
     # 4. Atualização de Estado
     ride.status = RideStatus.IN_PROGRESS
     ride.updated_at = datetime.now(timezone.utc)
-    db.commit()
-    db.refresh(ride)
+    await db.commit()
+    await db.refresh(ride)
 
     # 5. Notificação via WebSocket
     await socket_manager.broadcast_location(ride.id, {"type": "RIDE_STARTED", "message": "A aula começou!"})
 
-    return ride
\ No newline at end of file
+    return ride
+
+
+@router.get("/{ride_id}/track", response_model=RideTrackResponse)
+async def get_ride_track(
+    ride_id: int,
+    tolerance_m: float = Query(0, ge=0, le=500, description="Simplificação Douglas–Peucker (metros). 0 = trajeto completo."),
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: deps.CurrentPrincipal = Depends(deps.get_current_principal)
+):
+    """
+    Trajeto gravado da aula (posições enviadas pelo WebSocket), por participante.
+    Visível para o aluno, o instrutor da aula e administradores.
+    """
+    ride = await async_ride_repo.get_by_id(db, ride_id)
+    if not ride:
+        raise HTTPException(status_code=404, detail="Aula não encontrada.")
+
+    # O id do perfil de instrutor é o próprio id do usuário
+    if not current_user.is_superuser and current_user.id not in (ride.student_id, ride.instructor_id):
+        raise HTTPException(status_code=403, detail="Você não participa desta aula.")
+
+    tracks = []
+    for track in await async_track_repo.get_by_ride(db, ride_id):
+        points = decode_track(track.data)
+        if tolerance_m:
+            points = simplify_track(points, tolerance_m)
+        tracks.append(RideTrackSegment(
+            sender_id=track.sender_id,
+            started_at=track.started_at,
+            ended_at=track.ended_at,
+            point_count=track.point_count,
+            points=points,
+        ))
+    return RideTrackResponse(ride_id=ride_id, tracks=tracks)
+
+
+@router.post("/{ride_id}/ws-ticket", response_model=RideWsTicket)
+async def create_ws_ticket(
+    ride_id: int,
+    current_user: deps.CurrentPrincipal = Depends(deps.get_current_principal)
+):
+    """
+    Ticket assinado do WebSocket da aula (ws://.../ws/rides/{id}?ticket=XYZ).
+    Vale só para esta aula e este usuário; reconexões com ele não consultam o banco.
+    """
+    role = await ride_access_cache.resolve(current_user.id, ride_id)
+    if role is None:
+        raise HTTPException(status_code=404, detail="Aula não encontrada.")
+    ticket, expires_in = create_ride_ticket(current_user.id, ride_id, role)
+    return RideWsTicket(ticket=ticket, expires_in=expires_in)
+
+
+@router.get("/{ride_id}/presence", response_model=RidePresenceResponse)
+async def get_ride_presence(
+    ride_id: int,
+    current_user: deps.CurrentPrincipal = Depends(deps.get_current_principal)
+):
+    """
+    Quem está conectado na sala da aula e quando foi visto pela última vez.
+    Visível para os participantes e administradores (não consulta o banco em cache hit).
+    """
+    if not current_user.is_superuser:
+        role = await ride_access_cache.resolve(current_user.id, ride_id)
+        if role is None:
+            raise HTTPException(status_code=404, detail="Aula não encontrada.")
+
+    participants = await socket_manager.presence.get(ride_id)
+    return RidePresenceResponse(
+        ride_id=ride_id,
+        participants=[
+            RideParticipantPresence(
+                user_id=p["user_id"],
+                online=p["online"],
+                last_seen=datetime.fromtimestamp(p["last_seen"], tz=timezone.utc),
+            )
+            for p in participants
+        ],
+    )
@@ -1,29 +1,23 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from app.infrastructure.db.session import SessionLocal
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.interface.api.schemas.user import UserCreate, UserResponse
-from app.infrastructure.repositories.user_repository import UserRepository
+from app.infrastructure.repositories.user_repository import UserRepository, AsyncUserRepository
 from app.infrastructure.security.security import get_password_hash
 from app.interface.api import deps
-from app.infrastructure.repositories.ride_repository import RideRepository 
+from app.infrastructure.repositories.ride_repository import RideRepository, AsyncRideRepository
 from app.infrastructure.db.models.user import User
 from app.application.dtos import CreateUserDTO
 
 
 router = APIRouter()
 user_repo = UserRepository()
+async_user_repo = AsyncUserRepository()
 ride_repo = RideRepository()
-
-# Dependência para pegar a sessão do banco
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+async_ride_repo = AsyncRideRepository()
 
 @router.post("/", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-def create_user(user_in: UserCreate, db: Session = Depends(get_db)):
+def create_user(user_in: UserCreate, db: Session = Depends(deps.get_db)):
     """
     Cria um novo usuário (Aluno ou Instrutor).
     """
@@ -45,17 +39,19 @@ def create_user(user_in: UserCreate, db: Session = Depends(get_db)):
     return user
     
 @router.get("/me", response_model=UserResponse)
-def read_user_me(
-    db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user)
+async def read_user_me(
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: User = Depends(deps.get_current_user_async)
 ):
     """
     Retorna os dados do usuário logado e verifica pendências.
     """
-    # Verifica se existem avaliações pendentes
-    pending_rides = ride_repo.get_pending_reviews_for_user(db, user_id=current_user.id)
+    # Verifica se existem avaliações pendentes (contador mantido em users: lookup pela PK,
+    # lido do banco e não do snapshot em cache do usuário)
+    pending_count = await async_user_repo.get_pending_review_count(db, current_user.id)
     
     # Injeta a informação no objeto antes de retornar (o Pydantic lê isso)
-    current_user.has_pending_reviews = len(pending_rides) > 0
+    current_user.has_pending_reviews = pending_count > 0
+    current_user.pending_review_count = pending_count
     
     return current_user
\ No newline at end of file
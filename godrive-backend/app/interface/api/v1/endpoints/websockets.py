@@ -1,83 +1,110 @@
+import time
 from typing import Optional
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Query, status
-from jose import jwt, JWTError
-from app.infrastructure.config.settings import settings
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect, Query, status
+from app.interface.api import deps
 from app.infrastructure.external.socket_service import socket_manager
-from app.infrastructure.db.session import SessionLocal
-from app.infrastructure.repositories.user_repository import UserRepository
-from app.infrastructure.repositories.ride_repository import RideRepository
+from app.infrastructure.tracking.telemetry import telemetry
+from app.infrastructure.security.ride_access import (
+    create_ride_ticket,
+    decode_ride_ticket,
+    ride_access_cache,
+)
 
 router = APIRouter()
 
+async def _authorize(ride_id: int, token: Optional[str], ticket: Optional[str]):
+    """
+    Resolve (user_id, papel, ticket_para_o_cliente) ou None se a conexão for recusada.
+
+    - ticket da aula: só verificação de assinatura, sem banco (reconexões).
+    - token de acesso: claims do JWT (ou cache de usuários) + cache de
+      participantes da aula; em caso de miss, uma consulta assíncrona leve.
+      Um ticket novo é devolvido para as próximas reconexões.
+    """
+    if ticket:
+        parsed = decode_ride_ticket(ticket, ride_id)
+        if parsed is None:
+            return None
+        # Passou da metade da validade: renova (sem banco) para a aula não cair no meio
+        renewed = None
+        if time.time() > (parsed.issued_at + parsed.expires_at) / 2:
+            renewed = create_ride_ticket(parsed.user_id, ride_id, parsed.role)
+        return parsed.user_id, parsed.role, renewed
+
+    if not token:
+        return None
+    try:
+        principal = await deps.get_current_principal(token)
+    except HTTPException:
+        return None
+    role = await ride_access_cache.resolve(principal.id, ride_id)
+    if role is None:
+        return None
+    return principal.id, role, create_ride_ticket(principal.id, ride_id, role)
+
 @router.websocket("/rides/{ride_id}")
 async def websocket_endpoint(
     websocket: WebSocket,
     ride_id: int,
-    token: Optional[str] = Query(None)
+    token: Optional[str] = Query(None),
+    ticket: Optional[str] = Query(None),
+    format: str = Query("json", pattern="^(json|binary)$")
 ):
     """
     Endpoint WebSocket para monitoramento em tempo real.
     Requer token JWT via query param: ws://host/api/v1/ws/rides/{id}?token=XYZ
+    Reconexões devem usar o ticket da aula recebido na mensagem WS_TICKET
+    (ou em POST /rides/{id}/ws-ticket): ws://host/api/v1/ws/rides/{id}?ticket=XYZ
+    Com `format=binary` as posições chegam como frames binários de 26 bytes
+    (ver external/location_frame.py); eventos continuam em JSON.
     """
-    # 1. Validação do Token (Handshake Manual)
-    if not token:
+    # 1. Handshake: apenas o Aluno ou o Instrutor daquela aula podem entrar na sala
+    auth = await _authorize(ride_id, token, ticket)
+    if auth is None:
         await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
         return
+    user_id, _role, new_ticket = auth
 
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise ValueError("Token inválido")
-    except (JWTError, ValueError):
-        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
-        return
+    # (Opcional) Validar se a aula está ativa (SCHEDULED ou IN_PROGRESS)
 
-    # 2. Validação de Negócio (Usuário e Aula)
-    # Criamos uma sessão manual pois WebSockets não usam o Depends(get_db) da mesma forma
-    db = SessionLocal()
+    # 2. Loop de Comunicação
+    await socket_manager.connect(ride_id, websocket, binary=(format == "binary"), user_id=user_id)
+    if new_ticket is not None:
+        ticket_value, expires_in = new_ticket
+        socket_manager.send_to(websocket, {
+            "type": "WS_TICKET",
+            "ticket": ticket_value,
+            "expires_in": expires_in,
+        })
     try:
-        user_repo = UserRepository()
-        ride_repo = RideRepository()
-        
-        user = user_repo.get_by_email(db, email=email)
-        if not user:
-            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
-            return
-
-        ride = ride_repo.get_by_id(db, ride_id)
-        if not ride:
-            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
-            return
-
-        # Segurança: Apenas o Aluno ou o Instrutor daquela aula podem entrar na sala
-        is_student = (ride.student_id == user.id)
-        is_instructor = (ride.instructor_id == user.id)
+        while True:
+            # Recebe dados de localização: {"lat": -23.5, "long": -46.6, "speed": 8.3}
+            data = await websocket.receive_json()
+            socket_manager.touch(websocket)
 
-        if not (is_student or is_instructor):
-            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
-            return
-            
-        # (Opcional) Validar se a aula está ativa (SCHEDULED ou IN_PROGRESS)
-        # if ride.status not in ["scheduled", "in_progress"]:
-        #     await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
-        #     return
+            # Heartbeat: PONG só confirma que o cliente está vivo; PING do cliente é respondido
+            message_type = data.get("type") if isinstance(data, dict) else None
+            if message_type == "PONG":
+                continue
+            if message_type == "PING":
+                socket_manager.send_to(websocket, {"type": "PONG"})
+                continue
 
-    finally:
-        db.close() # Fecha a conexão com o banco após a validação inicial
+            # Valida, coalesce e repassa para todos na sala (Broadcast) com o sender_id
+            # de quem enviou (para o front saber se é o aluno ou instrutor)
+            interval = await telemetry.ingest(ride_id, user_id, data)
+            if interval is not None:
+                # Rastreamento adaptativo: o cliente ajusta a frequência de envio
+                socket_manager.send_to(websocket, {
+                    "type": "TRACKING_INTERVAL",
+                    "interval_seconds": interval,
+                })
 
-    # 3. Loop de Comunicação
-    await socket_manager.connect(ride_id, websocket)
-    try:
-        while True:
-            # Recebe dados de localização: {"lat": -23.5, "long": -46.6}
-            data = await websocket.receive_json()
-            
-            # Injeta o ID de quem enviou (para o front saber se é o aluno ou instrutor)
-            data["sender_id"] = user.id
-            
-            # Repassa para todos na sala (Broadcast)
-            await socket_manager.broadcast_location(ride_id, data)
-            
     except WebSocketDisconnect:
-        socket_manager.disconnect(ride_id, websocket)
\ No newline at end of file
+        pass
+    except RuntimeError:
+        # Socket já fechado pelo servidor (removido da sala por lentidão)
+        pass
+    finally:
+        telemetry.forget(ride_id, user_id)
+        await socket_manager.disconnect(ride_id, websocket)
\ No newline at end of file
@@ -1,12 +1,24 @@
 from fastapi import FastAPI
 from app.interface.api.v1.router import api_router
 from app.infrastructure.config.settings import settings
+from app.infrastructure.db.session import async_engine
+from app.infrastructure.search.instructor_index import run_refresher
+from app.infrastructure.search.search_cache import instructor_search_cache
+from app.infrastructure.search.invalidation_bus import instructor_events
+from app.infrastructure.scheduling.slot_holds import slot_holds, run_pending_reaper
+from app.infrastructure.external.socket_service import socket_manager
+from app.infrastructure.external.socket_broker import RedisSocketBroker
+from app.infrastructure.tracking.track_recorder import track_recorder
+from app.infrastructure.courses.curriculum_cache import curriculum_cache
+from app.infrastructure.courses.entitlements import entitlements
+from app.infrastructure.security.user_cache import user_cache
 
 # --- NOVOS IMPORTS ---
 from fastapi_cache import FastAPICache
 from fastapi_cache.backends.redis import RedisBackend
 from redis import asyncio as aioredis
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
+import asyncio
 
 # Configuração do Lifespan (Substituto moderno do @app.on_event("startup"))
 @asynccontextmanager
@@ -14,12 +26,48 @@ async def lifespan(app: FastAPI):
     # 1. Startup: Conecta no Redis e inicia o Cache
     redis = aioredis.from_url(settings.REDIS_URL, encoding="utf8", decode_responses=True)
     FastAPICache.init(RedisBackend(redis), prefix="godrive-cache")
+    instructor_search_cache.init(redis)
+    curriculum_cache.init(redis)
+    entitlements.init(redis)
     print("✅ Sistema de Cache (Redis) inicializado com sucesso!")
+
+    # Salas de WebSocket: aluno e instrutor podem estar em workers diferentes
+    if settings.SOCKET_BROKER == "redis":
+        socket_manager.init(RedisSocketBroker(redis))
+        socket_manager.presence.init(redis)
+
+    # Barramento de invalidação da busca + índice espacial de instrutores (background)
+    background_tasks = [asyncio.create_task(instructor_events.listen(redis))]
+    # Holds de horário do checkout (espelho local) + expiração de pagamentos abandonados
+    background_tasks.append(asyncio.create_task(slot_holds.listen(redis)))
+    # Revogações de tokens (espelho local das chaves godrive:revoked:*)
+    background_tasks.append(asyncio.create_task(user_cache.listen(redis)))
+    background_tasks.append(asyncio.create_task(
+        run_pending_reaper(settings.PENDING_RIDE_REAPER_SECONDS, settings.SLOT_HOLD_TTL_SECONDS)
+    ))
+    # Heartbeat das salas: remove sockets meio abertos e publica a presença
+    background_tasks.append(asyncio.create_task(socket_manager.run_heartbeat(
+        settings.SOCKET_HEARTBEAT_SECONDS, settings.SOCKET_IDLE_TIMEOUT_SECONDS
+    )))
+    # Trajeto das aulas: grava em lote as posições recebidas pelo WebSocket
+    background_tasks.append(asyncio.create_task(track_recorder.run_flusher()))
+    if settings.INSTRUCTOR_INDEX_ENABLED:
+        background_tasks.append(
+            asyncio.create_task(run_refresher(settings.INSTRUCTOR_INDEX_REFRESH_SECONDS))
+        )
     
     yield
     
-    # 2. Shutdown: (Opcional) Fechar conexões se necessário
+    # 2. Shutdown: Para as tasks de background e fecha o pool assíncrono do banco
+    for task in background_tasks:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    await socket_manager.broker.close()
+    # Grava o que ainda está em buffer antes de fechar o pool do banco
+    await track_recorder.flush()
     # await redis.close()
+    await async_engine.dispose()
 
 # Inicializa a aplicação com o lifespan
 app = FastAPI(
@@ -0,0 +1,41 @@
+"""add instructor location geography column
+
+Revision ID: a3c9e1d4b7f2
+Revises: 7548fbf031a3
+Create Date: 2026-10-18 10:12:31.504112
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c9e1d4b7f2'
+down_revision: Union[str, None] = '7548fbf031a3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Coluna geography gerada a partir de 'location' (geometry).
+    # A busca por raio fazia 'location::geography' na query, o que impedia o uso
+    # do índice GiST de geometry (full scan + cálculo no esferoide por linha).
+    op.execute(
+        "ALTER TABLE instructor_profiles "
+        "ADD COLUMN location_geog geography(Point, 4326) "
+        "GENERATED ALWAYS AS (location::geography) STORED"
+    )
+    op.create_index(
+        'ix_instructor_profiles_location_geog',
+        'instructor_profiles',
+        ['location_geog'],
+        unique=False,
+        postgresql_using='gist'
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_instructor_profiles_location_geog', table_name='instructor_profiles')
+    op.drop_column('instructor_profiles', 'location_geog')
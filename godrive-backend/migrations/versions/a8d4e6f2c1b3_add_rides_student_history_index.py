@@ -0,0 +1,40 @@
+"""add rides (student_id, scheduled_at, id) index
+
+Revision ID: a8d4e6f2c1b3
+Revises: f5c1a8e3b9d7
+Create Date: 2026-10-18 23:02:17.436891
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8d4e6f2c1b3'
+down_revision: Union[str, None] = 'f5c1a8e3b9d7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Histórico do aluno (GET /rides) paginado por (scheduled_at, id): rides.student_id
+    # não tinha índice nenhum. O histórico do instrutor usa ix_rides_instructor_id_scheduled_at.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_rides_student_id_scheduled_at_id',
+            'rides',
+            ['student_id', 'scheduled_at', 'id'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_rides_student_id_scheduled_at_id',
+            table_name='rides',
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,58 @@
+"""add courses.curriculum_version and curriculum indexes
+
+Revision ID: b3f7d1e9a2c5
+Revises: a8d4e6f2c1b3
+Create Date: 2026-10-18 23:41:05.118274
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3f7d1e9a2c5'
+down_revision: Union[str, None] = 'a8d4e6f2c1b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Versão da grade (chave do cache em Redis). Default constante: sem reescrita da tabela.
+    op.add_column(
+        'courses',
+        sa.Column('curriculum_version', sa.Integer(), nullable=False, server_default='1'),
+    )
+
+    # As FKs da grade não tinham índice: o selectinload filtra por course_id / module_id IN (...)
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_course_modules_course_id_order',
+            'course_modules',
+            ['course_id', 'order'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_course_lessons_module_id_order',
+            'course_lessons',
+            ['module_id', 'order'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_course_lessons_module_id_order',
+            table_name='course_lessons',
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            'ix_course_modules_course_id_order',
+            table_name='course_modules',
+            postgresql_concurrently=True,
+        )
+    op.drop_column('courses', 'curriculum_version')
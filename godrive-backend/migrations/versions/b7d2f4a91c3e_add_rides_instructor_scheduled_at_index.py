@@ -0,0 +1,42 @@
+"""add rides (instructor_id, scheduled_at) index
+
+Revision ID: b7d2f4a91c3e
+Revises: a3c9e1d4b7f2
+Create Date: 2026-10-18 14:05:12.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d2f4a91c3e'
+down_revision: Union[str, None] = 'a3c9e1d4b7f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # A busca de aulas do dia usava cast(scheduled_at AS date), que não usa índice
+    # (seq scan em rides inteira). Agora é um intervalo semiaberto em scheduled_at.
+    # CONCURRENTLY para não travar escritas em rides durante a criação.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_rides_instructor_id_scheduled_at',
+            'rides',
+            ['instructor_id', 'scheduled_at'],
+            unique=False,
+            postgresql_include=['status'],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_rides_instructor_id_scheduled_at',
+            table_name='rides',
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,81 @@
+"""add rides no-overlap exclusion constraint
+
+Revision ID: c4e8a2d6f1b9
+Revises: b7d2f4a91c3e
+Create Date: 2026-10-18 16:40:03.772145
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e8a2d6f1b9'
+down_revision: Union[str, None] = 'b7d2f4a91c3e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # '=' em integer dentro de um índice GiST
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+
+    # Fim da aula materializado: 'timestamptz + interval' não é IMMUTABLE e não
+    # pode ser usado direto na constraint. O trigger mantém a coluna para
+    # qualquer escrita (app, scripts, admin).
+    op.add_column('rides', sa.Column('ends_at', sa.DateTime(timezone=True), nullable=True))
+    op.execute("""
+        CREATE FUNCTION rides_set_ends_at() RETURNS trigger AS $$
+        BEGIN
+            NEW.ends_at := NEW.scheduled_at + make_interval(mins => COALESCE(NEW.duration_minutes, 50));
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER trg_rides_set_ends_at
+        BEFORE INSERT OR UPDATE OF scheduled_at, duration_minutes ON rides
+        FOR EACH ROW EXECUTE FUNCTION rides_set_ends_at()
+    """)
+    op.execute(
+        "UPDATE rides SET ends_at = scheduled_at + make_interval(mins => COALESCE(duration_minutes, 50))"
+    )
+    op.alter_column('rides', 'ends_at', nullable=False)
+
+    # Aulas já sobrepostas impedem a constraint: falha com uma mensagem clara
+    # em vez de cancelar reservas de alguém automaticamente.
+    op.execute("""
+        DO $$
+        DECLARE conflicts integer;
+        BEGIN
+            SELECT count(*) INTO conflicts
+            FROM rides a
+            JOIN rides b
+              ON a.instructor_id = b.instructor_id
+             AND a.id < b.id
+             AND tstzrange(a.scheduled_at, a.ends_at, '[)') && tstzrange(b.scheduled_at, b.ends_at, '[)')
+            WHERE a.status IS DISTINCT FROM 'cancelled'
+              AND b.status IS DISTINCT FROM 'cancelled';
+            IF conflicts > 0 THEN
+                RAISE EXCEPTION 'Existem % pares de aulas sobrepostas; resolva antes de aplicar a migração.', conflicts;
+            END IF;
+        END
+        $$
+    """)
+
+    op.execute("""
+        ALTER TABLE rides ADD CONSTRAINT ex_rides_instructor_no_overlap
+        EXCLUDE USING gist (
+            instructor_id WITH =,
+            tstzrange(scheduled_at, ends_at, '[)') WITH &&
+        ) WHERE (status IS DISTINCT FROM 'cancelled')
+    """)
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE rides DROP CONSTRAINT ex_rides_instructor_no_overlap")
+    op.execute("DROP TRIGGER trg_rides_set_ends_at ON rides")
+    op.execute("DROP FUNCTION rides_set_ends_at()")
+    op.drop_column('rides', 'ends_at')
@@ -0,0 +1,42 @@
+"""create ride tracks table
+
+Revision ID: d9a1f3c5e7b2
+Revises: c4e8a2d6f1b9
+Create Date: 2026-10-18 19:22:47.105388
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd9a1f3c5e7b2'
+down_revision: Union[str, None] = 'c4e8a2d6f1b9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'ride_tracks',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('ride_id', sa.Integer(), nullable=False),
+        sa.Column('sender_id', sa.Integer(), nullable=False),
+        sa.Column('started_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('ended_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('point_count', sa.Integer(), nullable=False),
+        sa.Column('data', sa.LargeBinary(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['ride_id'], ['rides.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['sender_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('ride_id', 'sender_id', name='uq_ride_track_ride_sender')
+    )
+    op.create_index(op.f('ix_ride_tracks_id'), 'ride_tracks', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_ride_tracks_id'), table_name='ride_tracks')
+    op.drop_table('ride_tracks')
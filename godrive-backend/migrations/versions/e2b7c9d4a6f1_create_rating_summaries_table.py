@@ -0,0 +1,70 @@
+"""create rating summaries table
+
+Revision ID: e2b7c9d4a6f1
+Revises: d9a1f3c5e7b2
+Create Date: 2026-10-18 21:03:36.540127
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2b7c9d4a6f1'
+down_revision: Union[str, None] = 'd9a1f3c5e7b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    counter = dict(nullable=False, server_default='0')
+    op.create_table(
+        'rating_summaries',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('rating_count', sa.Integer(), **counter),
+        sa.Column('rating_sum', sa.Integer(), **counter),
+        sa.Column('count_1', sa.Integer(), **counter),
+        sa.Column('count_2', sa.Integer(), **counter),
+        sa.Column('count_3', sa.Integer(), **counter),
+        sa.Column('count_4', sa.Integer(), **counter),
+        sa.Column('count_5', sa.Integer(), **counter),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+
+    # Backfill inicial (o mesmo cálculo de scripts/backfill_rating_summaries.py)
+    op.execute("""
+        INSERT INTO rating_summaries
+            (user_id, rating_count, rating_sum, count_1, count_2, count_3, count_4, count_5)
+        SELECT reviewee_id, count(*), sum(rating),
+               count(*) FILTER (WHERE rating = 1),
+               count(*) FILTER (WHERE rating = 2),
+               count(*) FILTER (WHERE rating = 3),
+               count(*) FILTER (WHERE rating = 4),
+               count(*) FILTER (WHERE rating = 5)
+        FROM reviews
+        GROUP BY reviewee_id
+    """)
+
+    # Listagem das avaliações recebidas (reviews do perfil) filtra por reviewee_id
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_reviews_reviewee_id_created_at',
+            'reviews',
+            ['reviewee_id', 'created_at'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_reviews_reviewee_id_created_at',
+            table_name='reviews',
+            postgresql_concurrently=True,
+        )
+    op.drop_table('rating_summaries')
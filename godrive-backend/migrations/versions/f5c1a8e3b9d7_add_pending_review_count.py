@@ -0,0 +1,73 @@
+"""add users.pending_review_count and completed rides partial indexes
+
+Revision ID: f5c1a8e3b9d7
+Revises: e2b7c9d4a6f1
+Create Date: 2026-10-18 22:11:58.904316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f5c1a8e3b9d7'
+down_revision: Union[str, None] = 'e2b7c9d4a6f1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Com server_default constante o ADD COLUMN não reescreve a tabela (PG 11+)
+    op.add_column(
+        'users',
+        sa.Column('pending_review_count', sa.Integer(), nullable=False, server_default='0'),
+    )
+
+    # Backfill (o mesmo cálculo de scripts/backfill_pending_review_counts.py)
+    op.execute("""
+        UPDATE users u
+        SET pending_review_count = p.pending
+        FROM (
+            SELECT r.user_id, count(*) AS pending
+            FROM (
+                SELECT id AS ride_id, student_id AS user_id FROM rides WHERE status = 'completed'
+                UNION ALL
+                SELECT id, instructor_id FROM rides WHERE status = 'completed'
+            ) r
+            WHERE NOT EXISTS (
+                SELECT 1 FROM reviews v
+                WHERE v.ride_id = r.ride_id AND v.reviewer_id = r.user_id
+            )
+            GROUP BY r.user_id
+        ) p
+        WHERE u.id = p.user_id
+    """)
+
+    # Índices parciais das aulas concluídas, um por papel (o EXISTS de cada papel usa o seu).
+    # CONCURRENTLY para não travar escritas em rides durante a criação.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_rides_student_id_completed',
+            'rides',
+            ['student_id'],
+            unique=False,
+            postgresql_where=sa.text("status = 'completed'"),
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_rides_instructor_id_completed',
+            'rides',
+            ['instructor_id'],
+            unique=False,
+            postgresql_where=sa.text("status = 'completed'"),
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_rides_instructor_id_completed', table_name='rides', postgresql_concurrently=True)
+        op.drop_index('ix_rides_student_id_completed', table_name='rides', postgresql_concurrently=True)
+    op.drop_column('users', 'pending_review_count')
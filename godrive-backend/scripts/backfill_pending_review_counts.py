@@ -0,0 +1,30 @@
+"""
+Backfill: contador de avaliações pendentes (users.pending_review_count)
+
+Recalcula, a partir de `rides` (concluídas) e `reviews`, quantas aulas cada
+usuário ainda não avaliou. Idempotente: só grava os contadores que mudaram e
+pode ser rodado a qualquer momento para corrigir drift (ex: aulas concluídas
+por uma versão antiga da API durante o deploy da migração f5c1a8e3b9d7).
+
+Uso (a partir de godrive-backend/):
+    python -m scripts.backfill_pending_review_counts
+"""
+import time
+
+from app.infrastructure.db.session import SessionLocal
+from app.infrastructure.repositories.ride_repository import RideRepository
+
+
+def main() -> None:
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        fixed = RideRepository().rebuild_pending_review_counts(db)
+    finally:
+        db.close()
+    elapsed = time.perf_counter() - started
+    print(f"✅ {fixed} contador(es) corrigido(s) em {elapsed:.2f}s.")
+
+
+if __name__ == "__main__":
+    main()
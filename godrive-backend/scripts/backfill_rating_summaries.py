@@ -0,0 +1,31 @@
+"""
+Backfill: agregados de avaliações (rating_summaries)
+
+Recalcula, a partir de `reviews`, o total, a soma e o histograma de notas de
+cada usuário avaliado. Idempotente: pode ser rodado a qualquer momento para
+corrigir drift (ex: avaliações gravadas por uma versão antiga da API durante
+o deploy da migração e2b7c9d4a6f1). Durante o recálculo a tabela
+rating_summaries fica travada: novas avaliações aguardam o commit.
+
+Uso (a partir de godrive-backend/):
+    python -m scripts.backfill_rating_summaries
+"""
+import time
+
+from app.infrastructure.db.session import SessionLocal
+from app.infrastructure.repositories.review_repository import ReviewRepository
+
+
+def main() -> None:
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        updated, reset = ReviewRepository().rebuild_summaries(db)
+    finally:
+        db.close()
+    elapsed = time.perf_counter() - started
+    print(f"✅ {updated} resumo(s) recalculado(s), {reset} zerado(s) em {elapsed:.2f}s.")
+
+
+if __name__ == "__main__":
+    main()
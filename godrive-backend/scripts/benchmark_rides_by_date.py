@@ -0,0 +1,182 @@
+"""
+Benchmark: aulas do instrutor por data
+
+Compara, numa tabela temporária com milhões de aulas, a busca antiga
+(`cast(scheduled_at AS date) = :dia`) com a nova (intervalo semiaberto em
+`scheduled_at`), com e sem o índice (instructor_id, scheduled_at) INCLUDE (status).
+O caso "cast com índice" isola o ganho da reescrita: com o índice presente, o
+cast só aproveita o prefixo instructor_id e lê todas as aulas do instrutor.
+
+Também mede a query do caminho de agendamento (intervalos ocupados do dia,
+sem canceladas).
+
+A tabela é TEMP: nada é gravado no banco da aplicação.
+
+No fim imprime um resumo (p50/p95 de cada caso e o ganho sobre o cast sem
+índice) pronto para colar na descrição do PR.
+
+Uso (a partir de godrive-backend/):
+    python -m scripts.benchmark_rides_by_date --rows 5000000 --instructors 20000
+"""
+import argparse
+import math
+import random
+import statistics
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, Tuple
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import create_engine, text
+
+from app.infrastructure.config.settings import settings
+from app.infrastructure.repositories.ride_repository import local_day_range
+
+TABLE = "bench_rides"
+INDEX = "bench_rides_instructor_id_scheduled_at"
+
+QUERIES = {
+    "cast_date": f"""
+        SELECT id, status FROM {TABLE}
+        WHERE instructor_id = :instructor_id
+          AND CAST(scheduled_at AS DATE) = :day
+    """,
+    "range": f"""
+        SELECT id, status FROM {TABLE}
+        WHERE instructor_id = :instructor_id
+          AND scheduled_at >= :day_start AND scheduled_at < :day_end
+    """,
+    "busy_times": f"""
+        SELECT scheduled_at, duration_minutes FROM {TABLE}
+        WHERE instructor_id = :instructor_id
+          AND status <> 'cancelled'
+          AND scheduled_at >= :day_start AND scheduled_at < :day_end
+        ORDER BY scheduled_at
+    """,
+}
+
+
+def create_table(conn, rows: int, instructors: int, days: int) -> None:
+    print(f"Gerando {rows:,} aulas para {instructors:,} instrutores em {days} dias...")
+    conn.execute(text(f"""
+        CREATE TEMP TABLE {TABLE} (
+            id bigint PRIMARY KEY,
+            instructor_id integer NOT NULL,
+            student_id integer NOT NULL,
+            scheduled_at timestamptz NOT NULL,
+            duration_minutes integer NOT NULL DEFAULT 50,
+            price double precision NOT NULL,
+            status varchar NOT NULL
+        )
+    """))
+    # Aulas em horas cheias, espalhadas pelos últimos `days` dias
+    conn.execute(text(f"""
+        INSERT INTO {TABLE}
+        SELECT g,
+               1 + (random() * (:instructors - 1))::int,
+               1 + (random() * 100000)::int,
+               date_trunc('hour', now() - random() * make_interval(days => :days)),
+               50,
+               80 + random() * 70,
+               (ARRAY['pending_payment','scheduled','completed','completed','cancelled'])[1 + (random() * 4)::int]
+        FROM generate_series(1, :rows) AS g
+    """), {"rows": rows, "instructors": instructors, "days": days})
+    conn.execute(text(f"ANALYZE {TABLE}"))
+
+
+def sample_params(instructors: int, days: int, tz: ZoneInfo, n: int):
+    today = date.today()
+    params = []
+    for _ in range(n):
+        day = today - timedelta(days=random.randint(0, days - 1))
+        day_start, day_end = local_day_range(day, tz)
+        params.append({
+            "instructor_id": random.randint(1, instructors),
+            "day": day,
+            "day_start": day_start,
+            "day_end": day_end,
+        })
+    return params
+
+
+# (p50, p95) em ms
+Timing = Tuple[float, float]
+
+
+def run(conn, name: str, params) -> Timing:
+    sql = text(QUERIES[name])
+    conn.execute(sql, params[0]).fetchall()  # Aquece o cache de planos
+    timings = []
+    for p in params:
+        started = time.perf_counter()
+        conn.execute(sql, p).fetchall()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    p50 = statistics.median(timings)
+    p95 = timings[max(0, math.ceil(len(timings) * 0.95) - 1)]
+    print(f"  {name:<11} p50={p50:8.3f} ms  p95={p95:8.3f} ms  (n={len(timings)})")
+    return p50, p95
+
+
+def summary(results: Dict[str, Timing], baseline: str) -> None:
+    """Tabela final (markdown): p50/p95 por caso e ganho sobre o baseline no p50."""
+    base_p50 = results[baseline][0]
+    print("\n| caso | p50 (ms) | p95 (ms) | ganho p50 |")
+    print("|---|---:|---:|---:|")
+    for case, (p50, p95) in results.items():
+        print(f"| {case} | {p50:.3f} | {p95:.3f} | {base_p50 / p50:.1f}x |")
+
+
+def explain(conn, name: str, p) -> None:
+    plan = conn.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {QUERIES[name]}"), p).fetchall()
+    print(f"\n  EXPLAIN {name}:")
+    for (line,) in plan:
+        print(f"    {line}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--instructors", type=int, default=20_000)
+    parser.add_argument("--days", type=int, default=730)
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args()
+
+    tz = ZoneInfo(settings.DEFAULT_TIMEZONE)
+    # AUTOCOMMIT: VACUUM não roda dentro de transação (a tabela TEMP vive na conexão)
+    engine = create_engine(settings.DATABASE_URL, isolation_level="AUTOCOMMIT")
+    with engine.connect() as conn:
+        conn.execute(text("SET TIME ZONE 'UTC'"))
+        started = time.perf_counter()
+        create_table(conn, args.rows, args.instructors, args.days)
+        print(f"Tabela pronta em {time.perf_counter() - started:.1f}s ({datetime.now():%H:%M:%S})")
+
+        params = sample_params(args.instructors, args.days, tz, args.queries)
+
+        results: Dict[str, Timing] = {}
+        # Seq scan: poucas amostras
+        slow_params = params[:max(5, args.queries // 50)]
+
+        print("\nSem índice (instructor_id, scheduled_at):")
+        results["cast sem índice"] = run(conn, "cast_date", slow_params)
+        results["range sem índice"] = run(conn, "range", slow_params)
+        explain(conn, "cast_date", params[0])
+
+        conn.execute(text(
+            f"CREATE INDEX {INDEX} ON {TABLE} (instructor_id, scheduled_at) INCLUDE (status)"
+        ))
+        # VACUUM preenche o visibility map (index-only scan quando as colunas estão no índice)
+        conn.execute(text(f"VACUUM ANALYZE {TABLE}"))
+
+        print("\nCom índice (instructor_id, scheduled_at) INCLUDE (status):")
+        results["cast com índice"] = run(conn, "cast_date", params)
+        results["range com índice"] = run(conn, "range", params)
+        results["busy_times com índice"] = run(conn, "busy_times", params)
+        for name in QUERIES:
+            explain(conn, name, params[0])
+
+        summary(results, baseline="cast sem índice")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Fixtures compartilhados para testes da camada de infraestrutura.
+"""
+import pytest
+from datetime import datetime, timezone, timedelta
+from typing import Optional
+
+from sqlalchemy.exc import DBAPIError
+
+
+class FakePgError(Exception):
+    """Erro do driver (psycopg2) com o SQLSTATE em `pgcode`."""
+
+    def __init__(self, pgcode: str, message: str = ""):
+        super().__init__(message)
+        self.pgcode = pgcode
+
+
+class FakeBookingSession:
+    """
+    Session falsa para o RideRepositoryAdapter.create: cada commit consome o
+    próximo erro de `commit_errors` (None = sucesso).
+    """
+
+    def __init__(self, commit_errors: Optional[list] = None):
+        self._commit_errors = list(commit_errors or [])
+        self.added = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    def add(self, model):
+        self.added.append(model)
+
+    def commit(self):
+        self.commits += 1
+        error = self._commit_errors.pop(0) if self._commit_errors else None
+        if error is not None:
+            raise error
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def refresh(self, model):
+        model.id = len(self.added)
+        model.created_at = model.updated_at = datetime.now(timezone.utc)
+
+
+@pytest.fixture
+def db_error():
+    """Fábrica de DBAPIError do SQLAlchemy envolvendo um erro do driver: db_error(pgcode, msg)."""
+    def build(pgcode: str, message: str = "") -> DBAPIError:
+        return DBAPIError("INSERT INTO rides ...", {}, FakePgError(pgcode, message))
+    return build
+
+
+@pytest.fixture
+def booking_session():
+    """Fábrica de FakeBookingSession: booking_session(erro1, erro2, ...)."""
+    return lambda *commit_errors: FakeBookingSession(list(commit_errors))
+
+
+@pytest.fixture
+def no_slot_holds(monkeypatch):
+    """Desliga o hold no Redis e o backoff entre tentativas; devolve os sleeps feitos."""
+    from app.infrastructure.repositories.adapters import ride_repository_adapter
+
+    sleeps = []
+    monkeypatch.setattr(ride_repository_adapter.slot_holds, "hold", lambda *args: None)
+    monkeypatch.setattr(ride_repository_adapter.time, "sleep", sleeps.append)
+    return sleeps
+
+
+@pytest.fixture
+def future_datetime():
+    """Retorna uma data no futuro para agendamentos."""
+    return datetime.now(timezone.utc) + timedelta(days=2)
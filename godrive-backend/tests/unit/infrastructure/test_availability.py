@@ -0,0 +1,157 @@
+"""
+Testes unitários para o motor de intervalos da agenda (WeeklyTemplate) e o
+cálculo do calendário do AvailabilityService.
+"""
+from datetime import date, datetime, time, timedelta, timezone
+from types import SimpleNamespace
+from zoneinfo import ZoneInfo
+
+import pytest
+
+# O pacote de repositórios precisa carregar antes (ciclo availability <-> adapters)
+import app.infrastructure.repositories  # noqa: F401
+from app.application.use_cases.availability import availability_service as service_module
+from app.application.use_cases.availability.availability_service import (
+    SLOT_MINUTES,
+    AvailabilityService,
+)
+from app.application.use_cases.availability.weekly_template import (
+    WeeklyTemplate,
+    merge_intervals,
+    subtract_intervals,
+)
+
+NEW_YORK = ZoneInfo("America/New_York")
+# Domingo 08/03/2026: 02:00 vira 03:00 (UTC-5 -> UTC-4)
+SPRING_FORWARD = date(2026, 3, 8)
+# Domingo 01/11/2026: 02:00 volta para 01:00 (UTC-4 -> UTC-5)
+FALL_BACK = date(2026, 11, 1)
+
+
+def _rule(weekday: int, start: int, end: int):
+    return SimpleNamespace(day_of_week=weekday, start_time=time(start), end_time=time(end))
+
+
+def _slots(*hours: int):
+    return [time(hour) for hour in hours]
+
+
+class FakeRideRepository:
+    """Aulas ocupadas do período: (scheduled_at, duration_minutes)."""
+
+    def __init__(self, rides):
+        self.rides = rides
+
+    def get_busy_intervals_in_range(self, db, instructor_id, start, end):
+        return [ride for ride in self.rides if start <= ride[0] < end]
+
+
+class FakeAvailabilityRepository:
+    def __init__(self, rules):
+        self.rules = rules
+
+    def get_by_instructor(self, db, instructor_id):
+        return self.rules
+
+
+@pytest.fixture
+def calendar(monkeypatch):
+    """Monta o serviço com regras/aulas em memória, no fuso de Nova York e sem holds."""
+    monkeypatch.setattr(service_module, "instructor_timezone", lambda: NEW_YORK)
+    monkeypatch.setattr(service_module.slot_holds, "intervals", lambda *args: [])
+    monkeypatch.setattr(service_module.weekly_template_cache, "get", lambda _id, loader: loader())
+
+    def build(rules, rides=()):
+        service = AvailabilityService()
+        service.availability_repo = FakeAvailabilityRepository(rules)
+        service.ride_repo = FakeRideRepository(list(rides))
+        return service
+
+    return build
+
+
+class TestWeeklyTemplate:
+    """União das janelas e subtração dos intervalos ocupados."""
+
+    def test_janelas_sobrepostas_sao_unidas(self):
+        """08-12 e 11-14 viram 08-14; 14-18 encostado também entra."""
+        template = WeeklyTemplate.compile(
+            [_rule(0, 8, 12), _rule(0, 11, 14), _rule(0, 14, 18), _rule(0, 20, 21)], SLOT_MINUTES
+        )
+        day = template.for_weekday(0)
+
+        assert day.windows == ((8 * 60, 18 * 60), (20 * 60, 21 * 60))
+        assert day.free_slots([], SLOT_MINUTES) == _slots(*range(8, 18), 20)
+
+    def test_dia_sem_regra_nao_tem_slots(self):
+        template = WeeklyTemplate.compile([_rule(0, 8, 12)], SLOT_MINUTES)
+
+        assert template.for_weekday(3).free_slots([], SLOT_MINUTES) == []
+
+    def test_aula_no_meio_da_janela_remove_os_slots_que_ela_encosta(self):
+        """Aula 09:30-10:20 derruba os slots das 9h e das 10h."""
+        day = WeeklyTemplate.compile([_rule(0, 8, 12)], SLOT_MINUTES).for_weekday(0)
+
+        assert day.free_slots([(9 * 60 + 30, 10 * 60 + 20)], SLOT_MINUTES) == _slots(8, 11)
+
+    def test_aula_atravessando_a_borda_da_janela(self):
+        """Começa antes da janela e termina dentro dela (e vice-versa)."""
+        day = WeeklyTemplate.compile([_rule(0, 8, 12), _rule(0, 14, 18)], SLOT_MINUTES).for_weekday(0)
+        busy = [(7 * 60 + 30, 8 * 60 + 20), (17 * 60 + 30, 19 * 60)]
+
+        assert day.free_slots(busy, SLOT_MINUTES) == _slots(9, 10, 11, 14, 15, 16)
+
+    def test_aula_cobrindo_o_intervalo_entre_janelas(self):
+        """Ocupado de 11:30 às 14:10: some o último slot da manhã e o primeiro da tarde."""
+        day = WeeklyTemplate.compile([_rule(0, 8, 12), _rule(0, 14, 18)], SLOT_MINUTES).for_weekday(0)
+
+        assert day.free_slots([(11 * 60 + 30, 14 * 60 + 10)], SLOT_MINUTES) == _slots(8, 9, 10, 15, 16, 17)
+
+    def test_subtracao_com_ocupados_sobrepostos_e_fora_de_ordem(self):
+        free = subtract_intervals(
+            merge_intervals([(480, 720)]),
+            [(600, 660), (500, 540), (530, 610)],
+        )
+
+        assert free == [(480, 500), (660, 720)]
+
+
+class TestAvailabilityCalendarDst:
+    """Dias de troca de horário de verão no fuso do instrutor."""
+
+    def test_aula_que_comeca_na_vespera_ocupa_o_inicio_do_dia(self, calendar):
+        """Aula 23:30-00:20 ocupa a meia-noite do dia seguinte."""
+        scheduled_at = datetime(2026, 3, 9, 23, 30, tzinfo=NEW_YORK).astimezone(timezone.utc)
+        service = calendar([_rule(1, 0, 3)], rides=[(scheduled_at, 50)])
+
+        slots = service.get_available_calendar(None, 1, date(2026, 3, 10), date(2026, 3, 10))
+
+        assert slots[date(2026, 3, 10)] == _slots(1, 2)
+
+    def test_inicio_do_horario_de_verao(self, calendar):
+        """Aula 01:30 (UTC-5) de 60 min termina 03:30 (UTC-4): o slot das 3h fica ocupado."""
+        scheduled_at = datetime(2026, 3, 8, 6, 30, tzinfo=timezone.utc)  # 01:30 EST
+        service = calendar([_rule(SPRING_FORWARD.weekday(), 0, 6)], rides=[(scheduled_at, 60)])
+
+        slots = service.get_available_calendar(None, 1, SPRING_FORWARD, SPRING_FORWARD)
+
+        assert time(3) not in slots[SPRING_FORWARD]
+        assert time(1) not in slots[SPRING_FORWARD]
+        assert time(4) in slots[SPRING_FORWARD]
+
+    def test_fim_do_horario_de_verao(self, calendar):
+        """Aula 01:30 (UTC-4) de 60 min termina 01:30 (UTC-5): ocupa 01:00-02:00 no relógio."""
+        scheduled_at = datetime(2026, 11, 1, 5, 30, tzinfo=timezone.utc)  # 01:30 EDT
+        service = calendar([_rule(FALL_BACK.weekday(), 0, 4)], rides=[(scheduled_at, 60)])
+
+        slots = service.get_available_calendar(None, 1, FALL_BACK, FALL_BACK)
+
+        assert slots[FALL_BACK] == _slots(0, 2, 3)
+
+    def test_dia_de_troca_sem_aulas_oferece_o_template(self, calendar):
+        service = calendar([_rule(FALL_BACK.weekday(), 8, 10)])
+
+        slots = service.get_available_calendar(None, 1, FALL_BACK, FALL_BACK + timedelta(days=7))
+
+        assert slots[FALL_BACK] == _slots(8, 9)
+        assert slots[FALL_BACK + timedelta(days=7)] == _slots(8, 9)
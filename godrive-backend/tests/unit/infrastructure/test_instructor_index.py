@@ -0,0 +1,112 @@
+"""
+Testes unitários para o índice espacial em memória dos instrutores.
+"""
+import pytest
+
+from app.application.dtos import InstructorSearchFiltersDTO
+from app.infrastructure.db.models.instructor import InstructorStatus
+from app.infrastructure.search.instructor_index import (
+    KM_PER_DEGREE_LAT,
+    InstructorSpatialIndex,
+)
+
+CELL_DEG = 0.05
+
+
+def _row(instructor_id: int, lat: float, long: float) -> dict:
+    return {
+        "id": instructor_id,
+        "latitude": lat,
+        "longitude": long,
+        "status": InstructorStatus.VERIFIED,
+        "full_name": f"Instrutor {instructor_id}",
+        "average_rating": None,
+    }
+
+
+def _index(*rows) -> InstructorSpatialIndex:
+    index = InstructorSpatialIndex(cell_deg=CELL_DEG)
+    index.load(rows)
+    return index
+
+
+class TestSearchRadiusBoundingBox:
+    """Candidatos do bbox: ninguém dentro do raio pode ficar de fora."""
+
+    def test_ponto_na_borda_do_raio_em_outra_linha_da_grade(self):
+        """
+        Origem logo abaixo da fronteira de linha em -23,50 e instrutor a 9,999 km
+        ao norte, já na linha de cima: com 111,32 km/grau o bbox parava antes dela.
+        """
+        boundary = -23.50
+        lat = boundary - 0.08988
+        north = lat + 9.999 / KM_PER_DEGREE_LAT
+        assert north > boundary
+        index = _index(_row(1, north, -46.63))
+
+        results = index.search_radius(lat, -46.63, 10)
+
+        assert [r["id"] for r in results] == [1]
+        assert results[0]["distance"] == pytest.approx(10.0)
+
+    def test_ponto_fora_do_raio_nao_entra(self):
+        index = _index(_row(1, -23.55 + 0.0905, -46.63))  # ~10,06 km
+
+        assert index.search_radius(-23.55, -46.63, 10) == []
+
+    @pytest.mark.parametrize("origin, other", [(179.99, -179.99), (-179.99, 179.99)])
+    def test_raio_atravessando_o_antimeridiano(self, origin, other):
+        """Instrutor ~2 km do outro lado de ±180° aparece nos dois sentidos."""
+        index = _index(_row(1, -16.5, other), _row(2, -16.5, 170.0))
+
+        results = index.search_radius(-16.5, origin, 5)
+
+        assert [r["id"] for r in results] == [1]
+        assert results[0]["distance"] < 3
+
+
+class TestStaleGeneration:
+    """Invalidação durante o refresh não pode ser perdida."""
+
+    def test_mark_stale_durante_a_query_mantem_o_indice_stale(self):
+        index = InstructorSpatialIndex(cell_deg=CELL_DEG)
+        generation = index.generation
+
+        index.mark_stale()  # Evento chega enquanto list_for_index roda
+        index.load([_row(1, -23.55, -46.63)], generation=generation)
+
+        assert not index.is_ready()
+        assert index.needs_refresh(refresh_seconds=60)
+
+    def test_refresh_sem_invalidacao_no_meio_fica_pronto(self):
+        index = InstructorSpatialIndex(cell_deg=CELL_DEG)
+        index.mark_stale()
+        generation = index.generation
+
+        index.load([_row(1, -23.55, -46.63)], generation=generation)
+
+        assert index.is_ready()
+
+
+class TestUpdateRating:
+    """Nova avaliação troca a média sem invalidar o índice."""
+
+    def test_media_nova_aparece_na_busca_e_no_filtro(self):
+        index = _index(_row(1, -23.55, -46.63), _row(2, -23.55, -46.631))
+
+        assert index.update_rating(1, 4.76)
+
+        assert index.is_ready()
+        results = index.search_radius(-23.55, -46.63, 5, filters=InstructorSearchFiltersDTO(min_rating=4))
+        assert [(r["id"], r["average_rating"]) for r in results] == [(1, 4.8)]
+
+    def test_media_recebida_durante_o_refresh_sobrevive_ao_load(self):
+        """A query do refresh leu a média antiga: o load reaplica a nova."""
+        index = _index(_row(1, -23.55, -46.63))
+        generation = index.generation
+
+        index.update_rating(1, 5.0)
+        index.load([_row(1, -23.55, -46.63)], generation=generation)
+
+        assert index.is_ready()
+        assert index.search_radius(-23.55, -46.63, 5)[0]["average_rating"] == 5.0
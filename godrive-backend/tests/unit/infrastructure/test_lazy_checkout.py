@@ -0,0 +1,93 @@
+"""
+Testes unitários para o checkout preguiçoso da sessão (budget por router e
+métrica de espera do pool).
+"""
+from contextlib import ExitStack, contextmanager
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+
+from app.infrastructure.db.pool_metrics import ConnectionBudgetExceeded, PoolMonitor
+from app.infrastructure.db.session import ON_CHECKOUT, LazyCheckoutSession
+
+ROUTE = "instructors"
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://", poolclass=QueuePool, pool_size=1, max_overflow=0)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def monitor(engine):
+    monitor = PoolMonitor("test", budgets={ROUTE: 1}, max_overflow=0)
+    monitor.attach(engine)
+    return monitor
+
+
+@pytest.fixture
+def open_session(engine, monitor):
+    factory = sessionmaker(bind=engine, class_=LazyCheckoutSession)
+    return lambda: _open_session(factory, monitor)
+
+
+def _open_session(factory, monitor):
+    """Sessão com o mesmo gancho de deps.get_db. Retorna (sessão, budget)."""
+    budget = ExitStack()
+
+    @contextmanager
+    def on_checkout():
+        budget.enter_context(monitor.route_slot_sync(ROUTE, timeout=0.05))
+        with monitor.track_checkout(ROUTE):
+            yield
+
+    db = factory()
+    db.info[ON_CHECKOUT] = on_checkout
+    return db, budget
+
+
+def _in_use(monitor):
+    return monitor.snapshot()["budgets"][ROUTE]["in_use"]
+
+
+class TestLazyCheckoutSession:
+
+    def test_sessao_sem_query_nao_reserva_budget(self, monitor, open_session):
+        db, budget = open_session()
+
+        assert _in_use(monitor) == 0
+        db.close()
+        budget.close()
+        assert monitor.snapshot()["checkouts"] == {"immediate": 0, "waited": 0}
+
+    def test_primeira_query_reserva_budget_ate_fechar(self, monitor, open_session):
+        db, budget = open_session()
+
+        db.execute(text("SELECT 1"))
+        db.commit()
+        db.execute(text("SELECT 1"))  # Novo checkout após o commit: sem gancho
+
+        assert _in_use(monitor) == 1
+        # Pool com conexão livre: checkout imediato, fora do histograma de espera
+        assert monitor.snapshot()["checkouts"] == {"immediate": 1, "waited": 0}
+        assert monitor.checkout_latency.snapshot()["count"] == 0
+        db.close()
+        budget.close()
+        assert _in_use(monitor) == 0
+
+    def test_budget_esgotado_so_na_primeira_query(self, monitor, open_session):
+        holder, holder_budget = open_session()
+        holder.execute(text("SELECT 1"))
+
+        db, budget = open_session()
+        with pytest.raises(ConnectionBudgetExceeded):
+            db.execute(text("SELECT 1"))
+
+        for session, stack in ((db, budget), (holder, holder_budget)):
+            session.close()
+            stack.close()
+        assert _in_use(monitor) == 0
@@ -0,0 +1,85 @@
+"""
+Testes unitários para a reserva no banco (RideRepositoryAdapter.create).
+"""
+import pytest
+from sqlalchemy.exc import DBAPIError
+
+from app.domain.entities.ride import RideEntity, RideStatus
+from app.domain.exceptions.ride import SlotNotAvailableException
+from app.infrastructure.repositories.adapters.ride_repository_adapter import (
+    BOOKING_MAX_ATTEMPTS,
+    BOOKING_RETRY_BACKOFF_SECONDS,
+    RideRepositoryAdapter,
+)
+
+
+class TestRideRepositoryAdapterCreate:
+    """Reserva no banco (RideRepositoryAdapter.create) com a exclusion constraint."""
+
+    def _ride(self, scheduled_at):
+        return RideEntity(
+            id=None,
+            student_id=100,
+            instructor_id=1,
+            scheduled_at=scheduled_at,
+            price=100.0,
+        )
+
+    def test_conflito_na_constraint_vira_slot_not_available(
+        self, booking_session, db_error, no_slot_holds, future_datetime
+    ):
+        """23P01 em ex_rides_instructor_no_overlap: o horário foi tomado por outra reserva."""
+        # Arrange
+        conflict = db_error(
+            "23P01",
+            'conflicting key value violates exclusion constraint "ex_rides_instructor_no_overlap"',
+        )
+        session = booking_session(conflict)
+        adapter = RideRepositoryAdapter(session)
+
+        # Act & Assert
+        with pytest.raises(SlotNotAvailableException):
+            adapter.create(self._ride(future_datetime))
+        assert session.commits == 1
+        assert session.rollbacks == 1
+
+    def test_outra_violacao_23p01_nao_vira_conflito_de_horario(
+        self, booking_session, db_error, no_slot_holds, future_datetime
+    ):
+        """Só a constraint de sobreposição das aulas é tratada como horário ocupado."""
+        session = booking_session(db_error("23P01", 'violates exclusion constraint "outra_constraint"'))
+        adapter = RideRepositoryAdapter(session)
+
+        with pytest.raises(DBAPIError):
+            adapter.create(self._ride(future_datetime))
+
+    def test_erro_transitorio_e_tentado_novamente(
+        self, booking_session, db_error, no_slot_holds, future_datetime
+    ):
+        """Deadlock seguido de sucesso: a reserva é criada na segunda tentativa."""
+        # Arrange
+        session = booking_session(db_error("40P01", "deadlock detected"), None)
+        adapter = RideRepositoryAdapter(session)
+
+        # Act
+        result = adapter.create(self._ride(future_datetime))
+
+        # Assert
+        assert result.id == 2
+        assert result.status == RideStatus.PENDING
+        assert session.commits == 2
+        assert no_slot_holds == [BOOKING_RETRY_BACKOFF_SECONDS]
+
+    def test_erro_transitorio_desiste_apos_max_tentativas(
+        self, booking_session, db_error, no_slot_holds, future_datetime
+    ):
+        """Falhas de serialização em todas as tentativas: o erro original sobe."""
+        errors = [db_error("40001", "could not serialize access") for _ in range(BOOKING_MAX_ATTEMPTS)]
+        session = booking_session(*errors)
+        adapter = RideRepositoryAdapter(session)
+
+        with pytest.raises(DBAPIError):
+            adapter.create(self._ride(future_datetime))
+        assert session.commits == BOOKING_MAX_ATTEMPTS
+        assert session.rollbacks == BOOKING_MAX_ATTEMPTS
+        assert len(no_slot_holds) == BOOKING_MAX_ATTEMPTS - 1
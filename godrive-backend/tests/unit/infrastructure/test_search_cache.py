@@ -0,0 +1,91 @@
+"""
+Testes unitários para o single-flight do cache de busca de instrutores.
+"""
+import asyncio
+
+from app.infrastructure.search.search_cache import InstructorSearchCache
+
+KEY = "godrive-cache:search:cell:0.01:6645:13337:10.0"
+ROWS = [{"id": 1, "latitude": -23.55, "longitude": -46.63}]
+
+
+class FakeAsyncRedis:
+    """Redis asyncio mínimo: células sempre frias e lock sempre livre."""
+
+    def __init__(self):
+        self.values = {}
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def set(self, key, value, nx=False, px=None, ex=None):
+        if nx and key in self.values:
+            return False
+        self.values[key] = value
+        return True
+
+    async def eval(self, script, numkeys, *args):
+        # Liberação do lock / gravação condicionada: aqui só libera o lock
+        keys = args[:numkeys]
+        if keys and keys[0].endswith(":lock"):
+            self.values.pop(keys[0], None)
+        return 1
+
+
+class BlockingLoader:
+    """Loader que só termina quando o teste libera; conta as chamadas."""
+
+    def __init__(self):
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        await self.release.wait()
+        return ROWS
+
+
+def _cache() -> InstructorSearchCache:
+    cache = InstructorSearchCache()
+    cache.init(FakeAsyncRedis())
+    return cache
+
+
+class TestSingleFlight:
+
+    def test_requisicoes_concorrentes_calculam_uma_vez(self):
+        async def scenario():
+            cache, loader = _cache(), BlockingLoader()
+            tasks = [asyncio.create_task(cache._get_candidates(KEY, loader)) for _ in range(3)]
+            await asyncio.sleep(0.01)
+            loader.release.set()
+            return cache, loader, await asyncio.gather(*tasks)
+
+        cache, loader, results = asyncio.run(scenario())
+
+        assert loader.calls == 1
+        assert results == [ROWS, ROWS, ROWS]
+        assert cache.stats()["coalesced"] == 2
+
+    def test_dono_cancelado_nao_cancela_os_waiters(self):
+        """O primeiro waiter assume o cálculo; ninguém além do dono recebe CancelledError."""
+        async def scenario():
+            cache, loader = _cache(), BlockingLoader()
+            owner = asyncio.create_task(cache._get_candidates(KEY, loader))
+            await asyncio.sleep(0.01)
+            waiters = [asyncio.create_task(cache._get_candidates(KEY, loader)) for _ in range(2)]
+            await asyncio.sleep(0.01)
+
+            owner.cancel()
+            await asyncio.sleep(0.01)
+            loader.release.set()
+            results = await asyncio.gather(*waiters)
+            return cache, loader, owner, results
+
+        cache, loader, owner, results = asyncio.run(scenario())
+
+        assert owner.cancelled()
+        assert results == [ROWS, ROWS]
+        assert loader.calls == 2  # O dono cancelado + um novo dono entre os waiters
+        assert cache.stats()["owner_cancelled"] == 1
+        assert cache.stats()["inflight"] == 0
@@ -0,0 +1,130 @@
+"""
+Testes unitários para o ConnectionManager (salas de WebSocket das aulas).
+"""
+import asyncio
+
+from app.infrastructure.external.presence import RidePresence
+from app.infrastructure.external.socket_broker import InMemorySocketBroker
+from app.infrastructure.external.socket_service import ConnectionManager
+
+
+class FakeWebSocket:
+    """WebSocket em memória: registra os frames enviados e o código de fechamento."""
+
+    def __init__(self, fail_send: bool = False):
+        self.fail_send = fail_send
+        self.sent = []
+        self.closed = None
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, data):
+        if self.fail_send:
+            raise ConnectionResetError("cliente sumiu")
+        self.sent.append(data)
+
+    async def send_bytes(self, data):
+        await self.send_text(data)
+
+    async def close(self, code=1000):
+        self.closed = code
+
+
+class SlowPresence(RidePresence):
+    """Presença cujo mark_offline realmente suspende (como o Redis)."""
+
+    async def mark_offline(self, ride_id, user_id, last_seen):
+        await asyncio.sleep(0)
+        await super().mark_offline(ride_id, user_id, last_seen)
+
+
+class CountingBroker(InMemorySocketBroker):
+    def __init__(self):
+        super().__init__()
+        self.unsubscribed = []
+
+    async def unsubscribe(self, ride_id):
+        self.unsubscribed.append(ride_id)
+
+
+def _settle():
+    # Deixa as tasks escritoras e a remoção rodarem até o fim
+    return asyncio.sleep(0.05)
+
+
+class TestConnectionManagerEviction:
+    """Remoção de sockets cujo envio falha (task escritora)."""
+
+    def test_envio_com_falha_remove_socket_e_fecha_com_1013(self):
+        """O socket morto sai da sala, é fechado com 1013 e o outro continua."""
+        async def scenario():
+            manager = ConnectionManager(broker=CountingBroker(), presence=SlowPresence())
+            healthy, dead = FakeWebSocket(), FakeWebSocket(fail_send=True)
+            await manager.connect(7, healthy, user_id=1)
+            await manager.connect(7, dead, user_id=2)
+
+            await manager.broadcast_location(7, {"lat": -23.5, "long": -46.6})
+            await _settle()
+            return manager, healthy, dead
+
+        manager, healthy, dead = asyncio.run(scenario())
+
+        assert manager.active_connections == {"7": [healthy]}
+        assert list(manager._outboxes) == [healthy]
+        assert dead.closed == 1013
+        assert manager.evicted == 1
+        assert len(healthy.sent) == 1
+
+    def test_ultimo_socket_removido_cancela_assinatura_da_sala(self):
+        """Sem sockets locais, o nó deixa de assinar o canal da aula."""
+        async def scenario():
+            broker = CountingBroker()
+            manager = ConnectionManager(broker=broker, presence=SlowPresence())
+            dead = FakeWebSocket(fail_send=True)
+            await manager.connect(9, dead, user_id=3)
+
+            manager.send_to(dead, {"type": "PING"})
+            await _settle()
+            return manager, broker, dead
+
+        manager, broker, dead = asyncio.run(scenario())
+
+        assert manager.active_connections == {}
+        assert manager._outboxes == {}
+        assert broker.unsubscribed == [9]
+        assert dead.closed == 1013
+
+
+class TestConnectionManagerPresence:
+    """Saída da sala registrada na presença da aula."""
+
+    def test_reconexao_nao_marca_usuario_offline(self):
+        """O socket antigo fecha depois do novo abrir: o usuário continua online."""
+        async def scenario():
+            presence = SlowPresence()
+            manager = ConnectionManager(broker=CountingBroker(), presence=presence)
+            old, new = FakeWebSocket(), FakeWebSocket()
+            await manager.connect(5, old, user_id=1)
+            await manager.connect(5, new, user_id=1)
+
+            await manager.disconnect(5, old)
+            return await presence.get(5)
+
+        # Nenhuma saída registrada para o usuário 1
+        assert asyncio.run(scenario()) == []
+
+    def test_ultimo_socket_do_usuario_marca_offline(self):
+        async def scenario():
+            presence = SlowPresence()
+            manager = ConnectionManager(broker=CountingBroker(), presence=presence)
+            student, instructor = FakeWebSocket(), FakeWebSocket()
+            await manager.connect(5, student, user_id=1)
+            await manager.connect(5, instructor, user_id=2)
+
+            await manager.disconnect(5, student)
+            return await presence.get(5)
+
+        participants = asyncio.run(scenario())
+
+        assert [(p["user_id"], p["online"]) for p in participants] == [(1, False)]
@@ -0,0 +1,172 @@
+"""
+Testes unitários para a ingestão de telemetria (posições do WebSocket da aula).
+"""
+import asyncio
+import importlib
+
+import pytest
+
+from app.infrastructure.tracking.telemetry import TelemetryIngestor, parse_frame
+
+# O pacote reexporta a instância global `telemetry`, que esconde o módulo de mesmo nome
+telemetry_module = importlib.import_module("app.infrastructure.tracking.telemetry")
+
+RIDE_ID = 7
+SENDER_ID = 1
+
+# ~15 m ao norte de (-23.55, -46.63)
+FIFTEEN_METERS_DEG = 15 / 111_320.0
+
+
+class FakeClock:
+    """Substitui time.time() do módulo: o teste decide quando cada frame chega."""
+
+    def __init__(self, now: float = 1_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakePublisher:
+    """publish em memória: guarda (ride_id, mensagem) na ordem de envio."""
+
+    def __init__(self):
+        self.messages = []
+
+    async def __call__(self, ride_id, message):
+        self.messages.append((ride_id, message))
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(telemetry_module.time, "time", fake)
+    return fake
+
+
+@pytest.fixture
+def publisher():
+    return FakePublisher()
+
+
+def _ingestor(publisher, **kwargs) -> TelemetryIngestor:
+    options = {"moving_interval": 5.0, "stopped_interval": 30.0}
+    options.update(kwargs)
+    return TelemetryIngestor(publish=publisher, **options)
+
+
+class TestParseFrame:
+    """Validação do frame recebido."""
+
+    def test_frame_valido(self):
+        sample = parse_frame({"lat": -23.55, "long": -46.63, "speed": 3.2}, SENDER_ID, 10.0)
+
+        assert sample is not None
+        assert (sample.lat, sample.long, sample.speed) == (-23.55, -46.63, 3.2)
+
+    @pytest.mark.parametrize("raw", [
+        {"lat": float("nan"), "long": -46.63},
+        {"lat": -23.55, "long": float("inf")},
+        {"lat": 91, "long": -46.63},
+        {"lat": -23.55, "long": -180.5},
+        {"lat": "-23.55", "long": -46.63},
+        {"lat": True, "long": -46.63},
+        {"long": -46.63},
+        [-23.55, -46.63],
+    ])
+    def test_rejeita_nan_fora_da_faixa_e_tipos_errados(self, raw):
+        assert parse_frame(raw, SENDER_ID, 10.0) is None
+
+    def test_opcional_invalido_e_ignorado_sem_descartar_a_posicao(self):
+        sample = parse_frame(
+            {"lat": -23.55, "long": -46.63, "speed": float("nan"), "heading": 400}, SENDER_ID, 10.0
+        )
+
+        assert sample is not None
+        assert sample.speed is None
+        assert sample.heading is None
+
+
+class TestMovingDecision:
+    """Modo em movimento/parado decidido no servidor."""
+
+    def test_velocidade_do_gps_decide_o_modo(self, clock, publisher):
+        ingestor = _ingestor(publisher)
+
+        interval = asyncio.run(ingestor.ingest(RIDE_ID, SENDER_ID, {"lat": -23.55, "long": -46.63, "speed": 3.0}))
+
+        assert interval == 5.0
+        assert publisher.messages[-1][1]["moving"] is True
+
+    def test_sem_velocidade_deslocamento_grande_e_movimento(self, clock, publisher):
+        ingestor = _ingestor(publisher)
+
+        async def scenario():
+            first = await ingestor.ingest(RIDE_ID, SENDER_ID, {"lat": -23.55, "long": -46.63})
+            clock.now += 2
+            second = await ingestor.ingest(
+                RIDE_ID, SENDER_ID, {"lat": -23.55 + FIFTEEN_METERS_DEG * 2, "long": -46.63}
+            )
+            return first, second
+
+        first, second = asyncio.run(scenario())
+
+        assert first == 30.0   # Primeiro frame: parado
+        assert second == 5.0   # Mudou para em movimento: avisa o cliente
+        assert [m["moving"] for _, m in publisher.messages] == [False, True]
+
+    def test_deslocamento_dentro_da_precisao_do_gps_e_parado(self, clock, publisher):
+        ingestor = _ingestor(publisher)
+
+        async def scenario():
+            await ingestor.ingest(RIDE_ID, SENDER_ID, {"lat": -23.55, "long": -46.63})
+            clock.now += 40
+            return await ingestor.ingest(
+                RIDE_ID, SENDER_ID,
+                {"lat": -23.55 + FIFTEEN_METERS_DEG * 2, "long": -46.63, "accuracy": 50},
+            )
+
+        interval = asyncio.run(scenario())
+
+        assert interval is None  # Modo não mudou
+        assert [m["moving"] for _, m in publisher.messages] == [False, False]
+
+
+class TestCoalescing:
+    """Dentro do intervalo do modo só a amostra mais recente é enviada."""
+
+    def test_envia_apenas_a_amostra_mais_recente_no_fim_do_intervalo(self, clock, publisher):
+        # Parado: intervalo mínimo de 0,04 s (0,05 * tolerância)
+        ingestor = _ingestor(publisher, stopped_interval=0.05)
+
+        async def scenario():
+            await ingestor.ingest(RIDE_ID, SENDER_ID, {"lat": -23.55, "long": -46.63})
+            for step, long in enumerate((-46.630001, -46.630002), start=1):
+                clock.now += 0.01 * step
+                await ingestor.ingest(RIDE_ID, SENDER_ID, {"lat": -23.55, "long": long})
+            assert len(publisher.messages) == 1  # Nada enviado dentro do intervalo
+            await asyncio.sleep(0.1)
+
+        asyncio.run(scenario())
+
+        assert [m["long"] for _, m in publisher.messages] == [-46.63, -46.630002]
+        assert ingestor.stats()["coalesced"] == 1
+        assert ingestor._flush_tasks == set()
+
+    def test_remetentes_sao_coalescidos_separadamente(self, clock, publisher):
+        ingestor = _ingestor(publisher, stopped_interval=0.05)
+
+        async def scenario():
+            for sender in (1, 2):
+                await ingestor.ingest(RIDE_ID, sender, {"lat": -23.55, "long": -46.63})
+            clock.now += 0.01
+            for sender in (1, 2):
+                await ingestor.ingest(RIDE_ID, sender, {"lat": -23.55, "long": -46.630001})
+            await asyncio.sleep(0.1)
+
+        asyncio.run(scenario())
+
+        latest = {m["sender_id"]: m["long"] for _, m in publisher.messages}
+        assert latest == {1: -46.630001, 2: -46.630001}
+        assert len(publisher.messages) == 4
@@ -0,0 +1,76 @@
+"""
+Testes unitários para o codec e a simplificação do trajeto das aulas.
+"""
+import zlib
+
+import pytest
+
+from app.infrastructure.tracking.track_codec import (
+    FORMAT_VERSION,
+    decode_track,
+    encode_track,
+    simplify_track,
+)
+
+
+class TestTrackCodec:
+    """encode_track / decode_track."""
+
+    def test_ida_e_volta_preserva_pontos_com_precisao_de_1e6(self):
+        """Coordenadas voltam com erro máximo de meio micrograu; o tempo, exato."""
+        points = [
+            (-23.5505123, -46.6333987, 0),
+            (-23.5505981, -46.6334412, 1000),
+            (-23.5507004, -46.6335001, 2150),
+            (-23.5499999, -46.6320000, 60000),
+        ]
+
+        decoded = decode_track(encode_track(points))
+
+        assert len(decoded) == len(points)
+        for (lat, long, t), (d_lat, d_long, d_t) in zip(points, decoded):
+            assert d_lat == pytest.approx(lat, abs=5e-7)
+            assert d_long == pytest.approx(long, abs=5e-7)
+            assert d_t == t
+
+    def test_trajeto_vazio(self):
+        """Trajeto vazio vira um blob válido que decodifica para lista vazia."""
+        blob = encode_track([])
+
+        assert blob[0] == FORMAT_VERSION
+        assert decode_track(blob) == []
+        assert decode_track(b"") == []
+
+    def test_versao_desconhecida_levanta_value_error(self):
+        """Um blob de outra versão do formato não é decodificado às cegas."""
+        blob = bytes([FORMAT_VERSION + 1]) + zlib.compress(b"")
+
+        with pytest.raises(ValueError, match="Versão de trajeto desconhecida"):
+            decode_track(blob)
+
+
+class TestSimplifyTrack:
+    """Douglas–Peucker em simplify_track."""
+
+    def test_mantem_primeiro_e_ultimo_pontos(self):
+        """Extremidades ficam mesmo quando tudo cabe na tolerância."""
+        points = [(-23.55, -46.63, 0), (-23.5500001, -46.6300001, 500), (-23.55, -46.6299, 1000)]
+
+        simplified = simplify_track(points, tolerance_m=50)
+
+        assert simplified[0] == points[0]
+        assert simplified[-1] == points[-1]
+
+    def test_remove_pontos_colineares(self):
+        """Pontos sobre a reta entre os extremos somem; a curva fica."""
+        straight = [(-23.55, -46.63 + i * 0.001, i * 1000) for i in range(6)]
+        corner = (-23.54, straight[-1][1], 6000)
+
+        simplified = simplify_track(straight + [corner], tolerance_m=1)
+
+        assert simplified == [straight[0], straight[-1], corner]
+
+    def test_tolerancia_zero_devolve_trajeto_inteiro(self):
+        points = [(-23.55, -46.63 + i * 0.001, i * 1000) for i in range(4)]
+
+        assert simplify_track(points, tolerance_m=0) == points
@@ -7,6 +7,10 @@
 
 import { useQuery } from '@tanstack/react-query';
 import { api } from '@/services/api';
+import { InstructorSearchPage } from '@/types/instructor';
+
+// Maior página aceita por /instructors/search
+const SEARCH_PAGE_SIZE = 100;
 
 interface SearchParams {
     latitude: number;
@@ -22,6 +26,7 @@ interface Instructor {
     cnh_category?: string;
     vehicle_model?: string;
     distance?: number;
+    average_rating?: number | null;
 }
 
 /**
@@ -43,14 +48,23 @@ export function useInstructors(params: SearchParams) {
         queryKey: ['instructors', params.latitude, params.longitude, params.radius ?? 10],
 
         queryFn: async (): Promise<Instructor[]> => {
-            const { data } = await api.get<Instructor[]>('/instructors/search', {
-                params: {
-                    latitude: params.latitude,
-                    longitude: params.longitude,
-                    radius: params.radius ?? 10,
-                },
-            });
-            return data;
+            // O mapa mostra todos os instrutores do raio: percorre as páginas pelo cursor
+            const instructors: Instructor[] = [];
+            let cursor: string | null = null;
+            do {
+                const { data } = await api.get<InstructorSearchPage<Instructor>>('/instructors/search', {
+                    params: {
+                        latitude: params.latitude,
+                        longitude: params.longitude,
+                        radius: params.radius ?? 10,
+                        limit: SEARCH_PAGE_SIZE,
+                        ...(cursor ? { cursor } : {}),
+                    },
+                });
+                instructors.push(...data.items);
+                cursor = data.next_cursor;
+            } while (cursor);
+            return instructors;
         },
 
         // Só executa se tiver coordenadas válidas
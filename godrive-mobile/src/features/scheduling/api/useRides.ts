@@ -4,7 +4,7 @@
  * Hook React Query para gerenciar aulas (rides).
  */
 
-import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query';
+import { useInfiniteQuery, useMutation, useQueryClient } from '@tanstack/react-query';
 import { api } from '@/services/api';
 
 interface Ride {
@@ -12,12 +12,18 @@ interface Ride {
     student_id: number;
     instructor_id: number;
     scheduled_at: string;
+    duration_minutes?: number;
     price: number;
     status: string;
     pickup_latitude?: number;
     pickup_longitude?: number;
 }
 
+interface RidePage {
+    items: Ride[];
+    next_cursor: string | null; // Envie em ?cursor= para a próxima página
+}
+
 interface CreateRideData {
     instructor_id: number;
     scheduled_at: string;
@@ -27,15 +33,28 @@ interface CreateRideData {
 
 /**
  * Hook para buscar aulas do usuário.
+ *
+ * Histórico paginado por cursor: `rides` acumula as páginas já carregadas e
+ * `fetchNextPage()` busca a próxima (ex: no onEndReached da lista) enquanto
+ * `hasNextPage` for verdadeiro.
  */
 export function useRides() {
-    return useQuery({
+    const query = useInfiniteQuery({
         queryKey: ['rides'],
-        queryFn: async (): Promise<Ride[]> => {
-            const { data } = await api.get<Ride[]>('/rides/');
+        queryFn: async ({ pageParam }): Promise<RidePage> => {
+            const { data } = await api.get<RidePage>('/rides/', {
+                params: pageParam ? { cursor: pageParam } : undefined,
+            });
             return data;
         },
+        initialPageParam: null as string | null,
+        getNextPageParam: (lastPage) => lastPage.next_cursor,
     });
+
+    return {
+        ...query,
+        rides: query.data?.pages.flatMap((page) => page.items) ?? [],
+    };
 }
 
 /**
@@ -1,5 +1,8 @@
 import { api } from './api';
-import { Instructor } from '@/types/instructor';
+import { Instructor, InstructorSearchPage } from '@/types/instructor';
+
+// Maior página aceita por /instructors/search
+const SEARCH_PAGE_SIZE = 100;
 
 interface SearchParams {
   latitude: number;
@@ -11,14 +14,23 @@ export const searchInstructors = async ({ latitude, longitude, radius = 10 }: Se
   try {
     // O backend espera query params na URL: ?lat=...&long=...&radius=...
     // Ajuste aqui se o seu backend usar nomes diferentes (ex: lat vs latitude)
-    const response = await api.get<Instructor[]>('/instructors/search', {
-      params: {
-        latitude,
-        longitude,
-        radius_km: radius, // Verifique se o backend espera 'radius' ou 'radius_km'
-      },
-    });
-    return response.data;
+    // A busca é paginada (cursor): percorre as páginas até trazer todos do raio
+    const instructors: Instructor[] = [];
+    let cursor: string | null = null;
+    do {
+      const response = await api.get<InstructorSearchPage<Instructor>>('/instructors/search', {
+        params: {
+          latitude,
+          longitude,
+          radius_km: radius, // Verifique se o backend espera 'radius' ou 'radius_km'
+          limit: SEARCH_PAGE_SIZE,
+          ...(cursor ? { cursor } : {}),
+        },
+      });
+      instructors.push(...response.data.items);
+      cursor = response.data.next_cursor;
+    } while (cursor);
+    return instructors;
   } catch (error) {
     console.error('Erro ao buscar instrutores:', error);
     throw error;
@@ -9,4 +9,10 @@ export interface Instructor {
   latitude: number;
   longitude: number;
   distance?: number; // Backend calcula a distância
-}
\ No newline at end of file
+}
+
+// Resposta paginada de GET /instructors/search
+export interface InstructorSearchPage<T = Instructor> {
+  items: T[];
+  next_cursor: string | null; // Envie em ?cursor= para a próxima página
+}